@@ -24,6 +24,53 @@ class Config:
             "REMOTE_WHITE_FUNCTION_LIST_PATH"
         )
         self.app_timeout_seconds = int(os.getenv("APP_TIMEOUT_SECONDS", "240"))
+        self.connector_pool_max_size = int(os.getenv("CONNECTOR_POOL_MAX_SIZE", "8"))
+        self.connector_pool_idle_timeout_seconds = int(
+            os.getenv("CONNECTOR_POOL_IDLE_TIMEOUT_SECONDS", "300")
+        )
+        self.query_cache_max_bytes = int(os.getenv("QUERY_CACHE_MAX_BYTES", "0"))
+        self.query_cache_ttl_seconds = int(os.getenv("QUERY_CACHE_TTL_SECONDS", "0"))
+        self.query_cache_format = os.getenv("QUERY_CACHE_FORMAT", "arrow")
+        self.query_cache_parquet_min_bytes = int(
+            os.getenv("QUERY_CACHE_PARQUET_MIN_BYTES", "0")
+        )
+        self.query_cache_refresh_max_concurrency = int(
+            os.getenv("QUERY_CACHE_REFRESH_MAX_CONCURRENCY", "2")
+        )
+        self.query_stream_batch_size = int(
+            os.getenv("QUERY_STREAM_BATCH_SIZE", "10000")
+        )
+        self.query_batch_max_parallelism = int(
+            os.getenv("QUERY_BATCH_MAX_PARALLELISM", "4")
+        )
+        self.session_context_cache_size = int(
+            os.getenv("SESSION_CONTEXT_CACHE_SIZE", "32")
+        )
+        self.planned_sql_cache_size = int(os.getenv("PLANNED_SQL_CACHE_SIZE", "1024"))
+        self.pushdown_limit_cache_size = int(
+            os.getenv("PUSHDOWN_LIMIT_CACHE_SIZE", "1024")
+        )
+        self.transpile_cache_size = int(os.getenv("TRANSPILE_CACHE_SIZE", "1024"))
+        self.manifest_store_size = int(os.getenv("MANIFEST_STORE_SIZE", "32"))
+        self.bulkhead_max_workers = int(os.getenv("BULKHEAD_MAX_WORKERS", "8"))
+        self.bulkhead_max_queue_size = int(os.getenv("BULKHEAD_MAX_QUEUE_SIZE", "64"))
+        self.duckdb_instance_idle_timeout_seconds = int(
+            os.getenv("DUCKDB_INSTANCE_IDLE_TIMEOUT_SECONDS", "300")
+        )
+        self.object_storage_discovery_max_workers = int(
+            os.getenv("OBJECT_STORAGE_DISCOVERY_MAX_WORKERS", "8")
+        )
+        self.object_storage_schema_cache_size = int(
+            os.getenv("OBJECT_STORAGE_SCHEMA_CACHE_SIZE", "4096")
+        )
+        self.metadata_cache_ttl_seconds = int(
+            os.getenv("METADATA_CACHE_TTL_SECONDS", "0")
+        )
+        self.metadata_cache_size = int(os.getenv("METADATA_CACHE_SIZE", "256"))
+        self.dry_run_cache_ttl_seconds = int(
+            os.getenv("DRY_RUN_CACHE_TTL_SECONDS", "30")
+        )
+        self.dry_run_cache_size = int(os.getenv("DRY_RUN_CACHE_SIZE", "1024"))
         self.diagnose = False
         self.init_logger()
 
@@ -2,7 +2,7 @@ import wren_core
 from fastapi import Request
 from starlette.datastructures import Headers
 
-from app.model import QueryDTO
+from app.model import QueryBatchDTO, V3QueryDTO
 from app.model.data_source import DataSource
 
 X_WREN_FALLBACK_DISABLE = "x-wren-fallback_disable"
@@ -13,16 +13,22 @@ X_CACHE_HIT = "X-Cache-Hit"
 X_CACHE_CREATE_AT = "X-Cache-Create-At"
 X_CACHE_OVERRIDE = "X-Cache-Override"
 X_CACHE_OVERRIDE_AT = "X-Cache-Override-At"
+X_CACHE_AGE = "X-Cache-Age"
+X_TOTAL_COUNT = "X-Total-Count"
 X_CORRELATION_ID = "X-Correlation-ID"
 
 
 # Validate the dto by building the specific connection info from the data source
-def verify_query_dto(data_source: DataSource, dto: QueryDTO):
+def verify_query_dto(data_source: DataSource, dto: V3QueryDTO):
     # Use data_source.get_connection_info to validate the connection_info
     # This will ensure the connection_info can be properly parsed for the specific data source
     data_source.get_connection_info(dto.connection_info, {})
 
 
+def verify_query_batch_dto(data_source: DataSource, dto: QueryBatchDTO):
+    data_source.get_connection_info(dto.connection_info, {})
+
+
 def get_wren_headers(request: Request) -> Headers:
     return Headers(
         raw=list(
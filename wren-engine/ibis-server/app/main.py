@@ -1,21 +1,33 @@
-from collections.abc import AsyncIterator
+from collections.abc import AsyncIterator, Callable
 from contextlib import asynccontextmanager
 from datetime import datetime
-from typing import TypedDict
+from typing import Annotated, TypedDict
 from uuid import uuid4
 
 from asgi_correlation_id import CorrelationIdMiddleware
-from fastapi import FastAPI
+from fastapi import FastAPI, Query, Request
 from fastapi.responses import ORJSONResponse, RedirectResponse
 from loguru import logger
 
 from app.config import get_config
 from app.dependencies import X_CORRELATION_ID
+from app.mdl.core import (
+    SessionContextCache,
+    get_manifest_store,
+    get_session_context_cache,
+)
 from app.mdl.java_engine import JavaEngineConnector
+from app.mdl.transpile import get_transpile_cache_stats
 from app.middleware import ProcessTimeMiddleware, RequestLogMiddleware
 from app.model import ConfigModel
+from app.model.bulkhead import get_bulkhead_stats
+from app.model.connector_pool import ConnectorPool
+from app.model.dry_run_cache import get_dry_run_cache
+from app.model.duckdb_pool import get_duckdb_instance_pool
 from app.model.error import ErrorCode, ErrorResponse, WrenError
+from app.model.metadata.cache import get_metadata_cache
 from app.query_cache import QueryCacheManager
+from app.query_cache.manager import QueryCacheImpl
 from app.routers import v2, v3
 
 get_config().init_logger()
@@ -26,17 +38,54 @@ get_config().init_logger()
 class State(TypedDict):
     java_engine_connector: JavaEngineConnector
     query_cache_manager: QueryCacheManager
+    connector_pool: ConnectorPool
+    session_context_cache: SessionContextCache
+    # The stats of every cache and pool, keyed by the component name
+    stats_providers: dict[str, Callable[[], dict]]
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI) -> AsyncIterator[State]:
-    query_cache_manager = QueryCacheManager()
+    query_cache_manager = QueryCacheManager(
+        QueryCacheImpl(
+            max_bytes=get_config().query_cache_max_bytes,
+            ttl_seconds=get_config().query_cache_ttl_seconds,
+            cache_format=get_config().query_cache_format,
+            parquet_min_bytes=get_config().query_cache_parquet_min_bytes,
+        ),
+        refresh_max_concurrency=get_config().query_cache_refresh_max_concurrency,
+    )
+    connector_pool = ConnectorPool(
+        max_size=get_config().connector_pool_max_size,
+        idle_timeout_seconds=get_config().connector_pool_idle_timeout_seconds,
+    )
+
+    duckdb_instance_pool = get_duckdb_instance_pool()
+    session_context_cache = get_session_context_cache()
+    stats_providers = {
+        "connector_pool": connector_pool.stats,
+        "duckdb_instances": duckdb_instance_pool.stats,
+        "metadata_cache": get_metadata_cache().stats,
+        "dry_run_cache": get_dry_run_cache().stats,
+        "bulkhead": get_bulkhead_stats,
+        "query_cache": query_cache_manager.stats,
+        "session_context": session_context_cache.stats,
+        "transpile_cache": get_transpile_cache_stats,
+        "manifest_store": get_manifest_store().stats,
+    }
 
     async with JavaEngineConnector() as java_engine_connector:
-        yield {
-            "java_engine_connector": java_engine_connector,
-            "query_cache_manager": query_cache_manager,
-        }
+        try:
+            yield {
+                "java_engine_connector": java_engine_connector,
+                "query_cache_manager": query_cache_manager,
+                "connector_pool": connector_pool,
+                "session_context_cache": session_context_cache,
+                "stats_providers": stats_providers,
+            }
+        finally:
+            connector_pool.close_all()
+            duckdb_instance_pool.close_all()
 
 
 app = FastAPI(lifespan=lifespan, title="Wren Engine API")
@@ -73,6 +122,69 @@ def update_config(config_model: ConfigModel):
     return config
 
 
+@app.get("/stats")
+def stats(request: Request):
+    return {
+        name: provider() for name, provider in request.state.stats_providers.items()
+    }
+
+
+@app.get("/connector-pool/stats")
+def connector_pool_stats(request: Request):
+    return request.state.stats_providers["connector_pool"]()
+
+
+@app.get("/duckdb-instances/stats")
+def duckdb_instance_stats(request: Request):
+    return request.state.stats_providers["duckdb_instances"]()
+
+
+@app.get("/metadata-cache/stats")
+def metadata_cache_stats(request: Request):
+    return request.state.stats_providers["metadata_cache"]()
+
+
+@app.get("/dry-run-cache/stats")
+def dry_run_cache_stats(request: Request):
+    return request.state.stats_providers["dry_run_cache"]()
+
+
+@app.get("/bulkhead/stats")
+def bulkhead_stats(request: Request):
+    return request.state.stats_providers["bulkhead"]()
+
+
+@app.get("/cache/stats")
+def query_cache_stats(request: Request):
+    return request.state.stats_providers["query_cache"]()
+
+
+@app.get("/session-context/stats")
+def session_context_stats(request: Request):
+    return request.state.stats_providers["session_context"]()
+
+
+@app.get("/transpile-cache/stats")
+def transpile_cache_stats(request: Request):
+    return request.state.stats_providers["transpile_cache"]()
+
+
+@app.delete("/session-context")
+def invalidate_session_context(
+    request: Request,
+    manifest_hash: Annotated[
+        str | None,
+        Query(
+            alias="manifestHash",
+            description="the SHA-256 hex digest of the manifest string, invalidate all the contexts if not given",
+        ),
+    ] = None,
+):
+    return {
+        "invalidated": request.state.session_context_cache.invalidate(manifest_hash)
+    }
+
+
 # In Starlette, the Exception is special and is not included in normal exception handlers.
 @app.exception_handler(Exception)
 def exception_handler(request, exc: Exception):
@@ -1,13 +1,136 @@
-from functools import cache
+import base64
+import hashlib
 
+import orjson
 import wren_core
 
+from app.cache import LRUCache
+from app.config import get_config
+from app.model.error import ErrorCode, ErrorPhase, WrenError
+
+
+class SessionContextCache:
+    """A size-bounded LRU cache of `wren_core.SessionContext`.
+
+    A session context is built from the manifest, the function list and the session
+    properties, which is expensive, so the contexts are reused across requests. The
+    entries are keyed by the manifest hash instead of the manifest string. The least
+    recently used context is released when the cache is full. Setting `capacity` to
+    0 disables the cache.
+    """
+
+    def __init__(self, capacity: int = 32):
+        self._cache: LRUCache[tuple, wren_core.SessionContext] = LRUCache(capacity)
+
+    def get(
+        self,
+        manifest_str: str | None,
+        function_path: str,
+        properties: frozenset | None = None,
+    ) -> wren_core.SessionContext:
+        key = (get_manifest_hash(manifest_str), function_path, properties)
+        session_context = self._cache.get(key)
+        if session_context is None:
+            # Build the context outside the lock, it doesn't block the other manifests
+            session_context = self._cache.put(
+                key, wren_core.SessionContext(manifest_str, function_path, properties)
+            )
+        return session_context
+
+    def invalidate(self, manifest_hash: str | None = None) -> int:
+        """Remove the contexts of the manifest, or all the contexts if no hash is given."""
+        if manifest_hash is None:
+            return self._cache.remove_if()
+        return self._cache.remove_if(lambda key: key[0] == manifest_hash)
+
+    def stats(self) -> dict[str, int]:
+        return self._cache.stats()
+
+
+class Manifest:
+    """A registered manifest, kept with its id and the decoded MDL."""
+
+    def __init__(self, manifest_str: str):
+        try:
+            self.manifest = orjson.loads(base64.b64decode(manifest_str))
+        except Exception as e:
+            raise WrenError(
+                ErrorCode.INVALID_MDL, str(e), phase=ErrorPhase.MDL_EXTRACTION
+            ) from e
+        self.id = get_manifest_hash(manifest_str)
+        self.manifest_str = manifest_str
+
+
+class ManifestStore:
+    """A size-bounded LRU store of the registered manifests.
+
+    The clients register a manifest once and refer to it by its id, which is the
+    `get_manifest_hash` of the manifest string, so the decoded MDL of a registered
+    manifest is also found from the manifest string of a request.
+    """
+
+    def __init__(self, capacity: int = 32):
+        self._manifests: LRUCache[str, Manifest] = LRUCache(capacity)
+
+    def register(self, manifest_str: str) -> Manifest:
+        manifest = Manifest(manifest_str)
+        return self._manifests.put(manifest.id, manifest)
+
+    def get(self, manifest_id: str) -> Manifest:
+        manifest = self.find(manifest_id)
+        if manifest is None:
+            raise WrenError(
+                ErrorCode.MDL_NOT_FOUND,
+                f"Manifest {manifest_id} is not registered",
+                phase=ErrorPhase.REQUEST_RECEIVED,
+            )
+        return manifest
+
+    def find(self, manifest_id: str) -> Manifest | None:
+        return self._manifests.get(manifest_id)
+
+    def stats(self) -> dict[str, int]:
+        return self._manifests.stats()
+
+
+_session_context_cache = SessionContextCache(get_config().session_context_cache_size)
+_manifest_store = ManifestStore(get_config().manifest_store_size)
+# The hashes of the manifests keying the session contexts. A str caches its own
+# hash, so looking up the same string again doesn't rehash it, and an equal string
+# of another request costs a hash and a compare instead of SHA-256.
+_manifest_hashes: LRUCache[str, str] = LRUCache(get_config().session_context_cache_size)
+
+
+def get_session_context_cache() -> SessionContextCache:
+    return _session_context_cache
+
 
-@cache
 def get_session_context(
     manifest_str: str | None, function_path: str, properties: frozenset | None = None
 ) -> wren_core.SessionContext:
-    return wren_core.SessionContext(manifest_str, function_path, properties)
+    return _session_context_cache.get(manifest_str, function_path, properties)
+
+
+def get_manifest_store() -> ManifestStore:
+    return _manifest_store
+
+
+def get_manifest_hash(manifest_str: str | None) -> str | None:
+    if manifest_str is None:
+        return None
+    manifest_hash = _manifest_hashes.get(manifest_str)
+    if manifest_hash is None:
+        manifest_hash = _manifest_hashes.put(
+            manifest_str, hashlib.sha256(manifest_str.encode()).hexdigest()
+        )
+    return manifest_hash
+
+
+def get_manifest_dict(manifest_str: str) -> dict:
+    manifest = _manifest_store.find(get_manifest_hash(manifest_str))
+    if manifest is not None:
+        return manifest.manifest
+    return orjson.loads(base64.b64decode(manifest_str))
 
 
 def get_manifest_extractor(manifest_str: str) -> wren_core.ManifestExtractor:
@@ -6,15 +6,18 @@ from anyio import to_thread
 from loguru import logger
 from opentelemetry import trace
 
+from app.cache import LRUCache
 from app.config import get_config
 from app.custom_sqlglot.dialects.wren import Wren
 from app.dependencies import X_WREN_VARIABLE_PREFIX
 from app.mdl.core import (
     get_manifest_extractor,
+    get_manifest_hash,
     get_session_context,
     to_json_base64,
 )
 from app.mdl.java_engine import JavaEngineConnector
+from app.mdl.transpile import transpile
 from app.model.data_source import DataSource
 from app.model.error import PLANNED_SQL, ErrorCode, ErrorPhase, WrenError
 
@@ -26,6 +29,9 @@ importlib.import_module("app.custom_sqlglot.dialects")
 
 tracer = trace.get_tracer(__name__)
 
+# The dialect SQL planned by the embedded engine, shared by all the v3 endpoints
+_planned_sql_cache: LRUCache[tuple, str] = LRUCache(get_config().planned_sql_cache_size)
+
 
 class Rewriter:
     def __init__(
@@ -51,7 +57,7 @@ class Rewriter:
         try:
             read = self._get_read_dialect(self.experiment)
             write = self._get_write_dialect(self.data_source)
-            return sqlglot.transpile(planned_sql, read=read, write=write)[0]
+            return transpile(planned_sql, read=read, write=write)
         except Exception as e:
             raise WrenError(
                 ErrorCode.SQLGLOT_ERROR,
@@ -62,6 +68,18 @@ class Rewriter:
 
     @tracer.start_as_current_span("rewrite", kind=trace.SpanKind.INTERNAL)
     async def rewrite(self, sql: str) -> str:
+        cache_key = self._get_cache_key(sql)
+        if cache_key is not None:
+            dialect_sql = _planned_sql_cache.get(cache_key)
+            span = trace.get_current_span()
+            span.set_attribute("planned_sql_cache.hit", dialect_sql is not None)
+            span.set_attribute(
+                "planned_sql_cache.hit_ratio", _planned_sql_cache.hit_ratio()
+            )
+            if dialect_sql is not None:
+                logger.debug("Dialect SQL from cache: {}", dialect_sql)
+                return dialect_sql
+
         manifest_str = (
             self._extract_manifest(self.manifest_str, sql) or self.manifest_str
         )
@@ -70,8 +88,82 @@ class Rewriter:
         logger.debug("Planned SQL: {}", planned_sql)
         dialect_sql = self._transpile(planned_sql) if self.data_source else planned_sql
         logger.debug("Dialect SQL: {}", dialect_sql)
+        if cache_key is not None:
+            _planned_sql_cache.put(cache_key, dialect_sql)
         return dialect_sql
 
+    @tracer.start_as_current_span("rewrite_batch", kind=trace.SpanKind.INTERNAL)
+    async def rewrite_batch(self, sqls: list[str]) -> list[str | WrenError]:
+        """Plan many SQL with the embedded engine and return the SQL or the error of each.
+
+        The SQL missing in the planned SQL cache are planned against the session
+        context of the whole manifest in a single thread hop. They are cached apart
+        from the SQL planned by `rewrite`, which plans against the extracted manifest.
+        """
+        if not isinstance(self._rewriter, EmbeddedEngineRewriter):
+            raise WrenError(
+                ErrorCode.NOT_IMPLEMENTED,
+                "Batch planning is only supported by the embedded engine",
+            )
+        manifest_hash = get_manifest_hash(self.manifest_str)
+        cache_keys = [
+            self._get_cache_key(sql, manifest_hash, whole_manifest=True) for sql in sqls
+        ]
+        results: list[str | WrenError | None] = [None] * len(sqls)
+        missed = []
+        for i, cache_key in enumerate(cache_keys):
+            results[i] = _planned_sql_cache.get(cache_key)
+            if results[i] is None:
+                missed.append(i)
+        trace.get_current_span().set_attribute(
+            "planned_sql_cache.hits", len(sqls) - len(missed)
+        )
+
+        if missed:
+            planned = await to_thread.run_sync(
+                self._rewrite_batch_sync, [sqls[i] for i in missed]
+            )
+            for i, dialect_sql in zip(missed, planned):
+                results[i] = dialect_sql
+                if isinstance(dialect_sql, str):
+                    _planned_sql_cache.put(cache_keys[i], dialect_sql)
+        return results
+
+    def _rewrite_batch_sync(self, sqls: list[str]) -> list[str | WrenError]:
+        results = self._rewriter.rewrite_batch_sync(
+            self.manifest_str, sqls, self.properties
+        )
+        if self.data_source is None:
+            return results
+        transpiled = []
+        for planned_sql in results:
+            try:
+                if isinstance(planned_sql, str):
+                    planned_sql = self._transpile(planned_sql)
+            except WrenError as e:
+                planned_sql = e
+            transpiled.append(planned_sql)
+        return transpiled
+
+    def _get_cache_key(
+        self,
+        sql: str,
+        manifest_hash: str | None = None,
+        whole_manifest: bool = False,
+    ) -> tuple | None:
+        # Only the embedded engine is cached. Its output is determined by the manifest,
+        # whether it's extracted for the SQL, the function list and the session variables.
+        if not isinstance(self._rewriter, EmbeddedEngineRewriter):
+            return None
+        return (
+            manifest_hash or get_manifest_hash(self.manifest_str),
+            whole_manifest,
+            sql,
+            self.data_source,
+            self._rewriter.function_path,
+            self._rewriter.get_session_properties(self.properties),
+        )
+
     @tracer.start_as_current_span("extract_manifest", kind=trace.SpanKind.INTERNAL)
     def _extract_manifest(self, manifest_str: str, sql: str) -> str:
         try:
@@ -162,6 +254,27 @@ class EmbeddedEngineRewriter:
         except Exception as e:
             raise WrenError(ErrorCode.INVALID_SQL, str(e), ErrorPhase.SQL_PLANNING)
 
+    def rewrite_batch_sync(
+        self, manifest_str: str, sqls: list[str], properties: dict | None = None
+    ) -> list[str | WrenError]:
+        try:
+            processed_properties = self.get_session_properties(properties)
+            session_context = get_session_context(
+                manifest_str, self.function_path, processed_properties
+            )
+        except Exception as e:
+            raise WrenError(ErrorCode.INVALID_SQL, str(e), ErrorPhase.SQL_PLANNING)
+
+        results = []
+        for sql in sqls:
+            try:
+                results.append(session_context.transform_sql(sql))
+            except Exception as e:
+                results.append(
+                    WrenError(ErrorCode.INVALID_SQL, str(e), ErrorPhase.SQL_PLANNING)
+                )
+        return results
+
     def get_session_properties(self, properties: dict) -> frozenset | None:
         if properties is None:
             return None
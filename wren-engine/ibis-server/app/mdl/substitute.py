@@ -1,12 +1,13 @@
 from collections import defaultdict
 
 from opentelemetry import trace
-from sqlglot import exp, parse_one
+from sqlglot import exp
 from sqlglot.optimizer.scope import build_scope
 
+from app.mdl.core import get_manifest_dict
+from app.mdl.transpile import parse_one
 from app.model.data_source import DataSource
 from app.model.error import ErrorCode, ErrorPhase, WrenError
-from app.util import base64_to_dict
 
 tracer = trace.get_tracer(__name__)
 
@@ -14,7 +15,7 @@ tracer = trace.get_tracer(__name__)
 class ModelSubstitute:
     def __init__(self, data_source: DataSource, manifest_str: str, headers=None):
         self.data_source = data_source
-        self.manifest = base64_to_dict(manifest_str)
+        self.manifest = get_manifest_dict(manifest_str)
         self.model_dict = self._build_model_dict(self.manifest["models"])
         self.model_dict_case_insensitive = self._build_case_insensitive_model_dict(
             self.manifest["models"]
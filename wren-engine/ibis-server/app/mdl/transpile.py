@@ -0,0 +1,56 @@
+import hashlib
+
+import sqlglot
+from opentelemetry import trace
+from sqlglot import exp
+
+from app.cache import LRUCache
+from app.config import get_config
+
+# sqlglot parses in pure Python, which costs milliseconds for a large planned SQL.
+# The results are shared by all the requests and the worker threads. The parsed
+# expressions are mutable, so only their copies are handed out.
+_transpile_cache: LRUCache[tuple, str] = LRUCache(get_config().transpile_cache_size)
+_parse_cache: LRUCache[tuple, exp.Expression] = LRUCache(
+    get_config().transpile_cache_size
+)
+
+Dialect = str | type[sqlglot.Dialect] | None
+
+
+def transpile(sql: str, read: Dialect, write: Dialect) -> str:
+    """Transpile the single statement SQL from the `read` to the `write` dialect."""
+    key = (_hash(sql), read, write)
+    transpiled = _transpile_cache.get(key)
+    trace.get_current_span().set_attribute(
+        "transpile_cache.hit", transpiled is not None
+    )
+    if transpiled is None:
+        transpiled = _transpile_cache.put(
+            key, sqlglot.transpile(sql, read=read, write=write)[0]
+        )
+    return transpiled
+
+
+def parse_one(sql: str, dialect: Dialect) -> exp.Expression:
+    """Parse the SQL into an expression the caller is free to modify."""
+    key = (_hash(sql), dialect)
+    ast = _parse_cache.get(key)
+    trace.get_current_span().set_attribute("parse_cache.hit", ast is not None)
+    if ast is None:
+        ast = _parse_cache.put(key, sqlglot.parse_one(sql, dialect=dialect))
+    return ast.copy()
+
+
+def get_transpile_cache_stats() -> dict[str, dict]:
+    return {
+        "transpile": {
+            **_transpile_cache.stats(),
+            "hit_ratio": _transpile_cache.hit_ratio(),
+        },
+        "parse": {**_parse_cache.stats(), "hit_ratio": _parse_cache.hit_ratio()},
+    }
+
+
+def _hash(sql: str) -> str:
+    return hashlib.sha256(sql.encode()).hexdigest()
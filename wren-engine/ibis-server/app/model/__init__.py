@@ -1,9 +1,9 @@
 from __future__ import annotations
 
 from enum import Enum
-from typing import Annotated, Any, Literal, Union
+from typing import Annotated, Any, Literal, Self, Union
 
-from pydantic import BaseModel, Field, SecretStr
+from pydantic import BaseModel, Field, SecretStr, model_validator
 
 manifest_str_field = Field(alias="manifestStr", description="Base64 manifest")
 connection_info_field = Field(alias="connectionInfo")
@@ -21,12 +21,37 @@ class BaseConnectionInfo(BaseModel):
         return "|".join(key_parts)
 
 
+class ManifestDTO(BaseModel):
+    """The manifest of a v3 request, given inline or by the id of a registered one."""
+
+    manifest_str: str | None = Field(
+        alias="manifestStr", default=None, description="Base64 manifest"
+    )
+    manifest_id: str | None = Field(
+        alias="manifestId",
+        default=None,
+        description="the id of the manifest registered by `POST /v3/manifests`",
+    )
+
+    @model_validator(mode="after")
+    def check_manifest(self) -> Self:
+        # The manifestId is resolved to the registered manifest by the router
+        if self.manifest_str is None and self.manifest_id is None:
+            raise ValueError("Either manifestStr or manifestId is required")
+        return self
+
+
 class QueryDTO(BaseModel):
     sql: str
     manifest_str: str = manifest_str_field
     connection_info: dict[str, Any] | ConnectionInfo = connection_info_field
 
 
+class QueryBatchDTO(ManifestDTO):
+    sqls: list[str]
+    connection_info: dict[str, Any] | ConnectionInfo = connection_info_field
+
+
 class QueryBigQueryDTO(QueryDTO):
     connection_info: BigQueryConnectionInfo = connection_info_field
 
@@ -514,12 +539,38 @@ class DryPlanDTO(BaseModel):
     sql: str
 
 
+class DryPlanBatchDTO(ManifestDTO):
+    sqls: list[str]
+
+
 class TranspileDTO(BaseModel):
     manifest_str: str = manifest_str_field
     connection_info: dict[str, Any] | ConnectionInfo = connection_info_field
     sql: str
 
 
+# The v3 requests may refer to a registered manifest by its id. The v2 APIs keep
+# requiring the manifestStr, they don't resolve the manifestId.
+class V3QueryDTO(ManifestDTO, QueryDTO):
+    pass
+
+
+class V3ValidateDTO(ManifestDTO, ValidateDTO):
+    pass
+
+
+class V3DryPlanDTO(ManifestDTO, DryPlanDTO):
+    pass
+
+
+class V3TranspileDTO(ManifestDTO, TranspileDTO):
+    pass
+
+
+class RegisterManifestDTO(BaseModel):
+    manifest_str: str = manifest_str_field
+
+
 class ConfigModel(BaseModel):
     diagnose: bool
 
@@ -0,0 +1,113 @@
+import asyncio
+import contextvars
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from opentelemetry import trace
+
+from app.config import get_config
+from app.model.data_source import DataSource
+from app.model.error import DataSourceBusyError
+
+
+class Bulkhead:
+    """A bounded executor for the blocking calls of one data source.
+
+    Every data source gets its own threads, so slow queries of one data source can't
+    starve the others in a shared thread pool. At most `max_workers` calls run at the
+    same time and at most `max_queue_size` calls wait for a thread. When the queue is
+    full, a call is rejected right away instead of waiting behind the slow ones.
+    """
+
+    def __init__(self, name: str, max_workers: int = 8, max_queue_size: int = 64):
+        self.name = name
+        self.max_workers = max_workers
+        self.max_queue_size = max_queue_size
+        self._executor = ThreadPoolExecutor(
+            max_workers, thread_name_prefix=f"bulkhead-{name}"
+        )
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._running = 0
+        self._rejected = 0
+
+    async def run(self, func, /, *args, **kwargs):
+        """Run the blocking function in the executor of the bulkhead.
+
+        The wait time in the queue is reported as the `bulkhead.queue_wait_ms`
+        attribute of the current span.
+        """
+        self._admit()
+        submitted_at = time.perf_counter()
+
+        def call():
+            queue_wait_ms = (time.perf_counter() - submitted_at) * 1000
+            trace.get_current_span().set_attribute(
+                "bulkhead.queue_wait_ms", queue_wait_ms
+            )
+            with self._lock:
+                self._running += 1
+            try:
+                return func(*args, **kwargs)
+            finally:
+                with self._lock:
+                    self._running -= 1
+
+        # Propagate the context to the thread like `asyncio.to_thread` does
+        context = contextvars.copy_context()
+        try:
+            future = self._executor.submit(context.run, call)
+        except BaseException:
+            self._release(None)
+            raise
+        # Release the slot when the call finishes or is cancelled before it starts
+        future.add_done_callback(self._release)
+        return await asyncio.wrap_future(future)
+
+    def _admit(self):
+        with self._lock:
+            if self._pending >= self.max_workers + self.max_queue_size:
+                self._rejected += 1
+                raise DataSourceBusyError(
+                    f"Too many concurrent requests to {self.name}, "
+                    f"{self.max_workers} are running and {self.max_queue_size} are waiting"
+                )
+            self._pending += 1
+
+    def _release(self, _future: Future | None):
+        with self._lock:
+            self._pending -= 1
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                "running": self._running,
+                "queued": self._pending - self._running,
+                "rejected": self._rejected,
+                "max_workers": self.max_workers,
+                "max_queue_size": self.max_queue_size,
+            }
+
+
+_bulkheads: dict[DataSource, Bulkhead] = {}
+_lock = threading.Lock()
+
+
+def get_bulkhead(data_source: DataSource) -> Bulkhead:
+    with _lock:
+        bulkhead = _bulkheads.get(data_source)
+        if bulkhead is None:
+            config = get_config()
+            bulkhead = _bulkheads[data_source] = Bulkhead(
+                str(data_source),
+                config.bulkhead_max_workers,
+                config.bulkhead_max_queue_size,
+            )
+        return bulkhead
+
+
+def get_bulkhead_stats() -> dict[str, dict[str, int]]:
+    with _lock:
+        bulkheads = dict(_bulkheads)
+    return {str(name): bulkhead.stats() for name, bulkhead in bulkheads.items()}
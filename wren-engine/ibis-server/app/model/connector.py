@@ -1,9 +1,8 @@
 import base64
 import importlib
-import os
 import time
+from collections.abc import Iterator
 from contextlib import closing, suppress
-from decimal import Decimal as PyDecimal
 from functools import cache
 from json import loads
 from typing import Any
@@ -21,46 +20,72 @@ except ImportError:  # pragma: no cover
 import ibis
 import ibis.expr.datatypes as dt
 import ibis.expr.schema as sch
-import opendal
 import pandas as pd
 import psycopg
 import pyarrow as pa
+import pyarrow.compute as pc
 import sqlglot.expressions as sge
 import trino
-from duckdb import HTTPException, IOException
+from google.api_core.exceptions import BadRequest
 from google.cloud import bigquery
 from google.oauth2 import service_account
 from ibis import BaseBackend
 from ibis.backends.sql.compilers.postgres import compiler as postgres_compiler
+from ibis.common.exceptions import IbisError
 from ibis.expr.datatypes import Decimal
 from ibis.expr.datatypes.core import UUID
 from ibis.expr.types import Table
 from loguru import logger
 from opentelemetry import trace
+from redshift_connector.utils.oids import RedshiftOID
 
 from app.model import (
     ConnectionInfo,
-    GcsFileConnectionInfo,
-    MinioFileConnectionInfo,
     RedshiftConnectionInfo,
     RedshiftConnectionUnion,
     RedshiftIAMConnectionInfo,
-    S3FileConnectionInfo,
 )
 from app.model.data_source import DataSource
+from app.model.duckdb_pool import get_duckdb_instance_pool
 from app.model.error import (
     DIALECT_SQL,
     ErrorCode,
     ErrorPhase,
     WrenError,
 )
-from app.model.utils import init_duckdb_gcs, init_duckdb_minio, init_duckdb_s3
 
 # Override datatypes of ibis
 importlib.import_module("app.custom_ibis.backends.sql.datatypes")
 
 tracer = trace.get_tracer(__name__)
 
+# The DB-API 2.0 errors raised for a bad statement, they leave the connection usable
+_QUERY_ERROR_NAMES = frozenset(
+    {"ProgrammingError", "DataError", "IntegrityError", "NotSupportedError"}
+)
+
+# The data sources queried over a stateless HTTP API, which have no session to lose.
+# A liveness query would be a billed query of its own.
+_STATELESS_DATA_SOURCES = frozenset({DataSource.athena, DataSource.bigquery})
+
+
+def is_query_error(e: BaseException | None) -> bool:
+    """Whether the error is caused by the statement rather than the connection.
+
+    The drivers don't share exception classes, but they follow the DB-API 2.0 names.
+    Network, authentication and session errors are raised as `OperationalError` or
+    `InterfaceError`, and any unknown error is treated as a connection failure.
+    """
+    if e is None:
+        return False
+    names = {cls.__name__ for cls in type(e).__mro__}
+    if "OperationalError" in names or "InterfaceError" in names:
+        return False
+    # ClickHouse raises the errors of the server as the base `DatabaseError`
+    if isinstance(e, ClickHouseDbError | BadRequest | IbisError):
+        return True
+    return not names.isdisjoint(_QUERY_ERROR_NAMES)
+
 
 @cache
 def _get_pg_type_names(connection: BaseBackend) -> dict[int, str]:
@@ -71,6 +96,7 @@ def _get_pg_type_names(connection: BaseBackend) -> dict[int, str]:
 class Connector:
     @tracer.start_as_current_span("connector_init", kind=trace.SpanKind.INTERNAL)
     def __init__(self, data_source: DataSource, connection_info: ConnectionInfo):
+        self.data_source = data_source
         if data_source == DataSource.mssql:
             self._connector = MSSqlConnector(connection_info)
         elif data_source == DataSource.canner:
@@ -92,8 +118,23 @@ class Connector:
             self._connector = SimpleConnector(data_source, connection_info)
 
     def query(self, sql: str, limit: int | None = None) -> pa.Table:
+        return self._execute(self._connector.query, sql, limit)
+
+    def query_batches(
+        self, sql: str, batch_size: int, limit: int | None = None
+    ) -> pa.RecordBatchReader:
+        """Execute the query and read the result in record batches of at most `batch_size` rows.
+
+        The connectors that can't fetch the result incrementally read the whole result
+        and split it into batches.
+        """
+        if hasattr(self._connector, "query_batches"):
+            return self._execute(self._connector.query_batches, sql, batch_size, limit)
+        return self.query(sql, limit).to_reader(max_chunksize=batch_size)
+
+    def _execute(self, query, sql: str, *args):
         try:
-            return self._connector.query(sql, limit)
+            return query(sql, *args)
         except (
             WrenError,
             TimeoutError,
@@ -161,6 +202,18 @@ class Connector:
                 metadata={DIALECT_SQL: sql},
             ) from e
 
+    def is_healthy(self) -> bool:
+        """Check whether the underlying connection can be reused."""
+        if not hasattr(self._connector, "is_healthy"):
+            return True
+        try:
+            return self._connector.is_healthy()
+        except Exception as e:
+            logger.debug(
+                f"Health check failed for {type(self._connector).__name__}: {e}"
+            )
+            return False
+
     def close(self) -> None:
         """Close the underlying connection."""
         if hasattr(self._connector, "close"):
@@ -185,6 +238,16 @@ class SimpleConnector:
         ibis_table = self._handle_pyarrow_unsupported_type(ibis_table)
         return ibis_table.to_pyarrow()
 
+    @tracer.start_as_current_span("connector_query", kind=trace.SpanKind.CLIENT)
+    def query_batches(
+        self, sql: str, batch_size: int, limit: int | None = None
+    ) -> pa.RecordBatchReader:
+        ibis_table = self.connection.sql(sql)
+        if limit is not None:
+            ibis_table = ibis_table.limit(limit)
+        ibis_table = self._handle_pyarrow_unsupported_type(ibis_table)
+        return ibis_table.to_pyarrow_batches(chunk_size=batch_size)
+
     def _handle_pyarrow_unsupported_type(self, ibis_table: Table, **kwargs) -> Table:
         result_table = ibis_table
         for name, dtype in ibis_table.schema().items():
@@ -220,6 +283,22 @@ class SimpleConnector:
     def dry_run(self, sql: str) -> None:
         self.connection.sql(sql)
 
+    def is_healthy(self) -> bool:
+        if self._closed or self.connection is None:
+            return False
+        if self.data_source in _STATELESS_DATA_SOURCES:
+            return True
+        # A round trip is the only way to find a dropped socket or an expired session
+        ping_sql = (
+            "SELECT 1 FROM DUAL"
+            if self.data_source == DataSource.oracle
+            else "SELECT 1"
+        )
+        result = self.connection.raw_sql(ping_sql)
+        if hasattr(result, "close"):
+            result.close()
+        return True
+
     def close(self) -> None:
         """Close the connection safely."""
         if self._closed or not hasattr(self, "connection") or self.connection is None:
@@ -254,6 +333,16 @@ class PostgresConnector(SimpleConnector):
     def __init__(self, connection_info):
         super().__init__(DataSource.postgres, connection_info)
 
+    def is_healthy(self) -> bool:
+        con = getattr(self.connection, "con", None)
+        if (
+            con is None
+            or getattr(con, "closed", False)
+            or getattr(con, "broken", False)
+        ):
+            return False
+        return super().is_healthy()
+
     def close(self) -> None:
         """Safely close postgres connection to prevent segfault."""
         if self._closed or not hasattr(self, "connection") or self.connection is None:
@@ -303,31 +392,59 @@ class MSSqlConnector(SimpleConnector):
         ibis_table = self.connection.sql(sql)
         if limit is not None:
             ibis_table = ibis_table.limit(limit)
-        return self._round_decimal_columns(ibis_table)
+        table = ibis_table.to_pyarrow()
+        schema = self._round_decimal_schema(table.schema)
+        if schema == table.schema:
+            return table
+        return self._round_decimal_columns(table, schema)
 
-    def _round_decimal_columns(self, ibis_table: Table, scale: int = 9) -> pa.Table:
-        def round_decimal(val):
-            if val is None:
-                return None
-            d = PyDecimal(str(val))
-            quant = PyDecimal("1." + "0" * scale)
-            return d.quantize(quant)
-
-        decimal_columns = []
-        for name, dtype in ibis_table.schema().items():
-            if isinstance(dtype, Decimal):
-                decimal_columns.append(name)
-
-        # If no decimal columns, return original table unchanged
-        if not decimal_columns:
-            return ibis_table.to_pyarrow()
+    @tracer.start_as_current_span("connector_query", kind=trace.SpanKind.CLIENT)
+    def query_batches(
+        self, sql: str, batch_size: int, limit: int | None = None
+    ) -> pa.RecordBatchReader:
+        ibis_table = self.connection.sql(sql)
+        if limit is not None:
+            ibis_table = ibis_table.limit(limit)
+        reader = ibis_table.to_pyarrow_batches(chunk_size=batch_size)
+        schema = self._round_decimal_schema(reader.schema)
+        if schema == reader.schema:
+            return reader
+        return pa.RecordBatchReader.from_batches(
+            schema, (self._round_decimal_columns(batch, schema) for batch in reader)
+        )
 
-        pandas_df = ibis_table.to_pandas()
-        for col_name in decimal_columns:
-            pandas_df[col_name] = pandas_df[col_name].apply(round_decimal)
+    @staticmethod
+    def _round_decimal_schema(schema: pa.Schema, scale: int = 9) -> pa.Schema:
+        """Get the schema whose decimal columns are rounded to `scale` digits.
+
+        The integer digits are kept, so the scale is lower if the precision would
+        exceed 38 digits.
+        """
+        for i, field in enumerate(schema):
+            if pa.types.is_decimal(field.type):
+                integer_digits = field.type.precision - field.type.scale
+                field_scale = min(scale, 38 - integer_digits)
+                schema = schema.set(
+                    i,
+                    field.with_type(
+                        pa.decimal128(integer_digits + field_scale, field_scale)
+                    ),
+                )
+        return schema
 
-        arrow_table = pa.Table.from_pandas(pandas_df)
-        return arrow_table
+    @staticmethod
+    def _round_decimal_columns(
+        data: pa.Table | pa.RecordBatch, schema: pa.Schema
+    ) -> pa.Table | pa.RecordBatch:
+        columns = []
+        for column, field in zip(data.columns, schema):
+            if column.type != field.type:
+                # Round half to even like `Decimal.quantize`
+                if column.type.scale > field.type.scale:
+                    column = pc.round(column, field.type.scale)
+                column = column.cast(field.type)
+            columns.append(column)
+        return type(data).from_arrays(columns, schema=schema)
 
     def dry_run(self, sql: str) -> None:
         try:
@@ -375,6 +492,17 @@ class CannerConnector:
         ibis_table = self._handle_pyarrow_unsupported_type(ibis_table)
         return ibis_table.to_pyarrow()
 
+    @tracer.start_as_current_span("connector_query", kind=trace.SpanKind.CLIENT)
+    def query_batches(
+        self, sql: str, batch_size: int, limit: int | None = None
+    ) -> pa.RecordBatchReader:
+        schema = self._get_schema(sql)
+        ibis_table = self.connection.sql(sql, schema=schema)
+        if limit is not None:
+            ibis_table = ibis_table.limit(limit)
+        ibis_table = self._handle_pyarrow_unsupported_type(ibis_table)
+        return ibis_table.to_pyarrow_batches(chunk_size=batch_size)
+
     def _handle_pyarrow_unsupported_type(self, ibis_table: Table, **kwargs) -> Table:
         result_table = ibis_table
         for name, dtype in ibis_table.schema().items():
@@ -396,6 +524,17 @@ class CannerConnector:
         # Canner enterprise does not support dry-run, so we have to query with limit zero
         return self.connection.raw_sql(f"SELECT * FROM ({sql}) LIMIT 0")
 
+    def is_healthy(self) -> bool:
+        con = getattr(self.connection, "con", None)
+        if (
+            con is None
+            or getattr(con, "closed", False)
+            or getattr(con, "broken", False)
+        ):
+            return False
+        self.connection.raw_sql("SELECT 1").close()
+        return True
+
     def close(self) -> None:
         """Close the Canner connection."""
         try:
@@ -472,86 +611,72 @@ class BigQueryConnector(SimpleConnector):
 
 class DuckDBConnector:
     def __init__(self, connection_info: ConnectionInfo):
-        import duckdb  # noqa: PLC0415
-
-        self.connection = duckdb.connect()
-        if isinstance(connection_info, S3FileConnectionInfo):
-            init_duckdb_s3(self.connection, connection_info)
-        if isinstance(connection_info, MinioFileConnectionInfo):
-            init_duckdb_minio(self.connection, connection_info)
-        if isinstance(connection_info, GcsFileConnectionInfo):
-            init_duckdb_gcs(self.connection, connection_info)
-
-        if connection_info.format == "duckdb":
-            # For duckdb format, we attach the database files
-            self._attach_database(connection_info)
+        # The secrets and the attached databases are set up once per connection
+        # info, every connector runs on its own cursor of the shared instance
+        self._instance_pool = get_duckdb_instance_pool()
+        self._instance = self._instance_pool.acquire(connection_info)
+        self._closed = False
+        try:
+            self.connection = self._instance.cursor()
+        except BaseException:
+            self._instance_pool.release(self._instance)
+            raise
 
     @tracer.start_as_current_span("duckdb_query", kind=trace.SpanKind.INTERNAL)
     def query(self, sql: str, limit: int | None) -> pa.Table:
-        if limit is None:
-            # If no limit is specified, we return the full result
-            return self.connection.execute(sql).fetch_arrow_table()
-        else:
-            # If a limit is specified, we slice the result
-            # DuckDB does not support LIMIT in fetch_arrow_table, so we use slice
-            # to limit the number of rows returned
-            return self.connection.execute(sql).fetch_arrow_table().slice(length=limit)
+        # The limit is pushed into the SQL, so DuckDB stops scanning the files once
+        # it has enough rows instead of reading the whole result
+        return self.connection.execute(_limit_sql(sql, limit)).fetch_arrow_table()
+
+    @tracer.start_as_current_span("duckdb_query", kind=trace.SpanKind.INTERNAL)
+    def query_batches(
+        self, sql: str, batch_size: int, limit: int | None = None
+    ) -> pa.RecordBatchReader:
+        return self.connection.execute(_limit_sql(sql, limit)).fetch_record_batch(
+            batch_size
+        )
 
     @tracer.start_as_current_span("duckdb_dry_run", kind=trace.SpanKind.INTERNAL)
     def dry_run(self, sql: str) -> None:
         self.connection.execute(sql)
 
-    def _attach_database(self, connection_info: ConnectionInfo) -> None:
-        db_files = self._list_duckdb_files(connection_info)
-        if not db_files:
-            raise WrenError(
-                ErrorCode.DUCKDB_FILE_NOT_FOUND,
-                "No DuckDB files found in the specified path.",
-            )
-
-        for file in db_files:
-            try:
-                self.connection.execute(
-                    f"ATTACH DATABASE '{file}' AS \"{os.path.splitext(os.path.basename(file))[0]}\" (READ_ONLY);"
-                )
-            except IOException as e:
-                raise WrenError(
-                    ErrorCode.ATTACH_DUCKDB_ERROR, f"Failed to attach database: {e!s}"
-                )
-            except HTTPException as e:
-                raise WrenError(
-                    ErrorCode.ATTACH_DUCKDB_ERROR, f"Failed to attach database: {e!s}"
-                )
-
-    def _list_duckdb_files(self, connection_info: ConnectionInfo) -> list[str]:
-        # This method should return a list of file paths in the DuckDB database
-        op = opendal.Operator("fs", root=connection_info.url.get_secret_value())
-        files = []
-        try:
-            for file in op.list("/"):
-                if file.path != "/":
-                    stat = op.stat(file.path)
-                    if not stat.mode.is_dir() and file.path.endswith(".duckdb"):
-                        full_path = (
-                            f"{connection_info.url.get_secret_value()}/{file.path}"
-                        )
-                        files.append(full_path)
-        except Exception as e:
-            raise WrenError(
-                ErrorCode.GENERIC_USER_ERROR, f"Failed to list files: {e!s}"
-            )
-
-        return files
+    def is_healthy(self) -> bool:
+        # DuckDB is in-process, so a trivial query is a cheap liveness check
+        self.connection.execute("SELECT 1").fetchall()
+        return True
 
     def close(self) -> None:
-        """Close the DuckDB connection."""
+        """Close the cursor and release the shared DuckDB instance.
+
+        It may be called again, e.g. by the pool after a timeout has closed the
+        connector, and the instance is released only once.
+        """
+        if self._closed:
+            return
+        self._closed = True
         try:
             self.connection.close()
         except Exception as e:
             logger.warning(f"Error closing DuckDB connection: {e}")
+        finally:
+            self._instance_pool.release(self._instance)
+
+
+def _limit_sql(sql: str, limit: int | None) -> str:
+    if limit is None:
+        return sql
+    # A statement terminator isn't allowed in a subquery, and the closing
+    # parenthesis is on its own line in case the SQL ends with a line comment
+    sql = sql.rstrip()
+    while sql.endswith(";"):
+        sql = sql[:-1].rstrip()
+    return f"SELECT * FROM ({sql}\n) AS sub LIMIT {limit}"
 
 
 class RedshiftConnector:
+    # The number of rows fetched and converted at a time
+    fetch_size = 10000
+
     def __init__(self, connection_info: RedshiftConnectionUnion):
         import redshift_connector  # noqa: PLC0415
 
@@ -582,26 +707,135 @@ class RedshiftConnector:
         # Enable autocommit to prevent holding AccessShareLock indefinitely
         # This ensures locks are released immediately after query execution
         self.connection.autocommit = True
+        self._closed = False
 
     @tracer.start_as_current_span("connector_query", kind=trace.SpanKind.CLIENT)
     def query(self, sql: str, limit: int | None = None) -> pa.Table:
-        with closing(self.connection.cursor()) as cursor:
+        return self.query_batches(sql, self.fetch_size, limit).read_all()
+
+    @tracer.start_as_current_span("connector_query", kind=trace.SpanKind.CLIENT)
+    def query_batches(
+        self, sql: str, batch_size: int, limit: int | None = None
+    ) -> pa.RecordBatchReader:
+        """Execute the query and convert the rows to Arrow in batches of `batch_size` rows.
+
+        The limit is pushed into the SQL, and the rows are fetched with `fetchmany`, so
+        only one batch of Python rows is converted at a time. The column types come
+        from the row description, so every batch has the same schema. The columns of
+        the other types are converted to strings.
+        """
+        sql = _limit_sql(sql, limit)
+        cursor = self.connection.cursor()
+        try:
             cursor.execute(sql)
-            cols = [desc[0] for desc in cursor.description]
-            rows = cursor.fetchall()
-            df = pd.DataFrame(rows, columns=cols)
-            if limit is not None:
-                df = df.head(limit)
-            return pa.Table.from_pandas(df)
+            schema, stringified = self._to_arrow_schema(cursor)
+        except BaseException:
+            cursor.close()
+            raise
+        return pa.RecordBatchReader.from_batches(
+            schema, self._fetch_batches(cursor, schema, stringified, batch_size)
+        )
+
+    @staticmethod
+    def _fetch_batches(
+        cursor, schema: pa.Schema, stringified: list[bool], batch_size: int
+    ) -> Iterator[pa.RecordBatch]:
+        with closing(cursor):
+            while rows := cursor.fetchmany(batch_size):
+                columns = list(zip(*rows))
+                yield pa.RecordBatch.from_arrays(
+                    [
+                        pa.array(
+                            [None if v is None else str(v) for v in column]
+                            if stringify
+                            else column,
+                            type=field.type,
+                        )
+                        for column, field, stringify in zip(
+                            columns, schema, stringified
+                        )
+                    ],
+                    schema=schema,
+                )
+                if len(rows) < batch_size:
+                    break
+
+    @classmethod
+    def _to_arrow_schema(cls, cursor) -> tuple[pa.Schema, list[bool]]:
+        fields = []
+        stringified = []
+        # The row description of redshift_connector doesn't include the type modifier
+        for desc, row_desc in zip(cursor.description, cursor.ps["row_desc"]):
+            data_type = cls._to_arrow_type(desc[1], row_desc["type_modifier"])
+            stringified.append(data_type is None)
+            fields.append(pa.field(desc[0], data_type or pa.string()))
+        return pa.schema(fields), stringified
+
+    @staticmethod
+    def _to_arrow_type(type_oid: int, type_modifier: int) -> pa.DataType | None:
+        match type_oid:
+            case RedshiftOID.SMALLINT:
+                return pa.int16()
+            case RedshiftOID.INTEGER:
+                return pa.int32()
+            case RedshiftOID.BIGINT:
+                return pa.int64()
+            case RedshiftOID.REAL:
+                return pa.float32()
+            case RedshiftOID.FLOAT:
+                return pa.float64()
+            case RedshiftOID.BOOLEAN:
+                return pa.bool_()
+            case RedshiftOID.NUMERIC if type_modifier >= 4:
+                # The type modifier is ((precision << 16) | scale) + 4
+                type_modifier -= 4
+                return pa.decimal128(type_modifier >> 16, type_modifier & 0xFFFF)
+            case RedshiftOID.DATE:
+                return pa.date32()
+            case RedshiftOID.TIMESTAMP:
+                return pa.timestamp("ns")
+            case RedshiftOID.TIMESTAMPTZ:
+                return pa.timestamp("ns", tz="UTC")
+            case RedshiftOID.TIME | RedshiftOID.TIMETZ:
+                return pa.time64("us")
+            case RedshiftOID.BYTES:
+                return pa.binary()
+            # The driver decodes these types to strings
+            case (
+                RedshiftOID.CHAR
+                | RedshiftOID.BPCHAR
+                | RedshiftOID.STRING
+                | RedshiftOID.TEXT
+                | RedshiftOID.NAME
+                | RedshiftOID.UNKNOWN
+                | RedshiftOID.SUPER
+                | RedshiftOID.VARBYTE
+                | RedshiftOID.GEOMETRY
+                | RedshiftOID.GEOMETRYHEX
+                | RedshiftOID.GEOGRAPHY
+            ):
+                return pa.string()
+            case _:
+                return None
 
     @tracer.start_as_current_span("connector_dry_run", kind=trace.SpanKind.CLIENT)
     def dry_run(self, sql: str) -> None:
         with closing(self.connection.cursor()) as cursor:
             cursor.execute(f"SELECT * FROM ({sql}) AS sub LIMIT 0")
 
+    def is_healthy(self) -> bool:
+        if self._closed:
+            return False
+        with closing(self.connection.cursor()) as cursor:
+            cursor.execute("SELECT 1")
+            cursor.fetchall()
+        return True
+
     def close(self) -> None:
         """Close the Redshift connection."""
         try:
             self.connection.close()
         except Exception as e:
             logger.warning(f"Error closing Redshift connection: {e}")
+        finally:
+            self._closed = True
@@ -0,0 +1,193 @@
+import hashlib
+import threading
+import time
+from collections import deque
+from collections.abc import Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass
+
+from loguru import logger
+from opentelemetry import trace
+
+from app.model import ConnectionInfo
+from app.model.connector import Connector, is_query_error
+from app.model.data_source import DataSource
+from app.model.error import DatabaseTimeoutError, DataSourceBusyError, WrenError
+
+tracer = trace.get_tracer(__name__)
+
+
+@dataclass
+class _IdleConnector:
+    connector: Connector
+    last_used: float
+
+
+class ConnectorPool:
+    """A process-wide pool of `Connector` instances.
+
+    Connectors are keyed by the data source and the connection info, so requests
+    with the same credentials and session settings reuse an open connection instead
+    of paying the connection setup (TLS handshake, authentication) every time.
+
+    A connector is checked out exclusively by one request. At most `max_size` idle
+    connectors are kept per key, connectors that stay idle longer than
+    `idle_timeout_seconds` are closed, and a connector is health-checked with a round
+    trip before it is handed out again. Setting `max_size` to 0 disables pooling.
+
+    The pool doesn't cap the connectors in use. A new connector is opened whenever
+    all the pooled ones of the key are checked out, so their number follows the
+    concurrent requests of the key.
+    """
+
+    def __init__(self, max_size: int = 8, idle_timeout_seconds: int = 300):
+        self.max_size = max_size
+        self.idle_timeout_seconds = idle_timeout_seconds
+        self._idle: dict[str, deque[_IdleConnector]] = {}
+        self._in_use: dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    @contextmanager
+    def acquire(
+        self, data_source: DataSource, connection_info: ConnectionInfo
+    ) -> Iterator[Connector]:
+        key = self._generate_pool_key(data_source, connection_info)
+        connector = self._checkout(key, data_source, connection_info)
+        discard = False
+        try:
+            yield connector
+        except DataSourceBusyError:
+            # Rejected by the bulkhead before the connector was used, discarding it
+            # would churn the connections exactly when the data source is overloaded
+            raise
+        except DatabaseTimeoutError:
+            # The timeout handler has already closed the connector, and the query
+            # thread may still be running on it, so it's never handed out again
+            discard = True
+            raise
+        except WrenError as e:
+            discard = not self._is_reusable_after(e)
+            raise
+        except BaseException:
+            discard = True
+            raise
+        finally:
+            self._checkin(key, connector, discard)
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+                "idle": sum(len(idle) for idle in self._idle.values()),
+                "in_use": sum(self._in_use.values()),
+            }
+
+    def close_all(self) -> None:
+        with self._lock:
+            idle_connectors = [
+                idle.connector for pool in self._idle.values() for idle in pool
+            ]
+            self._idle.clear()
+        for connector in idle_connectors:
+            self._close(connector)
+
+    @tracer.start_as_current_span(
+        "connector_pool_checkout", kind=trace.SpanKind.INTERNAL
+    )
+    def _checkout(
+        self, key: str, data_source: DataSource, connection_info: ConnectionInfo
+    ) -> Connector:
+        span = trace.get_current_span()
+        self._evict_expired()
+        while True:
+            with self._lock:
+                pool = self._idle.get(key)
+                idle = pool.pop() if pool else None
+                if idle is None:
+                    self._misses += 1
+                    self._in_use[key] = self._in_use.get(key, 0) + 1
+                    break
+            if idle.connector.is_healthy():
+                with self._lock:
+                    self._hits += 1
+                    self._in_use[key] = self._in_use.get(key, 0) + 1
+                span.set_attribute("connector_pool.hit", True)
+                return idle.connector
+            logger.debug("Evict unhealthy pooled connector for {}", data_source)
+            with self._lock:
+                self._evictions += 1
+            self._close(idle.connector)
+
+        span.set_attribute("connector_pool.hit", False)
+        try:
+            return Connector(data_source, connection_info)
+        except BaseException:
+            with self._lock:
+                self._release_in_use(key)
+            raise
+
+    def _checkin(self, key: str, connector: Connector, discard: bool) -> None:
+        # The liveness is checked on the next checkout, not after every request
+        reusable = not discard and self.max_size > 0
+        with self._lock:
+            self._release_in_use(key)
+            pool = self._idle.setdefault(key, deque())
+            if reusable and len(pool) < self.max_size:
+                pool.append(_IdleConnector(connector, time.monotonic()))
+                return
+            if not pool:
+                del self._idle[key]
+            self._evictions += 1
+        self._close(connector)
+
+    def _evict_expired(self) -> None:
+        deadline = time.monotonic() - self.idle_timeout_seconds
+        expired = []
+        with self._lock:
+            for key in list(self._idle):
+                pool = self._idle[key]
+                # The oldest connectors are at the left side of the deque
+                while pool and pool[0].last_used < deadline:
+                    expired.append(pool.popleft().connector)
+                if not pool:
+                    del self._idle[key]
+            self._evictions += len(expired)
+        for connector in expired:
+            self._close(connector)
+
+    @staticmethod
+    def _is_reusable_after(e: WrenError) -> bool:
+        # The connector wraps every driver error, so the original error tells a bad
+        # statement from a dropped socket, an expired session or an auth failure.
+        if e.__cause__ is not None:
+            return is_query_error(e.__cause__)
+        # Raised by the server itself, e.g. a validation error, without a driver error
+        return e.error_code.value < 100
+
+    def _release_in_use(self, key: str) -> None:
+        count = self._in_use.get(key, 0) - 1
+        if count > 0:
+            self._in_use[key] = count
+        else:
+            self._in_use.pop(key, None)
+
+    @staticmethod
+    def _close(connector: Connector) -> None:
+        try:
+            connector.close()
+        except Exception as e:
+            logger.warning(f"Error closing pooled connector: {e}")
+
+    @staticmethod
+    def _generate_pool_key(
+        data_source: DataSource, connection_info: ConnectionInfo
+    ) -> str:
+        # The non-secret fields (e.g. the statement timeout options derived from the
+        # headers) also affect the connection, so they are part of the key.
+        key_string = f"{data_source}|{connection_info.to_key_string()}|{connection_info.model_dump_json()}"
+        return hashlib.sha256(key_string.encode()).hexdigest()
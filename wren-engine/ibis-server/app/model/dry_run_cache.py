@@ -0,0 +1,142 @@
+import hashlib
+import threading
+import time
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+
+from opentelemetry import trace
+
+from app.cache import LRUCache
+from app.config import get_config
+from app.dependencies import X_WREN_VARIABLE_PREFIX
+from app.mdl.core import get_manifest_hash
+from app.model import ConnectionInfo
+from app.model.connector import is_query_error
+from app.model.data_source import DataSource
+from app.model.error import ErrorCode, WrenError
+
+# The errors caused by the SQL or the manifest, which a retry won't fix
+_CACHEABLE_ERROR_CODES = frozenset(
+    {
+        ErrorCode.NOT_FOUND,
+        ErrorCode.INVALID_SQL,
+        ErrorCode.INVALID_MDL,
+    }
+)
+
+
+@dataclass
+class _DryRunOutcome:
+    error: WrenError | None
+    created_at: float
+
+
+class DryRunCache:
+    """A cache of the dry-run outcomes keyed by the manifest, the connection info and the SQL.
+
+    Both a successful dry run and an error caused by the SQL or the manifest are
+    cached for `ttl_seconds`, so a client validating the same SQL repeatedly skips
+    the planning and the round trip to the data source. Timeouts and the errors of
+    the data source are never cached. Setting `ttl_seconds` to 0 disables the cache.
+    """
+
+    def __init__(self, ttl_seconds: int = 30, capacity: int = 1024):
+        self.ttl_seconds = ttl_seconds
+        self._outcomes: LRUCache[str, _DryRunOutcome] = LRUCache(capacity)
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    async def dry_run(
+        self,
+        version: str,
+        manifest_str: str,
+        data_source: DataSource,
+        connection_info: ConnectionInfo,
+        sql: str,
+        headers: dict[str, str] | None,
+        run: Callable[[], Awaitable[None]],
+    ) -> bool:
+        """Dry run the SQL by `run` unless its outcome is cached.
+
+        Returns whether the outcome was cached. A cached error is raised again.
+        """
+        if self.ttl_seconds <= 0:
+            await run()
+            return False
+
+        span = trace.get_current_span()
+        key = self._generate_cache_key(
+            version, manifest_str, data_source, connection_info, sql, headers
+        )
+        outcome = self._outcomes.get(key)
+        if outcome is not None and time.time() - outcome.created_at < self.ttl_seconds:
+            with self._lock:
+                self._hits += 1
+            span.set_attribute("dry_run_cache.hit", True)
+            if outcome.error is not None:
+                error = outcome.error
+                raise WrenError(
+                    error.error_code,
+                    error.message,
+                    phase=error.phase,
+                    metadata=error.metadata,
+                )
+            return True
+
+        with self._lock:
+            self._misses += 1
+        span.set_attribute("dry_run_cache.hit", False)
+        try:
+            await run()
+        except WrenError as e:
+            if self._is_cacheable(e):
+                self._outcomes.set(key, _DryRunOutcome(e, time.time()))
+            raise
+        self._outcomes.set(key, _DryRunOutcome(None, time.time()))
+        return False
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "size": self._outcomes.stats()["size"],
+            }
+
+    @staticmethod
+    def _is_cacheable(e: WrenError) -> bool:
+        if e.error_code in _CACHEABLE_ERROR_CODES:
+            return True
+        # The connector wraps every driver error as a generic user error, so only
+        # the original error tells a bad statement from a connection failure.
+        return e.error_code == ErrorCode.GENERIC_USER_ERROR and is_query_error(
+            e.__cause__
+        )
+
+    @staticmethod
+    def _generate_cache_key(
+        version: str,
+        manifest_str: str,
+        data_source: DataSource,
+        connection_info: ConnectionInfo,
+        sql: str,
+        headers: dict[str, str] | None,
+    ) -> str:
+        # Only the session variables change how the SQL is planned
+        variables = sorted(
+            (k.lower(), str(v))
+            for k, v in (headers or {}).items()
+            if k.lower().startswith(X_WREN_VARIABLE_PREFIX)
+        )
+        key_string = f"{version}|{get_manifest_hash(manifest_str)}|{data_source}|{connection_info.to_key_string()}|{variables}|{sql}"
+        return hashlib.sha256(key_string.encode()).hexdigest()
+
+
+_dry_run_cache = DryRunCache(
+    get_config().dry_run_cache_ttl_seconds, get_config().dry_run_cache_size
+)
+
+
+def get_dry_run_cache() -> DryRunCache:
+    return _dry_run_cache
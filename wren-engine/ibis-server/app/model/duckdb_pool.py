@@ -0,0 +1,246 @@
+import hashlib
+import os
+import tempfile
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+
+import duckdb
+import opendal
+from duckdb import DuckDBPyConnection, HTTPException, IOException
+from loguru import logger
+from opentelemetry import trace
+
+from app.config import get_config
+from app.model import (
+    ConnectionInfo,
+    GcsFileConnectionInfo,
+    MinioFileConnectionInfo,
+    S3FileConnectionInfo,
+)
+from app.model.error import ErrorCode, WrenError
+from app.model.utils import init_duckdb_gcs, init_duckdb_minio, init_duckdb_s3
+
+tracer = trace.get_tracer(__name__)
+
+
+class DuckDBInstance:
+    """A warm DuckDB database shared by the requests with the same connection info.
+
+    The secrets are created and the database files are attached once. The requests
+    run on their own cursors, which share the catalog and the caches of the instance.
+    The default database is an empty read-only file and the configuration is locked
+    after the setup, so the SQL of a request can't create tables or change settings
+    seen by the later requests. Temporary tables are dropped with the cursor.
+    """
+
+    def __init__(
+        self, connection: DuckDBPyConnection, catalog_dir: tempfile.TemporaryDirectory
+    ):
+        self.connection = connection
+        self.catalog_dir = catalog_dir
+        self.active = 0
+        self.last_used = time.monotonic()
+
+    def cursor(self) -> DuckDBPyConnection:
+        return self.connection.cursor()
+
+    def close(self) -> None:
+        try:
+            self.connection.close()
+        except Exception as e:
+            logger.warning(f"Error closing DuckDB instance: {e}")
+        self.catalog_dir.cleanup()
+
+
+class DuckDBInstancePool:
+    """A process-wide pool of `DuckDBInstance` for the file-based data sources.
+
+    Instances are keyed by the connection info. An instance is closed once it has
+    no active cursor and stays idle longer than `idle_timeout_seconds`, so new files
+    in the directory are picked up by the next instance.
+    """
+
+    def __init__(self, idle_timeout_seconds: int = 300):
+        self.idle_timeout_seconds = idle_timeout_seconds
+        self._instances: dict[str, DuckDBInstance] = {}
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    @tracer.start_as_current_span(
+        "duckdb_instance_acquire", kind=trace.SpanKind.INTERNAL
+    )
+    def acquire(self, connection_info: ConnectionInfo) -> DuckDBInstance:
+        """Get the instance of the connection info and mark it in use.
+
+        The caller must `release` the instance when its cursor is closed.
+        """
+        span = trace.get_current_span()
+        key = self._generate_instance_key(connection_info)
+        self._evict_expired()
+        with self._lock:
+            instance = self._instances.get(key)
+            if instance is not None:
+                self._hits += 1
+                instance.active += 1
+                span.set_attribute("duckdb_instance.hit", True)
+                return instance
+
+        span.set_attribute("duckdb_instance.hit", False)
+        # Initialize it outside the lock, listing and attaching the files may be slow
+        created = _connect(connection_info)
+        with self._lock:
+            self._misses += 1
+            instance = self._instances.setdefault(key, created)
+            instance.active += 1
+        if instance is not created:
+            # Another request initialized the same instance at the same time
+            created.close()
+        return instance
+
+    def release(self, instance: DuckDBInstance) -> None:
+        with self._lock:
+            if instance.active <= 0:
+                # An unbalanced release would let the instance be evicted while
+                # another cursor is still running on it
+                logger.warning("Release DuckDB instance without an active cursor")
+                return
+            instance.active -= 1
+            instance.last_used = time.monotonic()
+
+    @contextmanager
+    def cursor(self, connection_info: ConnectionInfo) -> Iterator[DuckDBPyConnection]:
+        instance = self.acquire(connection_info)
+        try:
+            cursor = instance.cursor()
+        except BaseException:
+            self.release(instance)
+            raise
+        try:
+            yield cursor
+        finally:
+            cursor.close()
+            self.release(instance)
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+                "instances": len(self._instances),
+                "active": sum(i.active for i in self._instances.values()),
+            }
+
+    def close_all(self) -> None:
+        with self._lock:
+            instances = list(self._instances.values())
+            self._instances.clear()
+        for instance in instances:
+            instance.close()
+
+    def _evict_expired(self) -> None:
+        deadline = time.monotonic() - self.idle_timeout_seconds
+        with self._lock:
+            expired = [
+                key
+                for key, instance in self._instances.items()
+                if instance.active == 0 and instance.last_used < deadline
+            ]
+            instances = [self._instances.pop(key) for key in expired]
+            self._evictions += len(instances)
+        for instance in instances:
+            instance.close()
+
+    @staticmethod
+    def _generate_instance_key(connection_info: ConnectionInfo) -> str:
+        key_string = f"{type(connection_info).__name__}|{connection_info.to_key_string()}|{connection_info.model_dump_json()}"
+        return hashlib.sha256(key_string.encode()).hexdigest()
+
+
+def _connect(connection_info: ConnectionInfo) -> DuckDBInstance:
+    # An in-memory database can't be read-only, and every instance needs its own
+    # file because DuckDB shares the database of the same path in the process
+    catalog_dir = tempfile.TemporaryDirectory(prefix="wren-duckdb-")
+    catalog_path = os.path.join(catalog_dir.name, "catalog.duckdb")
+    try:
+        duckdb.connect(catalog_path).close()
+        connection = duckdb.connect(
+            catalog_path, read_only=True, config={"enable_object_cache": True}
+        )
+    except BaseException:
+        catalog_dir.cleanup()
+        raise
+    try:
+        # Keep the footer and the row group metadata of the parquet files in memory
+        connection.execute("SET parquet_metadata_cache=true")
+        if isinstance(connection_info, S3FileConnectionInfo):
+            init_duckdb_s3(connection, connection_info)
+        if isinstance(connection_info, MinioFileConnectionInfo):
+            init_duckdb_minio(connection, connection_info)
+        if isinstance(connection_info, GcsFileConnectionInfo):
+            init_duckdb_gcs(connection, connection_info)
+
+        if connection_info.format == "duckdb":
+            # For duckdb format, we attach the database files
+            _attach_database(connection, connection_info)
+        connection.execute("SET lock_configuration=true")
+    except BaseException:
+        connection.close()
+        catalog_dir.cleanup()
+        raise
+    return DuckDBInstance(connection, catalog_dir)
+
+
+def _attach_database(
+    connection: DuckDBPyConnection, connection_info: ConnectionInfo
+) -> None:
+    db_files = _list_duckdb_files(connection_info)
+    if not db_files:
+        raise WrenError(
+            ErrorCode.DUCKDB_FILE_NOT_FOUND,
+            "No DuckDB files found in the specified path.",
+        )
+
+    for file in db_files:
+        try:
+            connection.execute(
+                f"ATTACH DATABASE '{file}' AS \"{os.path.splitext(os.path.basename(file))[0]}\" (READ_ONLY);"
+            )
+        except IOException as e:
+            raise WrenError(
+                ErrorCode.ATTACH_DUCKDB_ERROR, f"Failed to attach database: {e!s}"
+            )
+        except HTTPException as e:
+            raise WrenError(
+                ErrorCode.ATTACH_DUCKDB_ERROR, f"Failed to attach database: {e!s}"
+            )
+
+
+def _list_duckdb_files(connection_info: ConnectionInfo) -> list[str]:
+    # This method should return a list of file paths in the DuckDB database
+    op = opendal.Operator("fs", root=connection_info.url.get_secret_value())
+    files = []
+    try:
+        for file in op.list("/"):
+            if file.path != "/":
+                stat = op.stat(file.path)
+                if not stat.mode.is_dir() and file.path.endswith(".duckdb"):
+                    full_path = f"{connection_info.url.get_secret_value()}/{file.path}"
+                    files.append(full_path)
+    except Exception as e:
+        raise WrenError(ErrorCode.GENERIC_USER_ERROR, f"Failed to list files: {e!s}")
+
+    return files
+
+
+_duckdb_instance_pool = DuckDBInstancePool(
+    get_config().duckdb_instance_idle_timeout_seconds
+)
+
+
+def get_duckdb_instance_pool() -> DuckDBInstancePool:
+    return _duckdb_instance_pool
@@ -9,6 +9,7 @@ from starlette.status import (
     HTTP_500_INTERNAL_SERVER_ERROR,
     HTTP_501_NOT_IMPLEMENTED,
     HTTP_502_BAD_GATEWAY,
+    HTTP_503_SERVICE_UNAVAILABLE,
     HTTP_504_GATEWAY_TIMEOUT,
 )
 
@@ -36,6 +37,7 @@ class ErrorCode(int, Enum):
     SQLGLOT_ERROR = 104
     GENERIC_EXTERNAL_ERROR = 200
     DATABASE_TIMEOUT = 201
+    DATA_SOURCE_BUSY = 202
 
 
 class ErrorPhase(int, Enum):
@@ -107,6 +109,8 @@ class WrenError(Exception):
                 return HTTP_502_BAD_GATEWAY
             case ErrorCode.DATABASE_TIMEOUT:
                 return HTTP_504_GATEWAY_TIMEOUT
+            case ErrorCode.DATA_SOURCE_BUSY:
+                return HTTP_503_SERVICE_UNAVAILABLE
             case e:
                 if e.value < 100:
                     return HTTP_422_UNPROCESSABLE_ENTITY
@@ -123,3 +127,12 @@ class DatabaseTimeoutError(WrenError):
             error_code=ErrorCode.DATABASE_TIMEOUT,
             message=enhanced_message,
         )
+
+
+class DataSourceBusyError(WrenError):
+    def __init__(self, message: str):
+        super().__init__(
+            error_code=ErrorCode.DATA_SOURCE_BUSY,
+            message=message,
+            phase=ErrorPhase.SQL_EXECUTION,
+        )
@@ -11,6 +11,7 @@ from app.model.metadata.dto import (
     Constraint,
     RustWrenEngineColumnType,
     Table,
+    TableFilter,
     TableProperties,
 )
 from app.model.metadata.metadata import Metadata
@@ -56,10 +57,25 @@ class AthenaMetadata(Metadata):
         super().__init__(connection_info)
         self.connection = DataSource.athena.get_connection(connection_info)
 
-    def get_table_list(self) -> list[Table]:
+    def get_table_list(self, table_filter: TableFilter | None = None) -> list[Table]:
         schema_name = self.connection_info.schema_name.get_secret_value()
-
-        sql = f"""
+        condition = self._filter_condition(
+            table_filter, "t.table_schema", "t.table_name"
+        )
+        names_only = table_filter is not None and table_filter.names_only
+        if names_only:
+            sql = f"""
+            SELECT
+                t.table_catalog,
+                t.table_schema,
+                t.table_name
+            FROM
+                information_schema.tables AS t
+            WHERE t.table_schema = '{schema_name}'{condition}
+            ORDER BY t.table_name
+            """
+        else:
+            sql = f"""
             SELECT 
                 t.table_catalog,
                 t.table_schema,
@@ -75,7 +91,7 @@ class AthenaMetadata(Metadata):
                 ON t.table_catalog = c.table_catalog
                 AND t.table_schema = c.table_schema
                 AND t.table_name = c.table_name
-            WHERE t.table_schema = '{schema_name}'
+            WHERE t.table_schema = '{schema_name}'{condition}
             ORDER BY t.table_name
             """
 
@@ -120,6 +136,8 @@ class AthenaMetadata(Metadata):
             # init table if not exists
             if table_name not in unique_tables:
                 unique_tables[table_name] = get_table(column_metadata)
+            if names_only:
+                continue
 
             current_table = unique_tables[table_name]
             # add column to table
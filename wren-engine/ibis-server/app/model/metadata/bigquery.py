@@ -8,6 +8,7 @@ from app.model.metadata.dto import (
     ConstraintType,
     RustWrenEngineColumnType,
     Table,
+    TableFilter,
     TableProperties,
 )
 from app.model.metadata.metadata import Metadata
@@ -37,11 +38,30 @@ class BigQueryMetadata(Metadata):
         super().__init__(connection_info)
         self.connection = DataSource.bigquery.get_connection(connection_info)
 
-    def get_table_list(self) -> list[Table]:
+    def get_table_list(self, table_filter: TableFilter | None = None) -> list[Table]:
         dataset_id = self.connection_info.dataset_id.get_secret_value()
-
-        # filter out columns with GEOGRAPHY & RANGE types
-        sql = f"""
+        names_only = table_filter is not None and table_filter.names_only
+        if names_only:
+            condition = self._filter_condition(
+                table_filter, "t.table_schema", "t.table_name"
+            )
+            sql = f"""
+            SELECT
+                t.table_catalog,
+                t.table_schema,
+                t.table_name,
+                table_options.option_value AS table_description
+            FROM {dataset_id}.INFORMATION_SCHEMA.TABLES t
+            LEFT JOIN {dataset_id}.INFORMATION_SCHEMA.TABLE_OPTIONS table_options
+                ON t.table_name = table_options.table_name AND table_options.OPTION_NAME = 'description'
+            WHERE TRUE{condition}
+            """
+        else:
+            condition = self._filter_condition(
+                table_filter, "c.table_schema", "c.table_name"
+            )
+            # filter out columns with GEOGRAPHY & RANGE types
+            sql = f"""
             SELECT 
                 c.table_catalog,
                 c.table_schema,
@@ -71,7 +91,7 @@ class BigQueryMetadata(Metadata):
             LEFT JOIN {dataset_id}.INFORMATION_SCHEMA.TABLE_OPTIONS table_options
                 ON c.table_name = table_options.table_name AND table_options.OPTION_NAME = 'description'
             WHERE cf.data_type != 'GEOGRAPHY'
-                AND cf.data_type NOT LIKE 'RANGE%'
+                AND cf.data_type NOT LIKE 'RANGE%'{condition}
             ORDER BY cf.field_path ASC
             """
         response = self.connection.sql(sql).to_pandas().to_dict(orient="records")
@@ -136,6 +156,8 @@ class BigQueryMetadata(Metadata):
             # init table if not exists
             if table_name not in unique_tables:
                 unique_tables[table_name] = get_table(column_metadata)
+            if names_only:
+                continue
 
             current_table = unique_tables[table_name]
             # if column is normal column, add to table
@@ -161,6 +183,10 @@ class BigQueryMetadata(Metadata):
 
         return list(unique_tables.values())
 
+    def _to_sql_literal(self, value: str) -> str:
+        # BigQuery escapes the quote with a backslash instead of doubling it
+        return "'" + value.replace("\\", "\\\\").replace("'", "\\'") + "'"
+
     def get_constraints(self) -> list[Constraint]:
         dataset_id = self.connection_info.dataset_id.get_secret_value()
         sql = f"""
@@ -194,6 +220,18 @@ class BigQueryMetadata(Metadata):
     def get_version(self) -> str:
         return "Follow BigQuery release version"
 
+    def get_schema_versions(self) -> dict[str, str]:
+        dataset_id = self.connection_info.dataset_id.get_secret_value()
+        # The table count catches the dropped tables
+        sql = f"""
+            SELECT
+                COUNT(*) AS table_count,
+                MAX(last_modified_time) AS last_modified_time
+            FROM {dataset_id}.__TABLES__
+            """
+        row = self.connection.sql(sql).to_pandas().iloc[0]
+        return {dataset_id: f"{row['table_count']}|{row['last_modified_time']}"}
+
     def _transform_column_type(self, data_type: str) -> str | RustWrenEngineColumnType:
         """Transform BigQuery data type to RustWrenEngineColumnType.
 
@@ -0,0 +1,156 @@
+import hashlib
+import threading
+import time
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+from typing import Any
+
+from opentelemetry import trace
+
+from app.cache import LRUCache
+from app.config import get_config
+from app.model import ConnectionInfo
+from app.model.data_source import DataSource
+from app.model.metadata.dto import Constraint, Table, TableFilter
+from app.model.metadata.factory import MetadataFactory
+from app.model.metadata.metadata import Metadata
+from app.util import (
+    execute_get_constraints_with_timeout,
+    execute_get_schema_versions_with_timeout,
+    execute_get_table_list_with_timeout,
+)
+
+
+@dataclass
+class _CacheEntry:
+    value: list[Any]
+    versions: dict[str, str] | None
+    created_at: float
+
+
+class MetadataCache:
+    """A cache of the table lists and the constraints keyed by the connection info.
+
+    An entry is served until it's older than `ttl_seconds`. If the data source
+    exposes the last modified versions of its schemas, an expired entry is
+    revalidated with them: it's kept without reading the catalog again if the
+    versions are unchanged, and read again as a whole if any of them changed.
+    Setting `ttl_seconds` to 0 disables the cache.
+    """
+
+    def __init__(self, ttl_seconds: int = 0, capacity: int = 256):
+        self.ttl_seconds = ttl_seconds
+        self._entries: LRUCache[str, _CacheEntry] = LRUCache(capacity)
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._revalidations = 0
+
+    async def get_table_list(
+        self,
+        data_source: DataSource,
+        connection_info: ConnectionInfo,
+        refresh: bool = False,
+        table_filter: TableFilter | None = None,
+    ) -> list[Table]:
+        # The filtered lists are cached separately
+        kind = (
+            "tables"
+            if table_filter is None
+            else f"tables|{table_filter.model_dump_json()}"
+        )
+        return await self._get(
+            kind,
+            data_source,
+            connection_info,
+            refresh,
+            lambda metadata: execute_get_table_list_with_timeout(
+                metadata, table_filter
+            ),
+        )
+
+    async def get_constraints(
+        self,
+        data_source: DataSource,
+        connection_info: ConnectionInfo,
+        refresh: bool = False,
+    ) -> list[Constraint]:
+        return await self._get(
+            "constraints",
+            data_source,
+            connection_info,
+            refresh,
+            execute_get_constraints_with_timeout,
+        )
+
+    async def _get(
+        self,
+        kind: str,
+        data_source: DataSource,
+        connection_info: ConnectionInfo,
+        refresh: bool,
+        fetch: Callable[[Metadata], Awaitable[list[Any]]],
+    ) -> list[Any]:
+        if self.ttl_seconds <= 0:
+            return await fetch(
+                MetadataFactory.get_metadata(data_source, connection_info)
+            )
+
+        span = trace.get_current_span()
+        key = self._generate_cache_key(kind, data_source, connection_info)
+        entry = self._entries.get(key)
+        if (
+            entry is not None
+            and not refresh
+            and time.time() - entry.created_at < self.ttl_seconds
+        ):
+            with self._lock:
+                self._hits += 1
+            span.set_attribute("metadata_cache.hit", True)
+            return entry.value
+
+        span.set_attribute("metadata_cache.hit", False)
+        metadata = MetadataFactory.get_metadata(data_source, connection_info)
+        # Read the versions first, a change during the read is caught next time
+        versions = await execute_get_schema_versions_with_timeout(metadata)
+        if (
+            entry is not None
+            and not refresh
+            and versions is not None
+            and versions == entry.versions
+        ):
+            with self._lock:
+                self._revalidations += 1
+            span.set_attribute("metadata_cache.revalidated", True)
+            value = entry.value
+        else:
+            with self._lock:
+                self._misses += 1
+            value = await fetch(metadata)
+        self._entries.set(key, _CacheEntry(value, versions, time.time()))
+        return value
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "revalidations": self._revalidations,
+                "size": self._entries.stats()["size"],
+            }
+
+    @staticmethod
+    def _generate_cache_key(
+        kind: str, data_source: DataSource, connection_info: ConnectionInfo
+    ) -> str:
+        key_string = f"{kind}|{data_source}|{connection_info.to_key_string()}|{connection_info.model_dump_json()}"
+        return hashlib.sha256(key_string.encode()).hexdigest()
+
+
+_metadata_cache = MetadataCache(
+    get_config().metadata_cache_ttl_seconds, get_config().metadata_cache_size
+)
+
+
+def get_metadata_cache() -> MetadataCache:
+    return _metadata_cache
@@ -12,6 +12,7 @@ from app.model.metadata.dto import (
     Constraint,
     RustWrenEngineColumnType,
     Table,
+    TableFilter,
     TableProperties,
 )
 from app.model.metadata.metadata import Metadata
@@ -63,10 +64,12 @@ class CannerMetadata(Metadata):
             fetch_schema_from_transport=False,
         )
 
-    def get_table_list(self) -> list[Table]:
+    def get_table_list(self, table_filter: TableFilter | None = None) -> list[Table]:
         ws_sql_name = self._get_workspace_sql_name()
         metadata = self._get_metadata(self._get_workspace_id(ws_sql_name))
-        return [self._build_table(data) for data in metadata]
+        # The GraphQL API can't filter the tables, filter them after building
+        tables = [self._build_table(data) for data in metadata]
+        return self._filter_tables(tables, table_filter)
 
     def get_constraints(self) -> list[Constraint]:
         return []
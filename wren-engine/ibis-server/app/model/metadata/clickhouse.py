@@ -7,6 +7,7 @@ from app.model.metadata.dto import (
     Constraint,
     RustWrenEngineColumnType,
     Table,
+    TableFilter,
     TableProperties,
 )
 from app.model.metadata.metadata import Metadata
@@ -44,12 +45,29 @@ CLICKHOUSE_TYPE_MAPPING = {
 
 
 class ClickHouseMetadata(Metadata):
+    backslash_escapes = True
+
     def __init__(self, connection_info: ClickHouseConnectionInfo):
         super().__init__(connection_info)
         self.connection = DataSource.clickhouse.get_connection(connection_info)
 
-    def get_table_list(self) -> list[Table]:
-        sql = """
+    def get_table_list(self, table_filter: TableFilter | None = None) -> list[Table]:
+        names_only = table_filter is not None and table_filter.names_only
+        if names_only:
+            condition = self._filter_condition(table_filter, "t.database", "t.name")
+            sql = f"""
+            SELECT
+                t.database AS table_schema,
+                t.name AS table_name,
+                t.comment AS table_comment
+            FROM
+                system.tables AS t
+            WHERE
+                t.database NOT IN ('system', 'INFORMATION_SCHEMA', 'information_schema', 'pg_catalog'){condition};
+            """
+        else:
+            condition = self._filter_condition(table_filter, "c.database", "c.table")
+            sql = f"""
             SELECT
                 c.database AS table_schema,
                 c.table AS table_name,
@@ -64,7 +82,7 @@ class ClickHouseMetadata(Metadata):
                 ON c.database = t.database
                 AND c.table = t.name
             WHERE
-                c.database NOT IN ('system', 'INFORMATION_SCHEMA', 'information_schema', 'pg_catalog');
+                c.database NOT IN ('system', 'INFORMATION_SCHEMA', 'information_schema', 'pg_catalog'){condition};
             """
         response = self.connection.sql(sql).to_pandas().to_dict(orient="records")
 
@@ -87,6 +105,8 @@ class ClickHouseMetadata(Metadata):
                     ),
                     primaryKey="",
                 )
+            if names_only:
+                continue
 
             # table exists, and add column to the table
             unique_tables[schema_table].columns.append(
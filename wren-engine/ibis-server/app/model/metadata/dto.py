@@ -10,6 +10,39 @@ class MetadataDTO(BaseModel):
     connection_info: dict[str, Any] | ConnectionInfo = Field(alias="connectionInfo")
 
 
+class TableFilter(BaseModel):
+    schemas: list[str] | None = Field(
+        default=None,
+        min_length=1,
+        description="only list the tables in these schemas",
+    )
+    table_pattern: str | None = Field(
+        alias="tablePattern",
+        default=None,
+        description="only list the tables whose names match the SQL LIKE pattern",
+        examples=["order%"],
+    )
+    names_only: bool = Field(
+        alias="namesOnly",
+        default=False,
+        description="list the tables without reading their columns",
+    )
+
+
+class TableListDTO(MetadataDTO, TableFilter):
+    limit: int | None = Field(
+        default=None, ge=1, description="the max number of the tables to return"
+    )
+    offset: int = Field(default=0, ge=0, description="the number of the tables to skip")
+
+    def to_filter(self) -> TableFilter:
+        return TableFilter(
+            schemas=self.schemas,
+            tablePattern=self.table_pattern,
+            namesOnly=self.names_only,
+        )
+
+
 class RustWrenEngineColumnType(Enum):
     BOOL = "BOOL"
     TINYINT = "TINYINT"
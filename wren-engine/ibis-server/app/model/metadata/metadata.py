@@ -1,15 +1,19 @@
+import re
 from abc import ABC, abstractmethod
 
 from app.model import ConnectionInfo
-from app.model.metadata.dto import Constraint, Table
+from app.model.metadata.dto import Constraint, Table, TableFilter
 
 
 class Metadata(ABC):
+    # Whether the backslash is an escape character in the string literals
+    backslash_escapes = False
+
     def __init__(self, connection_info: ConnectionInfo):
         self.connection_info = connection_info
 
     @abstractmethod
-    def get_table_list(self) -> list[Table]:
+    def get_table_list(self, table_filter: TableFilter | None = None) -> list[Table]:
         pass
 
     @abstractmethod
@@ -19,3 +23,75 @@ class Metadata(ABC):
     @abstractmethod
     def get_version(self) -> str:
         pass
+
+    def get_schema_versions(self) -> dict[str, str] | None:
+        """Get the last modified version of each schema of the connection.
+
+        The metadata cache revalidates an expired entry with the versions. The entry
+        is kept if they are all unchanged, otherwise it's read again as a whole.
+        Return None if the data source doesn't expose it.
+        """
+        return None
+
+    def _filter_condition(
+        self, table_filter: TableFilter | None, schema_column: str, table_column: str
+    ) -> str:
+        """Build the SQL condition to push the filter down into the metadata query.
+
+        It's empty without a filter, otherwise it starts with `AND`.
+        """
+        if table_filter is None:
+            return ""
+        conditions = []
+        if table_filter.schemas is not None:
+            schemas = ", ".join(map(self._to_sql_literal, table_filter.schemas))
+            conditions.append(f"{schema_column} IN ({schemas})")
+        if table_filter.table_pattern is not None:
+            pattern = self._to_sql_literal(table_filter.table_pattern)
+            conditions.append(f"{table_column} LIKE {pattern}")
+        return "".join(f" AND {condition}" for condition in conditions)
+
+    def _to_sql_literal(self, value: str) -> str:
+        if self.backslash_escapes:
+            value = value.replace("\\", "\\\\")
+        return "'" + value.replace("'", "''") + "'"
+
+    @staticmethod
+    def _filter_tables(
+        tables: list[Table], table_filter: TableFilter | None
+    ) -> list[Table]:
+        """Filter the tables in Python for the data sources without a SQL catalog."""
+        if table_filter is None:
+            return tables
+        if table_filter.schemas is not None:
+            tables = [
+                t
+                for t in tables
+                if t.properties is not None
+                and t.properties.schema_ in table_filter.schemas
+            ]
+        if table_filter.table_pattern is not None:
+            pattern = like_to_regex(table_filter.table_pattern)
+            tables = [
+                t
+                for t in tables
+                if pattern.fullmatch(
+                    t.properties.table
+                    if t.properties and t.properties.table
+                    else t.name
+                )
+            ]
+        if table_filter.names_only:
+            tables = [t.model_copy(update={"columns": []}) for t in tables]
+        return tables
+
+
+def like_to_regex(pattern: str) -> re.Pattern:
+    """Translate a SQL LIKE pattern to a regular expression."""
+    return re.compile(
+        "".join(
+            ".*" if char == "%" else "." if char == "_" else re.escape(char)
+            for char in pattern
+        ),
+        re.DOTALL,
+    )
@@ -8,6 +8,7 @@ from app.model.metadata.dto import (
     ConstraintType,
     RustWrenEngineColumnType,
     Table,
+    TableFilter,
     TableProperties,
 )
 from app.model.metadata.metadata import Metadata
@@ -54,8 +55,37 @@ class MSSQLMetadata(Metadata):
         super().__init__(connection_info)
         self.connection = DataSource.mssql.get_connection(connection_info)
 
-    def get_table_list(self) -> list[Table]:
-        sql = """
+    def get_table_list(self, table_filter: TableFilter | None = None) -> list[Table]:
+        names_only = table_filter is not None and table_filter.names_only
+        if names_only:
+            condition = self._filter_condition(
+                table_filter, "t.TABLE_SCHEMA", "t.TABLE_NAME"
+            )
+            sql = f"""
+            SELECT
+                t.TABLE_CATALOG AS catalog,
+                t.TABLE_SCHEMA AS table_schema,
+                t.TABLE_NAME AS table_name,
+                CAST(tprop.value AS NVARCHAR(MAX)) AS table_comment
+            FROM
+                INFORMATION_SCHEMA.TABLES t
+            LEFT JOIN
+                sys.tables st
+                ON st.name = t.TABLE_NAME
+                AND SCHEMA_NAME(st.schema_id) = t.TABLE_SCHEMA
+            LEFT JOIN
+                sys.extended_properties tprop
+                ON tprop.major_id = st.object_id
+                AND tprop.minor_id = 0
+                AND tprop.name = 'MS_Description'
+            WHERE
+                t.TABLE_SCHEMA NOT IN ('sys', 'INFORMATION_SCHEMA'){condition};
+            """
+        else:
+            condition = self._filter_condition(
+                table_filter, "col.TABLE_SCHEMA", "col.TABLE_NAME"
+            )
+            sql = f"""
             SELECT 
                 col.TABLE_CATALOG AS catalog,
                 col.TABLE_SCHEMA AS table_schema,
@@ -98,7 +128,7 @@ class MSSQLMetadata(Metadata):
                 AND cprop.minor_id = sc.column_id 
                 AND cprop.name = 'MS_Description'
             WHERE
-                col.TABLE_SCHEMA NOT IN ('sys', 'INFORMATION_SCHEMA');
+                col.TABLE_SCHEMA NOT IN ('sys', 'INFORMATION_SCHEMA'){condition};
             """
         response = self.connection.sql(sql).to_pandas().to_dict(orient="records")
 
@@ -121,6 +151,8 @@ class MSSQLMetadata(Metadata):
                     ),
                     primaryKey="",
                 )
+            if names_only:
+                continue
 
             # table exists, and add column to the table
             unique_tables[schema_table].columns.append(
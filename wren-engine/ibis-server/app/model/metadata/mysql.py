@@ -8,6 +8,7 @@ from app.model.metadata.dto import (
     ConstraintType,
     RustWrenEngineColumnType,
     Table,
+    TableFilter,
     TableProperties,
 )
 from app.model.metadata.metadata import Metadata
@@ -50,12 +51,33 @@ MYSQL_TYPE_MAPPING = {
 
 
 class MySQLMetadata(Metadata):
+    backslash_escapes = True
+
     def __init__(self, connection_info: MySqlConnectionInfo):
         super().__init__(connection_info)
         self.connection = DataSource.mysql.get_connection(connection_info)
 
-    def get_table_list(self) -> list[Table]:
-        sql = """
+    def get_table_list(self, table_filter: TableFilter | None = None) -> list[Table]:
+        names_only = table_filter is not None and table_filter.names_only
+        if names_only:
+            condition = self._filter_condition(
+                table_filter, "t.TABLE_SCHEMA", "t.TABLE_NAME"
+            )
+            sql = f"""
+            SELECT
+                t.TABLE_SCHEMA AS table_schema,
+                t.TABLE_NAME AS table_name,
+                t.TABLE_COMMENT AS table_comment
+            FROM
+                information_schema.TABLES t
+            WHERE
+                t.TABLE_SCHEMA NOT IN ('mysql', 'information_schema', 'performance_schema', 'sys'){condition};
+            """
+        else:
+            condition = self._filter_condition(
+                table_filter, "c.TABLE_SCHEMA", "c.TABLE_NAME"
+            )
+            sql = f"""
             SELECT
                 c.TABLE_SCHEMA AS table_schema,
                 c.TABLE_NAME AS table_name,
@@ -72,7 +94,7 @@ class MySQLMetadata(Metadata):
                 ON c.TABLE_SCHEMA = t.TABLE_SCHEMA
                 AND c.TABLE_NAME = t.TABLE_NAME
             WHERE
-                c.TABLE_SCHEMA NOT IN ('mysql', 'information_schema', 'performance_schema', 'sys');
+                c.TABLE_SCHEMA NOT IN ('mysql', 'information_schema', 'performance_schema', 'sys'){condition};
             """
         response = self.connection.sql(sql).to_pandas().to_dict(orient="records")
 
@@ -96,6 +118,8 @@ class MySQLMetadata(Metadata):
                     ),
                     primaryKey="",
                 )
+            if names_only:
+                continue
 
             # table exists, and add column to the table
             unique_tables[schema_table].columns.append(
@@ -1,10 +1,13 @@
 import os
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
 
-import duckdb
 import opendal
 import pyarrow as pa
 from loguru import logger
 
+from app.cache import LRUCache
+from app.config import get_config
 from app.model import (
     GcsFileConnectionInfo,
     LocalFileConnectionInfo,
@@ -12,15 +15,16 @@ from app.model import (
     S3FileConnectionInfo,
 )
 from app.model.connector import DuckDBConnector
+from app.model.duckdb_pool import get_duckdb_instance_pool
 from app.model.error import ErrorCode, ErrorPhase, WrenError
 from app.model.metadata.dto import (
     Column,
     RustWrenEngineColumnType,
     Table,
+    TableFilter,
     TableProperties,
 )
-from app.model.metadata.metadata import Metadata
-from app.model.utils import init_duckdb_gcs, init_duckdb_minio, init_duckdb_s3
+from app.model.metadata.metadata import Metadata, like_to_regex
 
 DUCKDB_TYPE_MAPPING = {
     "bigint": RustWrenEngineColumnType.INT64,
@@ -51,63 +55,37 @@ DUCKDB_TYPE_MAPPING = {
 }
 
 
+# The columns of the files keyed by the path, the format and the etag or the
+# modified time of the files read, so re-listing an unchanged bucket doesn't read
+# the files again
+_schema_cache: LRUCache[str, tuple[Column, ...]] = LRUCache(
+    get_config().object_storage_schema_cache_size
+)
+
+
 class ObjectStorageMetadata(Metadata):
     def __init__(self, connection_info):
         super().__init__(connection_info)
 
-    def get_table_list(self) -> list[Table]:
+    def get_table_list(self, table_filter: TableFilter | None = None) -> list[Table]:
+        # The files have no schema
+        if table_filter is not None and table_filter.schemas is not None:
+            return []
         op = self._get_dal_operator()
-        conn = self._get_connection()
         unique_tables = {}
         try:
-            for file in op.list("/"):
-                if file.path != "/":
-                    stat = op.stat(file.path)
-                    if stat.mode.is_dir():
-                        # if the file is a directory, use the directory name as the table name
-                        table_name = os.path.basename(os.path.normpath(file.path))
-                        full_path = f"{self.connection_info.url.get_secret_value()}/{table_name}/*.{self.connection_info.format}"
-                    else:
-                        # if the file is a file, use the file name as the table name
-                        table_name = os.path.splitext(os.path.basename(file.path))[0]
-                        full_path = (
-                            f"{self.connection_info.url.get_secret_value()}/{file.path}"
-                        )
-
-                    # add required prefix for object storage
-                    full_path = self._get_full_path(full_path)
-                    # read the file with the target format if unreadable, skip the file
-                    df = self._read_df(conn, full_path)
-                    if df is None:
-                        continue
-                    columns = []
-                    try:
-                        for col in df.columns:
-                            duckdb_type = df[col].dtypes[0]
-                            columns.append(
-                                Column(
-                                    name=col,
-                                    type=self._to_column_type(duckdb_type.__str__()),
-                                    notNull=False,
-                                )
-                            )
-                    except Exception as e:
-                        logger.debug(f"Failed to read column types: {e}")
-                        continue
-
-                    unique_tables[table_name] = Table(
-                        name=table_name,
-                        description=None,
-                        columns=[],
-                        properties=TableProperties(
-                            table=table_name,
-                            schema=None,
-                            catalog=None,
-                            path=full_path,
-                        ),
-                        primaryKey=None,
-                    )
-                    unique_tables[table_name].columns = columns
+            paths = [file.path for file in op.list("/") if file.path != "/"]
+            # The schemas are read in parallel, each worker runs on its own cursor
+            with ThreadPoolExecutor(
+                max_workers=get_config().object_storage_discovery_max_workers,
+                thread_name_prefix="object-storage-discovery",
+            ) as executor:
+                tables = executor.map(
+                    lambda path: self._discover_table(op, path, table_filter), paths
+                )
+                for table in tables:
+                    if table is not None:
+                        unique_tables[table.name] = table
         except Exception as e:
             raise WrenError(
                 ErrorCode.GENERIC_USER_ERROR,
@@ -117,6 +95,104 @@ class ObjectStorageMetadata(Metadata):
 
         return list(unique_tables.values())
 
+    def _discover_table(
+        self, op, path: str, table_filter: TableFilter | None
+    ) -> Table | None:
+        stat = op.stat(path)
+        if stat.mode.is_dir():
+            # if the file is a directory, use the directory name as the table name
+            table_name = os.path.basename(os.path.normpath(path))
+            full_path = f"{self.connection_info.url.get_secret_value()}/{table_name}/*.{self.connection_info.format}"
+        else:
+            # if the file is a file, use the file name as the table name
+            table_name = os.path.splitext(os.path.basename(path))[0]
+            full_path = f"{self.connection_info.url.get_secret_value()}/{path}"
+
+        # match the table name before reading the file
+        if (
+            table_filter is not None
+            and table_filter.table_pattern is not None
+            and not like_to_regex(table_filter.table_pattern).fullmatch(table_name)
+        ):
+            return None
+
+        # add required prefix for object storage
+        full_path = self._get_full_path(full_path)
+        if table_filter is not None and table_filter.names_only:
+            # the file isn't read, so an unreadable file is listed as well
+            return self._build_table(table_name, full_path, [])
+
+        key = self._schema_cache_key(op, path, full_path, stat)
+        columns = _schema_cache.get(key) if key is not None else None
+        if columns is None:
+            columns = self._read_columns(full_path)
+            if key is not None:
+                columns = _schema_cache.put(key, columns)
+        # skip the file if it's unreadable with the target format
+        if not columns:
+            return None
+        return self._build_table(table_name, full_path, list(columns))
+
+    @staticmethod
+    def _build_table(table_name: str, full_path: str, columns: list[Column]) -> Table:
+        return Table(
+            name=table_name,
+            description=None,
+            columns=columns,
+            properties=TableProperties(
+                table=table_name,
+                schema=None,
+                catalog=None,
+                path=full_path,
+            ),
+            primaryKey=None,
+        )
+
+    def _schema_cache_key(self, op, path: str, full_path: str, stat) -> str | None:
+        if stat.mode.is_dir():
+            # Rewriting a file in the directory doesn't change the stat of the
+            # directory, so the key is built from the files the table reads
+            suffix = f".{self.connection_info.format}"
+            members = sorted(
+                entry.path
+                for entry in op.list(path)
+                if entry.path.endswith(suffix) and entry.path != path
+            )
+            stats = [(member, op.stat(member)) for member in members]
+        else:
+            stats = [(path, stat)]
+        # Without the etag or the modified time, a changed file can't be detected
+        if any(s.etag is None and s.last_modified is None for _, s in stats):
+            return None
+        versions = "|".join(
+            f"{member}|{s.etag}|{s.last_modified}|{s.content_length}"
+            for member, s in stats
+        )
+        return f"{self.connection_info.format}|{full_path}|{versions}"
+
+    def _read_columns(self, full_path: str) -> tuple[Column, ...]:
+        """Read the column names and types of the file without scanning the data.
+
+        Binding the relation only reads the footer of a parquet file and samples the
+        rows of a csv or json file. An empty tuple is returned if it's unreadable.
+        """
+        with get_duckdb_instance_pool().cursor(self.connection_info) as conn:
+            rel = self._read_df(conn, full_path)
+            if rel is None:
+                return ()
+            try:
+                return tuple(
+                    Column(
+                        name=name,
+                        type=self._to_column_type(str(duckdb_type)),
+                        notNull=False,
+                    )
+                    for name, duckdb_type in zip(rel.columns, rel.types)
+                )
+            except Exception as e:
+                logger.debug(f"Failed to read column types: {e}")
+                return ()
+
     def get_constraints(self):
         return []
 
@@ -180,9 +256,6 @@ class ObjectStorageMetadata(Metadata):
 
         return mapped_type
 
-    def _get_connection(self):
-        return duckdb.connect()
-
     def _get_dal_operator(self):
         return opendal.Operator("fs", root=self.connection_info.url.get_secret_value())
 
@@ -205,12 +278,6 @@ class S3FileMetadata(ObjectStorageMetadata):
     def get_version(self):
         return "S3"
 
-    def _get_connection(self):
-        conn = duckdb.connect()
-        init_duckdb_s3(conn, self.connection_info)
-        logger.debug("Initialized duckdb s3")
-        return conn
-
     def _get_dal_operator(self):
         info: S3FileConnectionInfo = self.connection_info
         return opendal.Operator(
@@ -236,12 +303,6 @@ class MinioFileMetadata(ObjectStorageMetadata):
     def get_version(self):
         return "Minio"
 
-    def _get_connection(self):
-        conn = duckdb.connect()
-        init_duckdb_minio(conn, self.connection_info)
-        logger.debug("Initialized duckdb minio")
-        return conn
-
     def _get_dal_operator(self):
         info: MinioFileConnectionInfo = self.connection_info
 
@@ -274,12 +335,6 @@ class GcsFileMetadata(ObjectStorageMetadata):
     def get_version(self):
         return "GCS"
 
-    def _get_connection(self):
-        conn = duckdb.connect()
-        init_duckdb_gcs(conn, self.connection_info)
-        logger.debug("Initialized duckdb gcs")
-        return conn
-
     def _get_dal_operator(self):
         info: GcsFileConnectionInfo = self.connection_info
 
@@ -300,10 +355,26 @@ class GcsFileMetadata(ObjectStorageMetadata):
 class DuckDBMetadata(ObjectStorageMetadata):
     def __init__(self, connection_info: LocalFileConnectionInfo):
         super().__init__(connection_info)
-        self.connection = DuckDBConnector(connection_info)
 
-    def get_table_list(self) -> list[Table]:
-        sql = """
+    def get_table_list(self, table_filter: TableFilter | None = None) -> list[Table]:
+        condition = self._filter_condition(
+            table_filter, "t.table_schema", "t.table_name"
+        )
+        names_only = table_filter is not None and table_filter.names_only
+        if names_only:
+            sql = f"""
+            SELECT
+                t.table_catalog,
+                t.table_schema,
+                t.table_name
+            FROM
+                information_schema.tables t
+            WHERE
+                t.table_type IN ('BASE TABLE', 'VIEW')
+                AND t.table_schema NOT IN ('information_schema', 'pg_catalog'){condition};
+            """
+        else:
+            sql = f"""
             SELECT
                 t.table_catalog,
                 t.table_schema,
@@ -320,11 +391,9 @@ class DuckDBMetadata(ObjectStorageMetadata):
                 AND t.table_name = c.table_name
             WHERE
                 t.table_type IN ('BASE TABLE', 'VIEW')
-                AND t.table_schema NOT IN ('information_schema', 'pg_catalog');
+                AND t.table_schema NOT IN ('information_schema', 'pg_catalog'){condition};
             """
-        response = (
-            self.connection.query(sql, limit=None).to_pandas().to_dict(orient="records")
-        )
+        response = self._query(sql).to_pandas().to_dict(orient="records")
 
         unique_tables = {}
         for row in response:
@@ -344,6 +413,8 @@ class DuckDBMetadata(ObjectStorageMetadata):
                     ),
                     primaryKey="",
                 )
+            if names_only:
+                continue
 
             # table exists, and add column to the table
             unique_tables[schema_table].columns.append(
@@ -356,6 +427,11 @@ class DuckDBMetadata(ObjectStorageMetadata):
             )
         return list(unique_tables.values())
 
+    def _query(self, sql: str) -> pa.Table:
+        # Release the cursor of the shared instance right after the query
+        with closing(DuckDBConnector(self.connection_info)) as connector:
+            return connector.query(sql, limit=None)
+
     def _format_compact_table_name(self, schema: str, table: str):
         return f"{schema}.{table}"
 
@@ -363,7 +439,7 @@ class DuckDBMetadata(ObjectStorageMetadata):
         return []
 
     def get_version(self):
-        df: pa.Table = self.connection.query("SELECT version()")
+        df: pa.Table = self._query("SELECT version()")
         if df is None:
             raise WrenError(
                 ErrorCode.GENERIC_USER_ERROR, "Failed to get DuckDB version"
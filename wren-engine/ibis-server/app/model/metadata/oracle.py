@@ -9,6 +9,7 @@ from app.model.metadata.dto import (
     ConstraintType,
     RustWrenEngineColumnType,
     Table,
+    TableFilter,
     TableProperties,
 )
 from app.model.metadata.metadata import Metadata
@@ -50,8 +51,12 @@ class OracleMetadata(Metadata):
         super().__init__(connection_info)
         self.connection = DataSource.oracle.get_connection(connection_info)
 
-    def get_table_list(self) -> list[Table]:
+    def get_table_list(self, table_filter: TableFilter | None = None) -> list[Table]:
         user = self.connection_info.user.get_secret_value()
+        condition = self._filter_condition(table_filter, "t.owner", "t.table_name")
+        names_only = table_filter is not None and table_filter.names_only
+        if names_only:
+            return self._get_table_names(user, condition)
         sql = f"""
             SELECT
                 t.owner AS TABLE_CATALOG,
@@ -79,7 +84,7 @@ class OracleMetadata(Metadata):
                 AND cc.table_name = c.table_name
                 AND cc.column_name = c.column_name
             WHERE
-                t.owner = '{user}'
+                t.owner = '{user}'{condition}
             ORDER BY
                 t.table_name, c.column_id;
         """
@@ -136,6 +141,52 @@ class OracleMetadata(Metadata):
 
         return list(unique_tables.values())
 
+    def _get_table_names(self, user: str, condition: str) -> list[Table]:
+        sql = f"""
+            SELECT
+                t.owner AS TABLE_SCHEMA,
+                t.table_name AS TABLE_NAME,
+                tc.comments AS TABLE_COMMENT
+            FROM
+                all_tables t
+            LEFT JOIN
+                all_tab_comments tc
+                ON tc.owner = t.owner
+                AND tc.table_name = t.table_name
+            WHERE
+                t.owner = '{user}'{condition}
+            ORDER BY
+                t.table_name;
+        """
+        schema = ibis.schema(
+            {
+                "TABLE_SCHEMA": "string",
+                "TABLE_NAME": "string",
+                "TABLE_COMMENT": "string",
+            }
+        )
+        response = (
+            self.connection.sql(sql, schema=schema)
+            .to_pandas()
+            .to_dict(orient="records")
+        )
+        return [
+            Table(
+                name=self._format_compact_table_name(
+                    row["TABLE_SCHEMA"], row["TABLE_NAME"]
+                ),
+                description=row["TABLE_COMMENT"],
+                columns=[],
+                properties=TableProperties(
+                    schema=row["TABLE_SCHEMA"],
+                    catalog="",  # Oracle doesn't use catalogs.
+                    table=row["TABLE_NAME"],
+                ),
+                primaryKey="",
+            )
+            for row in response
+        ]
+
     def get_constraints(self) -> list[Constraint]:
         schema = ibis.schema(
             {
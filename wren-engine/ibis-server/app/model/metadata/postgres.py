@@ -8,6 +8,7 @@ from app.model.metadata.dto import (
     ConstraintType,
     RustWrenEngineColumnType,
     Table,
+    TableFilter,
     TableProperties,
 )
 from app.model.metadata.metadata import Metadata
@@ -122,7 +123,10 @@ class ExtensionHandler:
         for row in response:
             # TODO: Might want to use a global `_format_postgres_compact_table_name` function.
             table_name = f"{row['f_table_schema']}.{row['f_table_name']}"
-            table = tables[table_name]
+            table = tables.get(table_name)
+            # The table may be filtered out
+            if table is None:
+                continue
             for column in table.columns:
                 column.type = str(
                     self._transform_postgres_column_type(row["column_type"])
@@ -156,8 +160,32 @@ class PostgresMetadata(Metadata):
         super().__init__(connection_info)
         self.connection = DataSource.postgres.get_connection(connection_info)
 
-    def get_table_list(self) -> list[Table]:
-        sql = """
+    def get_table_list(self, table_filter: TableFilter | None = None) -> list[Table]:
+        condition = self._filter_condition(
+            table_filter, "t.table_schema", "t.table_name"
+        )
+        names_only = table_filter is not None and table_filter.names_only
+        if names_only:
+            sql = f"""
+            SELECT
+                t.table_catalog,
+                t.table_schema,
+                t.table_name,
+                obj_description(cls.oid) AS table_comment
+            FROM
+                information_schema.tables t
+            LEFT JOIN
+                pg_class cls
+                ON cls.relname = t.table_name
+                AND cls.relnamespace = (
+                    SELECT oid FROM pg_namespace WHERE nspname = t.table_schema
+                )
+            WHERE
+                t.table_type IN ('BASE TABLE', 'VIEW')
+                AND t.table_schema NOT IN ('information_schema', 'pg_catalog'){condition};
+            """
+        else:
+            sql = f"""
             SELECT
                 t.table_catalog,
                 t.table_schema,
@@ -186,7 +214,7 @@ class PostgresMetadata(Metadata):
                 AND a.attname = c.column_name
             WHERE
                 t.table_type IN ('BASE TABLE', 'VIEW')
-                AND t.table_schema NOT IN ('information_schema', 'pg_catalog');
+                AND t.table_schema NOT IN ('information_schema', 'pg_catalog'){condition};
             """
         response = self.connection.sql(sql).to_pandas().to_dict(orient="records")
 
@@ -209,6 +237,8 @@ class PostgresMetadata(Metadata):
                     ),
                     primaryKey="",
                 )
+            if names_only:
+                continue
 
             # table exists, and add column to the table
             unique_tables[schema_table].columns.append(
@@ -220,6 +250,8 @@ class PostgresMetadata(Metadata):
                     properties=None,
                 )
             )
+        if names_only:
+            return list(unique_tables.values())
         extension_handler = ExtensionHandler(self.connection)
         unique_tables = extension_handler.augment(unique_tables)
         return list(unique_tables.values())
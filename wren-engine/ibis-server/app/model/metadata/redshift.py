@@ -8,6 +8,7 @@ from app.model.metadata.dto import (
     ConstraintType,
     RustWrenEngineColumnType,
     Table,
+    TableFilter,
     TableProperties,
 )
 from app.model.metadata.metadata import Metadata
@@ -52,12 +53,38 @@ REDSHIFT_TYPE_MAPPING = {
 
 
 class RedshiftMetadata(Metadata):
+    backslash_escapes = True
+
     def __init__(self, connection_info: RedshiftConnectionInfo):
         super().__init__(connection_info)
         self.connector = Connector("redshift", connection_info)
 
-    def get_table_list(self) -> list[Table]:
-        sql = """
+    def get_table_list(self, table_filter: TableFilter | None = None) -> list[Table]:
+        condition = self._filter_condition(
+            table_filter, "t.table_schema", "t.table_name"
+        )
+        names_only = table_filter is not None and table_filter.names_only
+        if names_only:
+            sql = f"""
+        SELECT
+            t.table_catalog,
+            t.table_schema,
+            t.table_name,
+            obj_description(cls.oid) AS table_comment
+        FROM
+            information_schema.tables t
+        LEFT JOIN
+            pg_class cls
+            ON cls.relname = t.table_name
+            AND cls.relnamespace = (
+                SELECT oid FROM pg_namespace WHERE nspname = t.table_schema
+            )
+        WHERE
+            t.table_type IN ('BASE TABLE', 'VIEW')
+            AND t.table_schema NOT IN ('information_schema', 'pg_catalog'){condition};
+        """
+        else:
+            sql = f"""
         SELECT
             t.table_catalog,
             t.table_schema,
@@ -86,7 +113,7 @@ class RedshiftMetadata(Metadata):
             AND a.attname = c.column_name
         WHERE
             t.table_type IN ('BASE TABLE', 'VIEW')
-            AND t.table_schema NOT IN ('information_schema', 'pg_catalog');
+            AND t.table_schema NOT IN ('information_schema', 'pg_catalog'){condition};
         """
         response = self.connector.query(sql).to_pylist()
 
@@ -108,6 +135,8 @@ class RedshiftMetadata(Metadata):
                     ),
                     primaryKey="",
                 )
+            if names_only:
+                continue
 
             unique_tables[schema_table].columns.append(
                 Column(
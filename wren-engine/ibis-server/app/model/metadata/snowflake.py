@@ -10,6 +10,7 @@ from app.model.metadata.dto import (
     ConstraintType,
     RustWrenEngineColumnType,
     Table,
+    TableFilter,
     TableProperties,
 )
 from app.model.metadata.metadata import Metadata
@@ -54,13 +55,35 @@ SNOWFLAKE_TYPE_MAPPING = {
 
 
 class SnowflakeMetadata(Metadata):
+    backslash_escapes = True
+
     def __init__(self, connection_info: SnowflakeConnectionInfo):
         super().__init__(connection_info)
         self.connection = DataSource.snowflake.get_connection(connection_info)
 
-    def get_table_list(self) -> list[Table]:
+    def get_table_list(self, table_filter: TableFilter | None = None) -> list[Table]:
         schema = self._get_schema_name()
-        sql = f"""
+        names_only = table_filter is not None and table_filter.names_only
+        if names_only:
+            condition = self._filter_condition(
+                table_filter, "t.TABLE_SCHEMA", "t.TABLE_NAME"
+            )
+            sql = f"""
+            SELECT
+                t.TABLE_CATALOG AS TABLE_CATALOG,
+                t.TABLE_SCHEMA AS TABLE_SCHEMA,
+                t.TABLE_NAME AS TABLE_NAME,
+                t.COMMENT AS TABLE_COMMENT
+            FROM
+                INFORMATION_SCHEMA.TABLES t
+            WHERE
+                t.TABLE_SCHEMA = '{schema}'{condition};
+        """
+        else:
+            condition = self._filter_condition(
+                table_filter, "c.TABLE_SCHEMA", "c.TABLE_NAME"
+            )
+            sql = f"""
             SELECT
                 c.TABLE_CATALOG AS TABLE_CATALOG,
                 c.TABLE_SCHEMA AS TABLE_SCHEMA,
@@ -77,7 +100,7 @@ class SnowflakeMetadata(Metadata):
                 ON c.TABLE_SCHEMA = t.TABLE_SCHEMA
                 AND c.TABLE_NAME = t.TABLE_NAME
             WHERE
-                c.TABLE_SCHEMA = '{schema}';
+                c.TABLE_SCHEMA = '{schema}'{condition};
         """
         response = self.connection.sql(sql).to_pandas().to_dict(orient="records")
 
@@ -100,6 +123,8 @@ class SnowflakeMetadata(Metadata):
                     ),
                     primaryKey="",
                 )
+            if names_only:
+                continue
 
             # table exists, and add column to the table
             unique_tables[schema_table].columns.append(
@@ -148,6 +173,22 @@ class SnowflakeMetadata(Metadata):
     def get_version(self) -> str:
         return self.connection.sql("SELECT CURRENT_VERSION()").to_pandas().iloc[0, 0]
 
+    def get_schema_versions(self) -> dict[str, str]:
+        schema = self._get_schema_name()
+        # LAST_ALTERED is updated by both DDL and DML, so a data change also renews the
+        # version. The table count catches the dropped tables.
+        sql = f"""
+            SELECT
+                COUNT(*) AS TABLE_COUNT,
+                TO_VARCHAR(MAX(LAST_ALTERED)) AS LAST_ALTERED
+            FROM
+                INFORMATION_SCHEMA.TABLES
+            WHERE
+                TABLE_SCHEMA = '{schema}';
+        """
+        row = self.connection.sql(sql).to_pandas().iloc[0]
+        return {schema: f"{row['TABLE_COUNT']}|{row['LAST_ALTERED']}"}
+
     def _get_database_name(self):
         return self.connection_info.database.get_secret_value()
 
@@ -10,6 +10,7 @@ from app.model.metadata.dto import (
     Constraint,
     RustWrenEngineColumnType,
     Table,
+    TableFilter,
     TableProperties,
 )
 from app.model.metadata.metadata import Metadata
@@ -56,9 +57,31 @@ class TrinoMetadata(Metadata):
         super().__init__(connection_info)
         self.connection = DataSource.trino.get_connection(connection_info)
 
-    def get_table_list(self) -> list[Table]:
+    def get_table_list(self, table_filter: TableFilter | None = None) -> list[Table]:
         schema = self._get_schema_name()
-        sql = f"""
+        condition = self._filter_condition(
+            table_filter, "t.table_schema", "t.table_name"
+        )
+        names_only = table_filter is not None and table_filter.names_only
+        if names_only:
+            sql = f"""
+                SELECT
+                    t.table_catalog,
+                    t.table_schema,
+                    t.table_name,
+                    tc.comment AS table_comment
+                FROM
+                    information_schema.tables AS t
+                INNER JOIN
+                    system.metadata.table_comments AS tc
+                    ON t.table_catalog = tc.catalog_name
+                    AND t.table_schema = tc.schema_name
+                    AND t.table_name = tc.table_name
+                WHERE t.table_schema = '{schema}'
+                AND t.table_catalog = (SELECT current_catalog){condition}
+                """
+        else:
+            sql = f"""
                 SELECT
                     t.table_catalog,
                     t.table_schema,
@@ -81,7 +104,7 @@ class TrinoMetadata(Metadata):
                     AND t.table_schema = tc.schema_name
                     AND t.table_name = tc.table_name
                 WHERE t.table_schema = '{schema}'
-                AND c.table_catalog = (SELECT current_catalog)
+                AND c.table_catalog = (SELECT current_catalog){condition}
                 """
         response = self.connection.sql(sql).to_pandas().to_dict(orient="records")
         unique_tables = {}
@@ -103,6 +126,8 @@ class TrinoMetadata(Metadata):
                     ),
                     primaryKey="",
                 )
+            if names_only:
+                continue
 
             # table exists, and add column to the table
             unique_tables[schema_table].columns.append(
@@ -7,10 +7,10 @@ from wren_core import (
     validate_rlac_rule,
 )
 
+from app.mdl.core import get_manifest_dict
 from app.mdl.rewriter import Rewriter
 from app.model.connector import Connector
 from app.model.error import ErrorCode, ErrorPhase, WrenError
-from app.util import base64_to_dict
 
 rules = ["column_is_valid", "relationship_is_valid", "rlac_condition_syntax_is_valid"]
 
@@ -73,7 +73,7 @@ class Validator:
                 phase=ErrorPhase.VALIDATION,
             )
 
-        manifest = base64_to_dict(manifest_str)
+        manifest = get_manifest_dict(manifest_str)
 
         relationship = list(
             filter(lambda r: r["name"] == relationship_name, manifest["relationships"])
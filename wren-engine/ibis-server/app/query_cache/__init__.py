@@ -1,6 +1,9 @@
+import asyncio
+from collections.abc import Awaitable, Callable
 from typing import Any, Optional
 
 import pyarrow as pa
+from loguru import logger
 from opentelemetry import trace
 
 from app.query_cache.manager import QueryCacheImpl
@@ -9,11 +12,24 @@ tracer = trace.get_tracer(__name__)
 
 
 class QueryCacheManager:
-    def __init__(self, delegate: QueryCacheImpl = None):
+    def __init__(
+        self, delegate: QueryCacheImpl = None, refresh_max_concurrency: int = 2
+    ):
         if delegate is None:
             self.delegate = QueryCacheImpl()
         else:
             self.delegate = delegate
+        # cache key -> the result of the in-flight query
+        self._in_flight: dict[str, asyncio.Future] = {}
+        self._coalesced = 0
+        # The max number of the concurrent background refreshes per data source
+        self.refresh_max_concurrency = refresh_max_concurrency
+        self._refreshing_keys: set[str] = set()
+        self._refreshing: dict[str, int] = {}
+        # Keep the references of the refresh tasks, or they may be garbage collected
+        self._refresh_tasks: set[asyncio.Task] = set()
+        self._refreshes = 0
+        self._refreshes_skipped = 0
 
     @tracer.start_as_current_span("get_cache", kind=trace.SpanKind.INTERNAL)
     def get(
@@ -33,8 +49,9 @@ class QueryCacheManager:
         result: pa.Table,
         info,
         headers: Optional[dict[str, str]] = None,
+        ttl_seconds: int | None = None,
     ) -> None:
-        self.delegate.set(data_source, sql, result, info, headers)
+        self.delegate.set(data_source, sql, result, info, headers, ttl_seconds)
 
     def get_cache_file_timestamp(
         self,
@@ -44,3 +61,98 @@ class QueryCacheManager:
         headers: Optional[dict[str, str]] = None,
     ) -> int | None:
         return self.delegate.get_cache_file_timestamp(data_source, sql, info, headers)
+
+    async def single_flight(
+        self,
+        data_source: str,
+        sql: str,
+        info,
+        headers: Optional[dict[str, str]],
+        execute: Callable[[], Awaitable[pa.Table]],
+    ) -> pa.Table:
+        """Execute the query once for the concurrent identical requests.
+
+        The requests with the same cache key wait on the in-flight execution and share
+        its result or its error, whether or not the query cache is enabled. The caller
+        should pass the dialect SQL, so the manifest and the limit are part of the key.
+        """
+        key = self.delegate._generate_cache_key(data_source, sql, info, headers)
+        span = trace.get_current_span()
+        while (flight := self._in_flight.get(key)) is not None:
+            self._coalesced += 1
+            span.set_attribute("query.coalesced", True)
+            try:
+                return await asyncio.shield(flight)
+            except asyncio.CancelledError:
+                # Execute it again if the request running the query was cancelled
+                if not flight.cancelled():
+                    raise
+
+        span.set_attribute("query.coalesced", False)
+        flight = asyncio.get_running_loop().create_future()
+        # Retrieve the error, it's fine that no request is waiting on it
+        flight.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self._in_flight[key] = flight
+        try:
+            result = await execute()
+        except asyncio.CancelledError:
+            flight.cancel()
+            raise
+        except Exception as e:
+            flight.set_exception(e)
+            raise
+        else:
+            flight.set_result(result)
+            return result
+        finally:
+            del self._in_flight[key]
+
+    def revalidate(
+        self,
+        data_source: str,
+        sql: str,
+        info,
+        headers: Optional[dict[str, str]],
+        refresh: Callable[[], Awaitable[pa.Table]],
+        ttl_seconds: int | None = None,
+    ) -> bool:
+        """Refresh the cache entry in the background and return whether it's scheduled.
+
+        At most one refresh runs per cache key and at most `refresh_max_concurrency`
+        refreshes run per data source. The refresh is skipped if the limit is reached,
+        the stale entry is served until a later request refreshes it.
+        """
+        key = self.delegate._generate_cache_key(data_source, sql, info, headers)
+        if (
+            key in self._refreshing_keys
+            or self._refreshing.get(data_source, 0) >= self.refresh_max_concurrency
+        ):
+            self._refreshes_skipped += 1
+            return False
+
+        self._refreshing_keys.add(key)
+        self._refreshing[data_source] = self._refreshing.get(data_source, 0) + 1
+        self._refreshes += 1
+
+        async def run():
+            try:
+                result = await refresh()
+                self.set(data_source, sql, result, info, headers, ttl_seconds)
+            except Exception as e:
+                logger.warning("Failed to refresh the query cache: {}", e)
+            finally:
+                self._refreshing_keys.discard(key)
+                self._refreshing[data_source] -= 1
+
+        task = asyncio.create_task(run())
+        self._refresh_tasks.add(task)
+        task.add_done_callback(self._refresh_tasks.discard)
+        return True
+
+    def stats(self) -> dict[str, int]:
+        return {
+            **self.delegate.stats(),
+            "coalesced": self._coalesced,
+            "refreshes": self._refreshes,
+            "refreshes_skipped": self._refreshes_skipped,
+        }
@@ -1,5 +1,11 @@
 import hashlib
+import os
+import sqlite3
+import threading
 import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from enum import StrEnum, auto
 from typing import Any, Optional
 
 import opendal
@@ -14,10 +20,48 @@ from app.dependencies import (
     X_WREN_VARIABLE_PREFIX,
 )
 
+# The magic bytes at the beginning of an Arrow IPC (Feather v2) file
+ARROW_IPC_MAGIC = b"ARROW1"
+# The SQLite database indexing the cache files in the cache directory
+INDEX_FILE_NAME = "index.sqlite3"
+
+
+class CacheFormat(StrEnum):
+    arrow = auto()
+    parquet = auto()
+
 
 class QueryCacheImpl:
-    def __init__(self, root: str = "/tmp/wren-engine/"):
+    def __init__(
+        self,
+        root: str = "/tmp/wren-engine/",
+        max_bytes: int = 0,
+        ttl_seconds: int = 0,
+        cache_format: CacheFormat = CacheFormat.arrow,
+        parquet_min_bytes: int = 0,
+    ):
         self.root = root
+        # Arrow IPC files are read with memory mapping, so the cache hits are
+        # zero-copy. Parquet files are smaller but must be decoded on every hit.
+        self.cache_format = CacheFormat(cache_format)
+        # The results larger than this are written as parquet even if the format
+        # is arrow, 0 means never
+        self.parquet_min_bytes = parquet_min_bytes
+        # The total size budget of the cache files, 0 means unlimited
+        self.max_bytes = max_bytes
+        # The default TTL of a cache entry, 0 means never expire
+        self.ttl_seconds = ttl_seconds
+        # The index of the cache files is a SQLite database beside them. It's shared
+        # by all the worker processes on the cache directory, so an entry written
+        # by one worker is a hit on the others, and the lookups don't need to list
+        # the whole directory. The rows are ordered by `last_used` for the LRU.
+        self._index_path = self._get_full_path(INDEX_FILE_NAME)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._build_index()
 
     def get(
         self,
@@ -27,24 +71,29 @@ class QueryCacheImpl:
         headers: Optional[dict[str, str]] = None,
     ) -> "Optional[Any]":
         cache_key = self._generate_cache_key(data_source, sql, info, headers)
-        cache_file_name = self._get_cache_file_name(cache_key)
+        try:
+            cache_file_name = self._get_cache_file_name(cache_key)
+        except sqlite3.Error as e:
+            logger.debug("Failed to look up query cache index: {}", e)
+            cache_file_name = None
+        if cache_file_name is None:
+            self._record_miss()
+            return None
 
-        op = self._get_dal_operator()
         full_path = self._get_full_path(cache_file_name)
-
-        # Check if cache file exists
-        if op.exists(cache_file_name):
-            try:
-                logger.info("Reading query cache {}", full_path)
-                con = self._get_duckdb_connection()
-                cache = con.read_parquet(full_path)
-                df = cache.to_arrow_table()
-                logger.info("query cache to dataframe")
-                return df
-            except Exception as e:
-                logger.debug("Failed to read query cache {}", e)
-                return None
-
+        try:
+            logger.info("Reading query cache {}", full_path)
+            df = self._read_cache_file(full_path)
+            logger.info("query cache to dataframe")
+            with self._lock:
+                self._hits += 1
+            return df
+        except FileNotFoundError:
+            # The cache file was removed outside of the cache
+            self._remove_index(cache_key, cache_file_name)
+        except Exception as e:
+            logger.debug("Failed to read query cache {}", e)
+        self._record_miss()
         return None
 
     def set(
@@ -54,6 +103,7 @@ class QueryCacheImpl:
         result: pa.Table,
         info,
         headers: Optional[dict[str, str]] = None,
+        ttl_seconds: int | None = None,
     ) -> None:
         cache_key = self._generate_cache_key(data_source, sql, info, headers)
         cache_file_name = self._set_cache_file_name(cache_key)
@@ -61,16 +111,44 @@ class QueryCacheImpl:
         full_path = self._get_full_path(cache_file_name)
         try:
             # Create cache directory if it doesn't exist
-            with op.open(cache_file_name, mode="wb") as file:
-                logger.info("Writing query cache to {}", full_path)
-                con = self._get_duckdb_connection()
-                arrow_table = con.from_arrow(result)
-                if file.writable():
-                    arrow_table.write_parquet(full_path)
+            op.create_dir("/")
+            logger.info("Writing query cache to {}", full_path)
+            # The sets of the same query in the same millisecond get the same file
+            # name, so the file is written aside and moved in place under the lock
+            temp_path = f"{full_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            self._write_cache_file(result, temp_path)
+            size = os.path.getsize(temp_path)
         except Exception as e:
             logger.debug("Failed to write query cache: {}", e)
             return
 
+        ttl_seconds = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        now = time.time()
+        try:
+            with self._transaction() as conn:
+                os.replace(temp_path, full_path)
+                # Make only one cache file per query
+                replaced = conn.execute(
+                    "SELECT file_name FROM entries WHERE cache_key = ?", (cache_key,)
+                ).fetchone()
+                conn.execute(
+                    "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?)",
+                    (
+                        cache_key,
+                        cache_file_name,
+                        self._parse_timestamp(cache_file_name),
+                        size,
+                        now + ttl_seconds if ttl_seconds > 0 else None,
+                        now,
+                    ),
+                )
+        except Exception as e:
+            logger.debug("Failed to write query cache: {}", e)
+            return
+        if replaced is not None and replaced[0] != cache_file_name:
+            self._delete_file(replaced[0])
+        self._evict()
+
     def get_cache_file_timestamp(
         self,
         data_source: str,
@@ -79,19 +157,30 @@ class QueryCacheImpl:
         headers: Optional[dict[str, str]] = None,
     ) -> int | None:
         cache_key = self._generate_cache_key(data_source, sql, info, headers)
-        op = self._get_dal_operator()
-        for file in op.list("/"):
-            if file.path.startswith(cache_key):
-                # xxxxxxxxxxxxxx-1744016574.cache
-                # we only care about the timestamp part
-                try:
-                    timestamp = int(file.path.split("-")[-1].split(".")[0])
-                    return timestamp
-                except (IndexError, ValueError) as e:
-                    logger.debug(
-                        f"Failed to extract timestamp from cache file {file.path}: {e}"
-                    )
-        return None
+        row = (
+            self._connect()
+            .execute("SELECT timestamp FROM entries WHERE cache_key = ?", (cache_key,))
+            .fetchone()
+        )
+        return row[0] if row else None
+
+    def stats(self) -> dict[str, int]:
+        # The entries and the bytes are of the directory shared by all the workers,
+        # the hits, misses and evictions are of this worker only
+        entries, bytes_used = (
+            self._connect()
+            .execute("SELECT count(*), coalesce(sum(size), 0) FROM entries")
+            .fetchone()
+        )
+        with self._lock:
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+                "entries": entries,
+                "bytes_used": bytes_used,
+                "max_bytes": self.max_bytes,
+            }
 
     def _generate_cache_key(
         self, data_source: str, sql: str, info, headers: dict[str, str] | None = None
@@ -138,25 +227,219 @@ class QueryCacheImpl:
 
         return headers_str
 
-    def _get_cache_file_name(self, cache_key: str) -> str:
-        op = self._get_dal_operator()
-        for file in op.list("/"):
-            if file.path.startswith(cache_key):
-                return file.path
+    def _get_cache_file_name(self, cache_key: str) -> str | None:
+        now = time.time()
+        with self._transaction() as conn:
+            row = conn.execute(
+                "SELECT file_name, expire_at FROM entries WHERE cache_key = ?",
+                (cache_key,),
+            ).fetchone()
+            if row is None:
+                return None
+            file_name, expire_at = row
+            if expire_at is None or expire_at > now:
+                conn.execute(
+                    "UPDATE entries SET last_used = ? WHERE cache_key = ?",
+                    (now, cache_key),
+                )
+                return file_name
+            conn.execute("DELETE FROM entries WHERE cache_key = ?", (cache_key,))
+        with self._lock:
+            self._evictions += 1
+        self._delete_file(file_name)
+        return None
 
+    def _set_cache_file_name(self, cache_key: str) -> str:
+        # The old cache file of the query is deleted once the new one is indexed
         cache_create_timestamp = int(time.time() * 1000)
         return f"{cache_key}-{cache_create_timestamp}.cache"
 
-    def _set_cache_file_name(self, cache_key: str) -> str:
-        # Delete old cache files, make only one cache file per query
+    def _evict(self) -> None:
+        """Evict the expired entries, then the least recently used ones over budget.
+
+        The budget covers the files of all the workers sharing the cache directory.
+        """
+        evicted = []
+        with self._transaction() as conn:
+            expired = conn.execute(
+                "SELECT cache_key, file_name FROM entries WHERE expire_at <= ?",
+                (time.time(),),
+            ).fetchall()
+            conn.executemany(
+                "DELETE FROM entries WHERE cache_key = ?", [(k,) for k, _ in expired]
+            )
+            evicted += [file_name for _, file_name in expired]
+            (bytes_used,) = conn.execute(
+                "SELECT coalesce(sum(size), 0) FROM entries"
+            ).fetchone()
+            if self.max_bytes > 0 and bytes_used > self.max_bytes:
+                # Always keep the most recently used entry even if it exceeds the budget
+                rows = conn.execute(
+                    "SELECT cache_key, file_name, size FROM entries ORDER BY last_used"
+                ).fetchall()[:-1]
+                over_budget = []
+                for cache_key, file_name, size in rows:
+                    if bytes_used <= self.max_bytes:
+                        break
+                    over_budget.append((cache_key,))
+                    evicted.append(file_name)
+                    bytes_used -= size
+                conn.executemany("DELETE FROM entries WHERE cache_key = ?", over_budget)
+        with self._lock:
+            self._evictions += len(evicted)
+        for file_name in evicted:
+            self._delete_file(file_name)
+
+    def _build_index(self) -> None:
         op = self._get_dal_operator()
-        for file in op.list("/"):
-            if file.path.startswith(cache_key):
-                logger.info(f"Deleting old cache file {file.path}")
-                op.delete(file.path)
+        try:
+            op.create_dir("/")
+            with self._transaction() as conn:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS entries ("
+                    "cache_key TEXT PRIMARY KEY, "
+                    "file_name TEXT NOT NULL, "
+                    "timestamp INTEGER NOT NULL, "
+                    "size INTEGER NOT NULL, "
+                    "expire_at REAL, "
+                    "last_used REAL NOT NULL)"
+                )
+                conn.execute(
+                    "CREATE INDEX IF NOT EXISTS entries_last_used ON entries (last_used)"
+                )
+                conn.execute(
+                    "CREATE INDEX IF NOT EXISTS entries_expire_at ON entries (expire_at)"
+                )
+                indexed = dict(
+                    conn.execute("SELECT file_name, cache_key FROM entries").fetchall()
+                )
+                files = [
+                    file.path for file in op.list("/") if file.path.endswith(".cache")
+                ]
+                stale = self._index_files(conn, files, indexed)
+        except Exception as e:
+            logger.warning("Failed to build query cache index: {}", e)
+            return
+        for file_name in stale:
+            self._delete_file(file_name)
+        logger.info("Query cache index built with {} entries", self.stats()["entries"])
+        self._evict()
 
-        cache_create_timestamp = int(time.time() * 1000)
-        return f"{cache_key}-{cache_create_timestamp}.cache"
+    def _index_files(
+        self, conn: sqlite3.Connection, files: list[str], indexed: dict[str, str]
+    ) -> list[str]:
+        """Index the cache files left without an entry, and return the stale files.
+
+        The rows of the missing files are removed, and only the newest file is kept
+        if there are leftovers for the same key.
+        """
+        present = set(files)
+        missing = [(k,) for f, k in indexed.items() if f not in present]
+        conn.executemany("DELETE FROM entries WHERE cache_key = ?", missing)
+        newest = {
+            k: self._parse_timestamp(f) for f, k in indexed.items() if f in present
+        }
+
+        stale = []
+        for path in sorted(files, key=self._parse_timestamp, reverse=True):
+            if path in indexed:
+                continue
+            # xxxxxxxxxxxxxx-1744016574.cache
+            cache_key = path.rsplit("-", 1)[0]
+            timestamp = self._parse_timestamp(path)
+            if cache_key in newest and newest[cache_key] >= timestamp:
+                stale.append(path)
+                continue
+            try:
+                size = os.path.getsize(self._get_full_path(path))
+            except OSError as e:
+                logger.debug(f"Failed to read cache file {path}: {e}")
+                continue
+            # The TTL of the request isn't known, so use the default TTL
+            expire_at = (
+                timestamp / 1000 + self.ttl_seconds if self.ttl_seconds > 0 else None
+            )
+            conn.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?)",
+                (cache_key, path, timestamp, size, expire_at, timestamp / 1000),
+            )
+            newest[cache_key] = timestamp
+        return stale
+
+    def _remove_index(self, cache_key: str, cache_file_name: str) -> None:
+        with self._transaction() as conn:
+            conn.execute(
+                "DELETE FROM entries WHERE cache_key = ? AND file_name = ?",
+                (cache_key, cache_file_name),
+            )
+
+    def _record_miss(self) -> None:
+        with self._lock:
+            self._misses += 1
+
+    def _connect(self) -> sqlite3.Connection:
+        # SQLite connections can't be shared by threads, so each thread has its own
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self._index_path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("PRAGMA synchronous = NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        # Take the write lock up front, so the workers are serialized instead of
+        # failing to upgrade a read transaction
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def _delete_file(self, cache_file_name: str) -> None:
+        logger.info(f"Deleting cache file {cache_file_name}")
+        try:
+            self._get_dal_operator().delete(cache_file_name)
+        except Exception as e:
+            logger.debug(f"Failed to delete cache file {cache_file_name}: {e}")
+
+    @staticmethod
+    def _parse_timestamp(cache_file_name: str) -> int:
+        # we only care about the timestamp part
+        return int(cache_file_name.split("-")[-1].split(".")[0])
+
+    def _write_cache_file(self, result: pa.Table, full_path: str) -> None:
+        if self._get_cache_format(result) == CacheFormat.arrow:
+            with (
+                pa.OSFile(full_path, "wb") as sink,
+                pa.ipc.new_file(sink, result.schema) as writer,
+            ):
+                writer.write_table(result)
+        else:
+            con = self._get_duckdb_connection()
+            con.from_arrow(result).write_parquet(full_path)
+
+    def _get_cache_format(self, result: pa.Table) -> CacheFormat:
+        if 0 < self.parquet_min_bytes < result.nbytes:
+            return CacheFormat.parquet
+        return self.cache_format
+
+    def _read_cache_file(self, full_path: str) -> pa.Table:
+        # The format is detected by the file content, so a cache directory can
+        # contain both formats, e.g. after changing the format of the cache.
+        source = pa.memory_map(full_path, "r")
+        if source.read(len(ARROW_IPC_MAGIC)) == ARROW_IPC_MAGIC:
+            source.seek(0)
+            # The table references the mapped memory instead of copying it.
+            # It's safe because a cache file is never rewritten in place.
+            return pa.ipc.open_file(source).read_all()
+        source.close()
+        con = self._get_duckdb_connection()
+        return con.read_parquet(full_path).to_arrow_table()
 
     def _get_full_path(self, path: str) -> str:
         return self.root + path
@@ -1,5 +1,6 @@
 from typing import Annotated
 
+import pyarrow as pa
 from fastapi import APIRouter, Depends, Query, Request, Response
 from fastapi.responses import ORJSONResponse
 from loguru import logger
@@ -11,6 +12,7 @@ from app.dependencies import (
     X_CACHE_HIT,
     X_CACHE_OVERRIDE,
     X_CACHE_OVERRIDE_AT,
+    X_TOTAL_COUNT,
     get_wren_headers,
     verify_query_dto,
 )
@@ -23,17 +25,17 @@ from app.model import (
     TranspileDTO,
     ValidateDTO,
 )
-from app.model.connector import Connector
+from app.model.connector_pool import ConnectorPool
 from app.model.data_source import DataSource
-from app.model.metadata.dto import Constraint, MetadataDTO, Table
+from app.model.dry_run_cache import get_dry_run_cache
+from app.model.metadata.cache import get_metadata_cache
+from app.model.metadata.dto import Constraint, MetadataDTO, Table, TableListDTO
 from app.model.metadata.factory import MetadataFactory
 from app.model.validator import Validator
 from app.query_cache import QueryCacheManager
 from app.util import (
     build_context,
     execute_dry_run_with_timeout,
-    execute_get_constraints_with_timeout,
-    execute_get_table_list_with_timeout,
     execute_get_version_with_timeout,
     execute_query_with_timeout,
     execute_validate_with_timeout,
@@ -56,6 +58,10 @@ def get_query_cache_manager(request: Request) -> QueryCacheManager:
     return request.state.query_cache_manager
 
 
+def get_connector_pool(request: Request) -> ConnectorPool:
+    return request.state.connector_pool
+
+
 @router.post(
     "/{data_source}/query",
     dependencies=[Depends(verify_query_dto)],
@@ -76,9 +82,17 @@ async def query(
     override_cache: Annotated[
         bool, Query(alias="overrideCache", description="ovrride the exist cache")
     ] = False,
+    cache_ttl: Annotated[
+        int | None,
+        Query(
+            alias="cacheTtl",
+            description="the TTL seconds of the created cache, override the default TTL",
+        ),
+    ] = None,
     limit: int | None = Query(None, description="limit the number of rows returned"),
     java_engine_connector: JavaEngineConnector = Depends(get_java_engine_connector),
     query_cache_manager: QueryCacheManager = Depends(get_query_cache_manager),
+    connector_pool: ConnectorPool = Depends(get_connector_pool),
     is_fallback: bool | None = None,
 ) -> Response:
     span_name = f"v2_query_{data_source}"
@@ -106,17 +120,32 @@ async def query(
         # If it is dry run.
         # We don't need to check query cache
         if dry_run:
-            rewritten_sql = await Rewriter(
+
+            async def _dry_run():
+                rewritten_sql = await Rewriter(
+                    dto.manifest_str,
+                    data_source=data_source,
+                    java_engine_connector=java_engine_connector,
+                ).rewrite(sql)
+                with connector_pool.acquire(data_source, connection_info) as connector:
+                    await execute_dry_run_with_timeout(
+                        connector,
+                        rewritten_sql,
+                    )
+
+            cached = await get_dry_run_cache().dry_run(
+                "v2",
                 dto.manifest_str,
-                data_source=data_source,
-                java_engine_connector=java_engine_connector,
-            ).rewrite(sql)
-            connector = Connector(data_source, connection_info)
-            await execute_dry_run_with_timeout(
-                connector,
-                rewritten_sql,
+                data_source,
+                connection_info,
+                sql,
+                headers_dict,
+                _dry_run,
             )
-            return Response(status_code=204)
+            response = Response(status_code=204)
+            if cached:
+                response.headers[X_CACHE_HIT] = "true"
+            return response
 
         # Not a dry run
         # Check if the query is cached
@@ -147,10 +176,14 @@ async def query(
                 data_source=data_source,
                 java_engine_connector=java_engine_connector,
             ).rewrite(sql)
-            connector = Connector(data_source, connection_info)
-            result = await execute_query_with_timeout(
-                connector,
+            result = await query_cache_manager.single_flight(
+                data_source,
                 rewritten_sql,
+                connection_info,
+                headers_dict,
+                lambda: execute_pooled_query(
+                    data_source, rewritten_sql, connection_info, connector_pool
+                ),
             )
 
             # headers for all non-hit cases
@@ -172,6 +205,7 @@ async def query(
                     result,
                     connection_info,
                     headers_dict,
+                    ttl_seconds=cache_ttl,
                 )
 
                 cache_headers[X_CACHE_OVERRIDE] = "true"
@@ -192,6 +226,7 @@ async def query(
                     result,
                     connection_info,
                     headers_dict,
+                    ttl_seconds=cache_ttl,
                 )
             # case 5~8 Other cases (cache is not enabled)
             elif not cache_enable:
@@ -218,6 +253,7 @@ async def validate(
     rule_name: str,
     dto: ValidateDTO,
     java_engine_connector: JavaEngineConnector = Depends(get_java_engine_connector),
+    connector_pool: ConnectorPool = Depends(get_connector_pool),
     is_fallback: bool | None = None,
 ) -> Response:
     span_name = f"v2_validate_{data_source}"
@@ -228,20 +264,21 @@ async def validate(
         connection_info = data_source.get_connection_info(
             dto.connection_info, dict(headers)
         )
-        validator = Validator(
-            Connector(data_source, connection_info),
-            Rewriter(
+        with connector_pool.acquire(data_source, connection_info) as connector:
+            validator = Validator(
+                connector,
+                Rewriter(
+                    dto.manifest_str,
+                    data_source=data_source,
+                    java_engine_connector=java_engine_connector,
+                ),
+            )
+            await execute_validate_with_timeout(
+                validator,
+                rule_name,
+                dto.parameters,
                 dto.manifest_str,
-                data_source=data_source,
-                java_engine_connector=java_engine_connector,
-            ),
-        )
-        await execute_validate_with_timeout(
-            validator,
-            rule_name,
-            dto.parameters,
-            dto.manifest_str,
-        )
+            )
         response = Response(status_code=204)
         if is_fallback:
             get_fallback_message(
@@ -258,7 +295,12 @@ async def validate(
 )
 async def get_table_list(
     data_source: DataSource,
-    dto: MetadataDTO,
+    dto: TableListDTO,
+    response: Response,
+    refresh: Annotated[
+        bool,
+        Query(description="read the catalog again instead of the cached tables"),
+    ] = False,
     headers: Annotated[Headers, Depends(get_wren_headers)] = None,
 ) -> list[Table]:
     span_name = f"v2_metadata_tables_{data_source}"
@@ -269,8 +311,16 @@ async def get_table_list(
         connection_info = data_source.get_connection_info(
             dto.connection_info, dict(headers)
         )
-        metadata = MetadataFactory.get_metadata(data_source, connection_info)
-        return await execute_get_table_list_with_timeout(metadata)
+        tables = await get_metadata_cache().get_table_list(
+            data_source, connection_info, refresh, dto.to_filter()
+        )
+        response.headers[X_TOTAL_COUNT] = str(len(tables))
+        if dto.limit is None and dto.offset == 0:
+            return tables
+        # Sort the tables by name, so the pages are stable across the requests
+        tables = sorted(tables, key=lambda table: table.name)
+        end = None if dto.limit is None else dto.offset + dto.limit
+        return tables[dto.offset : end]
 
 
 @router.post(
@@ -282,6 +332,10 @@ async def get_table_list(
 async def get_constraints(
     data_source: DataSource,
     dto: MetadataDTO,
+    refresh: Annotated[
+        bool,
+        Query(description="read the catalog again instead of the cached constraints"),
+    ] = False,
     headers: Annotated[Headers, Depends(get_wren_headers)] = None,
 ) -> list[Constraint]:
     span_name = f"v2_metadata_constraints_{data_source}"
@@ -292,8 +346,9 @@ async def get_constraints(
         connection_info = data_source.get_connection_info(
             dto.connection_info, dict(headers)
         )
-        metadata = MetadataFactory.get_metadata(data_source, connection_info)
-        return await execute_get_constraints_with_timeout(metadata)
+        return await get_metadata_cache().get_constraints(
+            data_source, connection_info, refresh
+        )
 
 
 @router.post(
@@ -373,6 +428,7 @@ async def model_substitute(
     dto: TranspileDTO,
     headers: Annotated[Headers, Depends(get_wren_headers)] = None,
     java_engine_connector: JavaEngineConnector = Depends(get_java_engine_connector),
+    connector_pool: ConnectorPool = Depends(get_connector_pool),
     is_fallback: bool | None = None,
 ) -> str:
     span_name = f"v2_model_substitute_{data_source}"
@@ -386,18 +442,29 @@ async def model_substitute(
         sql = ModelSubstitute(data_source, dto.manifest_str, headers).substitute(
             dto.sql, write="trino"
         )
-        connector = Connector(data_source, connection_info)
-        rewritten_sql = await Rewriter(
-            dto.manifest_str,
-            data_source=data_source,
-            java_engine_connector=java_engine_connector,
-        ).rewrite(sql)
-        await execute_dry_run_with_timeout(
-            connector,
-            rewritten_sql,
-        )
+        with connector_pool.acquire(data_source, connection_info) as connector:
+            rewritten_sql = await Rewriter(
+                dto.manifest_str,
+                data_source=data_source,
+                java_engine_connector=java_engine_connector,
+            ).rewrite(sql)
+            await execute_dry_run_with_timeout(
+                connector,
+                rewritten_sql,
+            )
         if is_fallback:
             get_fallback_message(
                 logger, "model_substitute", data_source, dto.manifest_str, dto.sql
             )
         return sql
+
+
+async def execute_pooled_query(
+    data_source: DataSource,
+    sql: str,
+    connection_info,
+    connector_pool: ConnectorPool,
+) -> pa.Table:
+    """Execute the SQL on a pooled connector, shared by the v2 and v3 queries."""
+    with connector_pool.acquire(data_source, connection_info) as connector:
+        return await execute_query_with_timeout(connector, sql)
@@ -1,9 +1,10 @@
 from fastapi import APIRouter
 
-from app.routers.v3 import connector
+from app.routers.v3 import connector, manifest
 
 prefix = "/v3"
 
 router = APIRouter(prefix=prefix)
 
 router.include_router(connector.router)
+router.include_router(manifest.router)
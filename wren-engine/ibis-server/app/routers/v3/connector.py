@@ -1,49 +1,80 @@
+import asyncio
+import time
+from collections.abc import AsyncIterator, Iterator
+from contextlib import ExitStack
+from datetime import datetime
 from typing import Annotated
 
 import duckdb
-from fastapi import APIRouter, Depends, Query, Response
-from fastapi.responses import ORJSONResponse
+import pyarrow as pa
+from fastapi import APIRouter, Depends, Header, Query, Response
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from loguru import logger
 from opentelemetry import trace
 from starlette.datastructures import Headers
 
 from app.config import get_config
 from app.dependencies import (
+    X_CACHE_AGE,
     X_CACHE_CREATE_AT,
     X_CACHE_HIT,
     X_CACHE_OVERRIDE,
     X_CACHE_OVERRIDE_AT,
+    X_CORRELATION_ID,
     X_WREN_FALLBACK_DISABLE,
     get_wren_headers,
     is_backward_compatible,
+    verify_query_batch_dto,
     verify_query_dto,
 )
-from app.mdl.core import get_session_context
+from app.mdl.core import get_manifest_store, get_session_context
 from app.mdl.java_engine import JavaEngineConnector
 from app.mdl.rewriter import Rewriter
 from app.mdl.substitute import ModelSubstitute
 from app.model import (
-    DryPlanDTO,
-    QueryDTO,
-    TranspileDTO,
-    ValidateDTO,
+    DryPlanBatchDTO,
+    ManifestDTO,
+    QueryBatchDTO,
+    V3DryPlanDTO,
+    V3QueryDTO,
+    V3TranspileDTO,
+    V3ValidateDTO,
 )
-from app.model.connector import Connector
+from app.model.connector_pool import ConnectorPool
 from app.model.data_source import DataSource
-from app.model.error import DatabaseTimeoutError
+from app.model.dry_run_cache import get_dry_run_cache
+from app.model.error import (
+    DatabaseTimeoutError,
+    DataSourceBusyError,
+    ErrorCode,
+    ErrorResponse,
+    WrenError,
+)
 from app.model.validator import Validator
 from app.query_cache import QueryCacheManager
 from app.routers import v2
-from app.routers.v2.connector import get_java_engine_connector, get_query_cache_manager
+from app.routers.v2.connector import (
+    execute_pooled_query,
+    get_connector_pool,
+    get_java_engine_connector,
+    get_query_cache_manager,
+)
 from app.util import (
+    ARROW_STREAM_MEDIA_TYPE,
+    NDJSON_MEDIA_TYPE,
+    accept_arrow_stream,
     append_fallback_context,
     build_context,
     execute_dry_run_with_timeout,
-    execute_query_with_timeout,
+    execute_fetch_with_timeout,
+    execute_query_batches_with_timeout,
     execute_validate_with_timeout,
+    iter_arrow_stream,
+    iter_ndjson,
     pushdown_limit,
     safe_strtobool,
     set_attribute,
+    to_arrow_stream,
     to_json,
     update_response_headers,
 )
@@ -59,7 +90,7 @@ tracer = trace.get_tracer(__name__)
 )
 async def query(
     data_source: DataSource,
-    dto: QueryDTO,
+    dto: V3QueryDTO,
     dry_run: Annotated[
         bool,
         Query(alias="dryRun", description="enable dryRun mode for validating SQL only"),
@@ -70,10 +101,37 @@ async def query(
     override_cache: Annotated[
         bool, Query(alias="overrideCache", description="ovrride the exist cache")
     ] = False,
+    cache_ttl: Annotated[
+        int | None,
+        Query(
+            alias="cacheTtl",
+            description="the TTL seconds of the created cache, override the default TTL",
+        ),
+    ] = None,
+    stale_while_revalidate: Annotated[
+        bool,
+        Query(
+            alias="staleWhileRevalidate",
+            description="return the cached result immediately and refresh the cache in the background, works with cacheEnable",
+        ),
+    ] = False,
     limit: int | None = Query(None, description="limit the number of rows returned"),
+    stream: Annotated[
+        bool,
+        Query(
+            description="stream the result in record batches as NDJSON or an Arrow IPC stream, the query cache is not used"
+        ),
+    ] = False,
     headers: Annotated[Headers, Depends(get_wren_headers)] = None,
+    accept: Annotated[
+        str | None,
+        Header(
+            description=f"use `{ARROW_STREAM_MEDIA_TYPE}` to get the result as an Arrow IPC stream"
+        ),
+    ] = None,
     java_engine_connector: JavaEngineConnector = Depends(get_java_engine_connector),
     query_cache_manager: QueryCacheManager = Depends(get_query_cache_manager),
+    connector_pool: ConnectorPool = Depends(get_connector_pool),
 ) -> Response:
     span_name = f"v3_query_{data_source}"
     if dry_run:
@@ -85,6 +143,7 @@ async def query(
         name=span_name, kind=trace.SpanKind.SERVER, context=build_context(headers)
     ) as span:
         set_attribute(headers, span)
+        _resolve_manifest(dto)
         connection_info = data_source.get_connection_info(
             dto.connection_info, dict(headers)
         )
@@ -94,18 +153,52 @@ async def query(
         try:
             if dry_run:
                 sql = pushdown_limit(dto.sql, limit)
+
+                async def _dry_run():
+                    rewritten_sql = await Rewriter(
+                        dto.manifest_str,
+                        data_source=data_source,
+                        experiment=True,
+                        properties=dict(headers),
+                    ).rewrite(sql)
+                    with connector_pool.acquire(
+                        data_source, connection_info
+                    ) as connector:
+                        await execute_dry_run_with_timeout(
+                            connector,
+                            rewritten_sql,
+                        )
+
+                cached = await get_dry_run_cache().dry_run(
+                    "v3",
+                    dto.manifest_str,
+                    data_source,
+                    connection_info,
+                    sql,
+                    headers_dict,
+                    _dry_run,
+                )
+                response = Response(status_code=204)
+                if cached:
+                    response.headers[X_CACHE_HIT] = "true"
+                return response
+
+            if stream:
+                sql = pushdown_limit(dto.sql, limit)
                 rewritten_sql = await Rewriter(
                     dto.manifest_str,
                     data_source=data_source,
                     experiment=True,
                     properties=dict(headers),
                 ).rewrite(sql)
-                connector = Connector(data_source, connection_info)
-                await execute_dry_run_with_timeout(
-                    connector,
+                return await _query_stream(
+                    data_source,
                     rewritten_sql,
+                    connection_info,
+                    headers,
+                    accept,
+                    connector_pool,
                 )
-                return Response(status_code=204)
 
             # Not a dry run
             # Check if the query is cached
@@ -119,29 +212,51 @@ async def query(
                 cache_hit = cached_result is not None
 
             cache_headers = {}
-            # case 1: cache hit read
-            if cache_enable and cache_hit and not override_cache:
+            # case 1: cache hit read, the stale result is also read if revalidating
+            if (
+                cache_enable
+                and cache_hit
+                and (not override_cache or stale_while_revalidate)
+            ):
                 span.add_event("cache hit")
                 result = cached_result
                 cache_headers[X_CACHE_HIT] = "true"
-                cache_headers[X_CACHE_CREATE_AT] = str(
-                    query_cache_manager.get_cache_file_timestamp(
-                        data_source, dto.sql, connection_info, headers_dict
-                    )
+                create_at = query_cache_manager.get_cache_file_timestamp(
+                    data_source, dto.sql, connection_info, headers_dict
                 )
+                cache_headers[X_CACHE_CREATE_AT] = str(create_at)
+                if stale_while_revalidate:
+                    if create_at is not None:
+                        cache_headers[X_CACHE_AGE] = str(
+                            max(int(time.time() - create_at / 1000), 0)
+                        )
+                    if query_cache_manager.revalidate(
+                        data_source,
+                        dto.sql,
+                        connection_info,
+                        headers_dict,
+                        lambda: _rewrite_and_query(
+                            data_source,
+                            dto.manifest_str,
+                            pushdown_limit(dto.sql, limit),
+                            headers,
+                            connection_info,
+                            query_cache_manager,
+                            connector_pool,
+                        ),
+                        ttl_seconds=cache_ttl,
+                    ):
+                        span.add_event("cache revalidate")
             # all other cases require rewriting + connecting
             else:
-                sql = pushdown_limit(dto.sql, limit)
-                rewritten_sql = await Rewriter(
+                result = await _rewrite_and_query(
+                    data_source,
                     dto.manifest_str,
-                    data_source=data_source,
-                    experiment=True,
-                    properties=dict(headers),
-                ).rewrite(sql)
-                connector = Connector(data_source, connection_info)
-                result = await execute_query_with_timeout(
-                    connector,
-                    rewritten_sql,
+                    pushdown_limit(dto.sql, limit),
+                    headers,
+                    connection_info,
+                    query_cache_manager,
+                    connector_pool,
                 )
 
                 # headers for all non-hit cases
@@ -163,6 +278,7 @@ async def query(
                         result,
                         connection_info,
                         headers_dict,
+                        ttl_seconds=cache_ttl,
                     )
                     cache_headers[X_CACHE_OVERRIDE] = "true"
                     cache_headers[X_CACHE_OVERRIDE_AT] = str(
@@ -182,16 +298,25 @@ async def query(
                         result,
                         connection_info,
                         headers_dict,
+                        ttl_seconds=cache_ttl,
                     )
                 elif not cache_enable:
                     # case 5~8 Other cases (cache is not enabled)
                     pass
 
-            response = ORJSONResponse(to_json(result, headers, data_source=data_source))
+            if accept_arrow_stream(accept):
+                response = Response(
+                    to_arrow_stream(result, headers, data_source=data_source),
+                    media_type=ARROW_STREAM_MEDIA_TYPE,
+                )
+            else:
+                response = ORJSONResponse(
+                    to_json(result, headers, data_source=data_source)
+                )
             update_response_headers(response, cache_headers)
             return response
-        except DatabaseTimeoutError:
-            # won't fallback to v2 if timeout
+        except (DatabaseTimeoutError, DataSourceBusyError):
+            # won't fallback to v2 if timeout or the data source is busy
             raise
         except Exception as e:
             is_fallback_disable = bool(
@@ -222,7 +347,9 @@ async def query(
                     is_fallback=True,
                     cache_enable=cache_enable,
                     override_cache=override_cache,
+                    cache_ttl=cache_ttl,
                     query_cache_manager=query_cache_manager,
+                    connector_pool=connector_pool,
                 )
             except Exception as ve:
                 # ignore v2 error messages in fallback, return v3 error instead.
@@ -232,16 +359,73 @@ async def query(
                 raise e from None
 
 
+@router.post(
+    "/{data_source}/query:batch",
+    dependencies=[Depends(verify_query_batch_dto)],
+    description="query the specified data source with many SQL statements, the results and errors are returned per statement",
+)
+async def query_batch(
+    data_source: DataSource,
+    dto: QueryBatchDTO,
+    limit: int | None = Query(
+        None, description="limit the number of rows returned per statement"
+    ),
+    headers: Annotated[Headers, Depends(get_wren_headers)] = None,
+    query_cache_manager: QueryCacheManager = Depends(get_query_cache_manager),
+    connector_pool: ConnectorPool = Depends(get_connector_pool),
+) -> Response:
+    span_name = f"v3_query_batch_{data_source}"
+    with tracer.start_as_current_span(
+        name=span_name, kind=trace.SpanKind.SERVER, context=build_context(headers)
+    ) as span:
+        set_attribute(headers, span)
+        _resolve_manifest(dto)
+        span.set_attribute("query_batch.size", len(dto.sqls))
+        connection_info = data_source.get_connection_info(
+            dto.connection_info, dict(headers)
+        )
+        # All the statements are planned at once against the session context of the
+        # whole manifest, then each running statement checks out a pooled connector.
+        planned = await Rewriter(
+            dto.manifest_str,
+            data_source=data_source,
+            experiment=True,
+            properties=dict(headers),
+        ).rewrite_batch([pushdown_limit(sql, limit) for sql in dto.sqls])
+        semaphore = asyncio.Semaphore(get_config().query_batch_max_parallelism)
+
+        async def _run_one(rewritten_sql: str | WrenError) -> dict:
+            try:
+                if isinstance(rewritten_sql, WrenError):
+                    raise rewritten_sql
+                async with semaphore:
+                    result = await _query_rewritten(
+                        data_source,
+                        rewritten_sql,
+                        headers,
+                        connection_info,
+                        query_cache_manager,
+                        connector_pool,
+                    )
+                return to_json(result, headers, data_source=data_source)
+            except Exception as e:
+                return {"error": _to_error_response(e, headers)}
+
+        results = await asyncio.gather(*[_run_one(sql) for sql in planned])
+        return ORJSONResponse({"results": results})
+
+
 @router.post("/dry-plan", description="get the planned WrenSQL")
 async def dry_plan(
     headers: Annotated[Headers, Depends(get_wren_headers)],
-    dto: DryPlanDTO,
+    dto: V3DryPlanDTO,
     java_engine_connector: JavaEngineConnector = Depends(get_java_engine_connector),
 ) -> str:
     with tracer.start_as_current_span(
         name="dry_plan", kind=trace.SpanKind.SERVER, context=build_context(headers)
     ) as span:
         set_attribute(headers, span)
+        _resolve_manifest(dto)
         try:
             return await Rewriter(
                 dto.manifest_str, experiment=True, properties=dict(headers)
@@ -286,7 +470,7 @@ async def dry_plan(
 async def dry_plan_for_data_source(
     headers: Annotated[Headers, Depends(get_wren_headers)],
     data_source: DataSource,
-    dto: DryPlanDTO,
+    dto: V3DryPlanDTO,
     java_engine_connector: JavaEngineConnector = Depends(get_java_engine_connector),
 ) -> str:
     span_name = f"v3_dry_plan_{data_source}"
@@ -294,6 +478,7 @@ async def dry_plan_for_data_source(
         name=span_name, kind=trace.SpanKind.SERVER, context=build_context(headers)
     ) as span:
         set_attribute(headers, span)
+        _resolve_manifest(dto)
         try:
             return await Rewriter(
                 dto.manifest_str,
@@ -336,6 +521,44 @@ async def dry_plan_for_data_source(
                 raise e from None
 
 
+@router.post(
+    "/dry-plan:batch",
+    description="get the planned WrenSQL of many SQL statements, the planned SQL and errors are returned per statement",
+)
+async def dry_plan_batch(
+    headers: Annotated[Headers, Depends(get_wren_headers)],
+    dto: DryPlanBatchDTO,
+) -> Response:
+    with tracer.start_as_current_span(
+        name="dry_plan_batch",
+        kind=trace.SpanKind.SERVER,
+        context=build_context(headers),
+    ) as span:
+        set_attribute(headers, span)
+        _resolve_manifest(dto)
+        span.set_attribute("dry_plan_batch.size", len(dto.sqls))
+        return await _dry_plan_batch(None, dto, headers)
+
+
+@router.post(
+    "/{data_source}/dry-plan:batch",
+    description="get the dialect SQL of many SQL statements for the specified data source, the dialect SQL and errors are returned per statement",
+)
+async def dry_plan_batch_for_data_source(
+    headers: Annotated[Headers, Depends(get_wren_headers)],
+    data_source: DataSource,
+    dto: DryPlanBatchDTO,
+) -> Response:
+    span_name = f"v3_dry_plan_batch_{data_source}"
+    with tracer.start_as_current_span(
+        name=span_name, kind=trace.SpanKind.SERVER, context=build_context(headers)
+    ) as span:
+        set_attribute(headers, span)
+        _resolve_manifest(dto)
+        span.set_attribute("dry_plan_batch.size", len(dto.sqls))
+        return await _dry_plan_batch(data_source, dto, headers)
+
+
 @router.post(
     "/{data_source}/validate/{rule_name}", description="validate the specified rule"
 )
@@ -343,36 +566,39 @@ async def validate(
     headers: Annotated[Headers, Depends(get_wren_headers)],
     data_source: DataSource,
     rule_name: str,
-    dto: ValidateDTO,
+    dto: V3ValidateDTO,
     java_engine_connector: JavaEngineConnector = Depends(get_java_engine_connector),
+    connector_pool: ConnectorPool = Depends(get_connector_pool),
 ) -> Response:
     span_name = f"v3_validate_{data_source}"
     with tracer.start_as_current_span(
         name=span_name, kind=trace.SpanKind.SERVER, context=build_context(headers)
     ) as span:
         set_attribute(headers, span)
+        _resolve_manifest(dto)
         connection_info = data_source.get_connection_info(
             dto.connection_info, dict(headers)
         )
         try:
-            validator = Validator(
-                Connector(data_source, connection_info),
-                Rewriter(
+            with connector_pool.acquire(data_source, connection_info) as connector:
+                validator = Validator(
+                    connector,
+                    Rewriter(
+                        dto.manifest_str,
+                        data_source=data_source,
+                        experiment=True,
+                        properties=dict(headers),
+                    ),
+                )
+                await execute_validate_with_timeout(
+                    validator,
+                    rule_name,
+                    dto.parameters,
                     dto.manifest_str,
-                    data_source=data_source,
-                    experiment=True,
-                    properties=dict(headers),
-                ),
-            )
-            await execute_validate_with_timeout(
-                validator,
-                rule_name,
-                dto.parameters,
-                dto.manifest_str,
-            )
+                )
             return Response(status_code=204)
-        except DatabaseTimeoutError:
-            # won't fallback to v2 if timeout
+        except (DatabaseTimeoutError, DataSourceBusyError):
+            # won't fallback to v2 if timeout or the data source is busy
             raise
         except Exception as e:
             is_fallback_disable = bool(
@@ -399,6 +625,7 @@ async def validate(
                     rule_name=rule_name,
                     dto=dto,
                     java_engine_connector=java_engine_connector,
+                    connector_pool=connector_pool,
                     headers=headers,
                     is_fallback=True,
                 )
@@ -448,15 +675,17 @@ def functions(
 )
 async def model_substitute(
     data_source: DataSource,
-    dto: TranspileDTO,
+    dto: V3TranspileDTO,
     headers: Annotated[Headers, Depends(get_wren_headers)],
     java_engine_connector: JavaEngineConnector = Depends(get_java_engine_connector),
+    connector_pool: ConnectorPool = Depends(get_connector_pool),
 ) -> str:
     span_name = f"v3_model-substitute_{data_source}"
     with tracer.start_as_current_span(
         name=span_name, kind=trace.SpanKind.SERVER, context=build_context(headers)
     ) as span:
         set_attribute(headers, span)
+        _resolve_manifest(dto)
         connection_info = data_source.get_connection_info(
             dto.connection_info, dict(headers)
         )
@@ -464,19 +693,19 @@ async def model_substitute(
             sql = ModelSubstitute(data_source, dto.manifest_str, headers).substitute(
                 dto.sql
             )
-            connector = Connector(data_source, connection_info)
-            rewritten_sql = await Rewriter(
-                dto.manifest_str,
-                data_source=data_source,
-                java_engine_connector=java_engine_connector,
-            ).rewrite(sql)
-            await execute_dry_run_with_timeout(
-                connector,
-                rewritten_sql,
-            )
+            with connector_pool.acquire(data_source, connection_info) as connector:
+                rewritten_sql = await Rewriter(
+                    dto.manifest_str,
+                    data_source=data_source,
+                    java_engine_connector=java_engine_connector,
+                ).rewrite(sql)
+                await execute_dry_run_with_timeout(
+                    connector,
+                    rewritten_sql,
+                )
             return sql
-        except DatabaseTimeoutError:
-            # won't fallback to v2 if timeout
+        except (DatabaseTimeoutError, DataSourceBusyError):
+            # won't fallback to v2 if timeout or the data source is busy
             raise
         except Exception as e:
             is_fallback_disable = bool(
@@ -501,6 +730,7 @@ async def model_substitute(
                     dto=dto,
                     headers=headers,
                     java_engine_connector=java_engine_connector,
+                    connector_pool=connector_pool,
                     is_fallback=True,
                 )
             except Exception as ve:
@@ -510,3 +740,151 @@ async def model_substitute(
                     ve,
                 )
                 raise e from None
+
+
+async def _dry_plan_batch(
+    data_source: DataSource | None, dto: DryPlanBatchDTO, headers: Headers
+) -> Response:
+    # The statements are planned by the embedded engine only, a failed statement
+    # doesn't fallback to v2.
+    results = await Rewriter(
+        dto.manifest_str,
+        data_source=data_source,
+        experiment=True,
+        properties=dict(headers),
+    ).rewrite_batch(dto.sqls)
+    return ORJSONResponse(
+        {
+            "results": [
+                {"error": _to_error_response(result, headers)}
+                if isinstance(result, WrenError)
+                else {"sql": result}
+                for result in results
+            ]
+        }
+    )
+
+
+def _resolve_manifest(dto: ManifestDTO) -> None:
+    # A manifest registered by `POST /v3/manifests` is referred to by its id
+    if dto.manifest_str is None:
+        dto.manifest_str = get_manifest_store().get(dto.manifest_id).manifest_str
+
+
+def _to_error_response(e: Exception, headers: Headers) -> dict:
+    correlation_id = headers.get(X_CORRELATION_ID)
+    if isinstance(e, WrenError):
+        response = e.get_response(correlation_id=correlation_id)
+    else:
+        response = ErrorResponse(
+            error_code=ErrorCode.GENERIC_INTERNAL_ERROR.name,
+            message=str(e),
+            timestamp=datetime.now().isoformat(),
+            correlation_id=correlation_id,
+        )
+    return response.model_dump(by_alias=True)
+
+
+async def _query_stream(
+    data_source: DataSource,
+    sql: str,
+    connection_info,
+    headers: Headers,
+    accept: str | None,
+    connector_pool: ConnectorPool,
+) -> StreamingResponse:
+    batch_size = get_config().query_stream_batch_size
+    # The batches are read under the timeout of the whole query
+    deadline = asyncio.get_running_loop().time() + get_config().app_timeout_seconds
+    with ExitStack() as stack:
+        connector = stack.enter_context(
+            connector_pool.acquire(data_source, connection_info)
+        )
+        reader = await execute_query_batches_with_timeout(connector, sql, batch_size)
+        # The response holds the connector until the last batch is sent
+        stack = stack.pop_all()
+
+    if accept_arrow_stream(accept):
+        chunks = iter_arrow_stream(reader, headers, data_source=data_source)
+        media_type = ARROW_STREAM_MEDIA_TYPE
+    else:
+        chunks = iter_ndjson(reader, headers, data_source=data_source)
+        media_type = NDJSON_MEDIA_TYPE
+    return _ClosingStreamingResponse(
+        _iterate_and_close(connector, chunks, stack, deadline), media_type=media_type
+    )
+
+
+async def _iterate_and_close(
+    connector, chunks: Iterator[bytes], stack: ExitStack, deadline: float
+) -> AsyncIterator[bytes]:
+    # Every batch is read and serialized in the bulkhead of the data source. If the
+    # stream fails or is closed early, the connector is left in the middle of the
+    # result, so the pool discards it.
+    with stack:
+        try:
+            while (
+                chunk := await execute_fetch_with_timeout(connector, chunks, deadline)
+            ) is not None:
+                yield chunk
+        except DataSourceBusyError as e:
+            # Unlike a rejected query, the connector has been used
+            raise WrenError(e.error_code, e.message, phase=e.phase) from e
+
+
+class _ClosingStreamingResponse(StreamingResponse):
+    """A streaming response that closes its iterator if the client disconnects.
+
+    Starlette stops iterating without closing the iterator, which would hold the
+    pooled connector until the generator is garbage collected.
+    """
+
+    async def stream_response(self, send) -> None:
+        try:
+            await super().stream_response(send)
+        finally:
+            await self.body_iterator.aclose()
+
+
+async def _rewrite_and_query(
+    data_source: DataSource,
+    manifest_str: str,
+    sql: str,
+    headers: Headers,
+    connection_info,
+    query_cache_manager: QueryCacheManager,
+    connector_pool: ConnectorPool,
+) -> pa.Table:
+    rewritten_sql = await Rewriter(
+        manifest_str,
+        data_source=data_source,
+        experiment=True,
+        properties=dict(headers),
+    ).rewrite(sql)
+    return await _query_rewritten(
+        data_source,
+        rewritten_sql,
+        headers,
+        connection_info,
+        query_cache_manager,
+        connector_pool,
+    )
+
+
+async def _query_rewritten(
+    data_source: DataSource,
+    rewritten_sql: str,
+    headers: Headers,
+    connection_info,
+    query_cache_manager: QueryCacheManager,
+    connector_pool: ConnectorPool,
+) -> pa.Table:
+    return await query_cache_manager.single_flight(
+        data_source,
+        rewritten_sql,
+        connection_info,
+        dict(headers) if headers else None,
+        lambda: execute_pooled_query(
+            data_source, rewritten_sql, connection_info, connector_pool
+        ),
+    )
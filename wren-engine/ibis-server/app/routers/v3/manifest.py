@@ -0,0 +1,20 @@
+from fastapi import APIRouter
+
+from app.mdl.core import get_manifest_store
+from app.model import RegisterManifestDTO
+
+router = APIRouter(prefix="/manifests", tags=["manifest"])
+
+
+@router.post(
+    "",
+    description="register the manifest, the other APIs can refer to it by the returned `manifestId` instead of `manifestStr`",
+)
+def register_manifest(dto: RegisterManifestDTO) -> dict:
+    manifest = get_manifest_store().register(dto.manifest_str)
+    return {"manifestId": manifest.id}
+
+
+@router.get("/stats", description="get the statistics of the manifest store")
+def manifest_stats() -> dict:
+    return get_manifest_store().stats()
@@ -1,6 +1,7 @@
 import asyncio
 import base64
 import time
+from collections.abc import Iterator
 
 try:
     import clickhouse_connect
@@ -13,10 +14,12 @@ except ImportError:  # pragma: no cover
 
 
 import datafusion
+import numpy as np
 import orjson
 import pandas as pd
 import psycopg
 import pyarrow as pa
+import pyarrow.compute as pc
 import trino
 import wren_core
 from fastapi import Header
@@ -32,24 +35,40 @@ from opentelemetry.trace import (
 from opentelemetry.trace.propagation.tracecontext import TraceContextTextMapPropagator
 from starlette.datastructures import Headers
 
+from app.cache import LRUCache
 from app.config import get_config
 from app.dependencies import (
+    X_CACHE_AGE,
     X_CACHE_CREATE_AT,
     X_CACHE_HIT,
     X_CACHE_OVERRIDE,
     X_CACHE_OVERRIDE_AT,
     X_WREN_TIMEZONE,
 )
+from app.model.bulkhead import get_bulkhead
 from app.model.data_source import DataSource
 from app.model.error import DatabaseTimeoutError
+from app.model.metadata.dto import TableFilter
 from app.model.metadata.metadata import Metadata
 
 tracer = trace.get_tracer(__name__)
 
+# Creating a session context costs milliseconds. The limit is pushed down without a
+# manifest, so a single default context is shared by all the requests and threads.
+_pushdown_limit_context = wren_core.SessionContext()
+_pushdown_limit_cache: LRUCache[tuple[str, int | None], str] = LRUCache(
+    get_config().pushdown_limit_cache_size
+)
+
 
 MIGRATION_MESSAGE = "Wren engine is migrating to Rust version now. \
     Wren AI team are appreciate if you can provide the error messages and related logs for us."
 
+ARROW_STREAM_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+# The same options as ORJSONResponse
+_ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
 
 @tracer.start_as_current_span("base64_to_dict", kind=trace.SpanKind.INTERNAL)
 def base64_to_dict(base64_str: str) -> dict:
@@ -67,6 +86,24 @@ def to_json(df: pa.Table, headers: dict, data_source: DataSource = None) -> dict
             "dtypes": dtypes,
         }
 
+    if not all(_is_vectorized_type(field.type) for field in df.schema):
+        return _to_json_with_datafusion(df, headers, dtypes)
+
+    # Format the whole columns with the Arrow compute kernels, only the formatted
+    # values are converted to Python objects
+    columns = [_format_column(column).to_pylist() for column in df.columns]
+    return {
+        "columns": df.column_names,
+        "data": _to_rows(columns),
+        "dtypes": dtypes,
+    }
+
+
+def _to_rows(columns: list[list]) -> list[list]:
+    return [list(row) for row in zip(*columns)]
+
+
+def _to_json_with_datafusion(df: pa.Table, headers: dict, dtypes: dict) -> dict:
     ctx = get_datafusion_context(headers)
     ctx.register_record_batches(name="arrow_table", partitions=[df.to_batches()])
 
@@ -84,6 +121,85 @@ def to_json(df: pa.Table, headers: dict, data_source: DataSource = None) -> dict
     return result
 
 
+def accept_arrow_stream(accept: str | None) -> bool:
+    if not accept:
+        return False
+    return any(
+        media_range.split(";")[0].strip() == ARROW_STREAM_MEDIA_TYPE
+        for media_range in accept.split(",")
+    )
+
+
+@tracer.start_as_current_span("to_arrow_stream", kind=trace.SpanKind.INTERNAL)
+def to_arrow_stream(
+    df: pa.Table, headers: dict, data_source: DataSource = None
+) -> memoryview:
+    """Serialize the table to the Arrow IPC stream format without row-wise conversion."""
+    df = _with_session_timezone(df, headers, data_source)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, df.schema) as writer:
+        writer.write_table(df)
+    return memoryview(sink.getvalue())
+
+
+def iter_ndjson(
+    reader: pa.RecordBatchReader, headers: dict, data_source: DataSource = None
+) -> Iterator[bytes]:
+    """Serialize the record batches to NDJSON one batch at a time.
+
+    The first line is an object with the `columns` and `dtypes` of the result, and
+    each following line is a row formatted like the `data` of `to_json`.
+    """
+    result = to_json(reader.schema.empty_table(), headers, data_source)
+    yield orjson.dumps({"columns": result["columns"], "dtypes": result["dtypes"]})
+    yield b"\n"
+    for batch in reader:
+        if batch.num_rows == 0:
+            continue
+        result = to_json(pa.Table.from_batches([batch]), headers, data_source)
+        yield b"".join(
+            orjson.dumps(row, option=_ORJSON_OPTIONS) + b"\n" for row in result["data"]
+        )
+
+
+def iter_arrow_stream(
+    reader: pa.RecordBatchReader, headers: dict, data_source: DataSource = None
+) -> Iterator[bytes]:
+    """Serialize the record batches to the Arrow IPC stream format one batch at a time."""
+    schema = _with_session_timezone(
+        reader.schema.empty_table(), headers, data_source
+    ).schema
+    sink = _ChunkSink()
+    with pa.ipc.new_stream(pa.PythonFile(sink, mode="w"), schema) as writer:
+        for batch in reader:
+            writer.write_table(pa.Table.from_batches([batch]).cast(schema))
+            yield sink.pop()
+    yield sink.pop()
+
+
+class _ChunkSink:
+    """A writable file object that keeps the written bytes until they are popped."""
+
+    def __init__(self):
+        self._chunks = []
+        self.closed = False
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.closed = True
+
+    def pop(self) -> bytes:
+        chunk = b"".join(self._chunks)
+        self._chunks.clear()
+        return chunk
+
+
 def _with_session_timezone(
     df: pa.Table, headers: dict, data_source: DataSource
 ) -> pa.Table:
@@ -170,8 +286,16 @@ def append_fallback_context(headers: Header, span: trace.Span) -> Headers:
 
 @tracer.start_as_current_span("pushdown_limit", kind=trace.SpanKind.INTERNAL)
 def pushdown_limit(sql: str, limit: int | None) -> str:
-    ctx = wren_core.SessionContext()
-    return ctx.pushdown_limit(sql, limit)
+    key = (sql, limit)
+    rewritten_sql = _pushdown_limit_cache.get(key)
+    trace.get_current_span().set_attribute(
+        "pushdown_limit_cache.hit", rewritten_sql is not None
+    )
+    if rewritten_sql is None:
+        rewritten_sql = _pushdown_limit_cache.put(
+            key, _pushdown_limit_context.pushdown_limit(sql, limit)
+        )
+    return rewritten_sql
 
 
 def get_fallback_message(
@@ -212,6 +336,8 @@ def update_response_headers(response, required_headers: dict):
         response.headers[X_CACHE_OVERRIDE] = required_headers[X_CACHE_OVERRIDE]
     if X_CACHE_OVERRIDE_AT in required_headers:
         response.headers[X_CACHE_OVERRIDE_AT] = required_headers[X_CACHE_OVERRIDE_AT]
+    if X_CACHE_AGE in required_headers:
+        response.headers[X_CACHE_AGE] = required_headers[X_CACHE_AGE]
 
 
 def _quote_identifier(identifier: str) -> str:
@@ -242,6 +368,212 @@ def _formater(field: pa.Field) -> str:
     return column_name
 
 
+# The range of the 32-bit transition times in the time zone database of pyarrow
+_TZDB_MIN_MICROSECONDS = -(2**31) * 1_000_000
+_TZDB_MAX_MICROSECONDS = 2**31 * 1_000_000
+
+
+def _is_vectorized_type(data_type: pa.DataType) -> bool:
+    # The other types (e.g. interval, nested) are formatted by DataFusion
+    return (
+        pa.types.is_integer(data_type)
+        or pa.types.is_float32(data_type)
+        or pa.types.is_float64(data_type)
+        or pa.types.is_boolean(data_type)
+        or pa.types.is_string(data_type)
+        or pa.types.is_large_string(data_type)
+        or pa.types.is_null(data_type)
+        or pa.types.is_decimal128(data_type)
+        or pa.types.is_date(data_type)
+        or pa.types.is_timestamp(data_type)
+        or pa.types.is_binary(data_type)
+    )
+
+
+def _format_column(column: pa.ChunkedArray) -> pa.ChunkedArray | pa.Array:
+    # The output should be the same as the DataFusion formatter in `_formater`
+    data_type = column.type
+    if pa.types.is_decimal(data_type):
+        return _format_decimal(column.combine_chunks())
+    if pa.types.is_date(data_type):
+        return column.cast(pa.string())
+    if pa.types.is_timestamp(data_type):
+        # The fraction digits follow the unit, so truncate the timestamps to
+        # microseconds to always get 6 digits like `%.6f`
+        utc = pc.floor_temporal(
+            column.cast(pa.timestamp(data_type.unit)), unit="microsecond"
+        ).cast(pa.timestamp("us"))
+        if data_type.tz is None:
+            return utc.cast(pa.string())
+        return _format_timestamp_with_tz(utc.combine_chunks(), data_type.tz)
+    if pa.types.is_binary(data_type):
+        return _format_binary(column.combine_chunks())
+    if pa.types.is_integer(data_type) and column.null_count > 0:
+        # pandas converts the integers with nulls to doubles
+        return column.cast(pa.float64(), safe=False)
+    return column
+
+
+def _format_timestamp_with_tz(utc: pa.Array, tz: str) -> pa.Array:
+    local = pc.local_timestamp(utc.cast(pa.timestamp("us", tz=tz)))
+    utc_values = utc.cast(pa.int64()).fill_null(0).to_numpy()
+    offsets = (local.cast(pa.int64()).fill_null(0).to_numpy() - utc_values) // 1_000_000
+    # A column has only a few distinct offsets, so format each of them once
+    distinct, indices = np.unique(offsets, return_inverse=True)
+    offset_text = pa.array([_format_offset(offset) for offset in distinct.tolist()])
+    text = pc.binary_join_element_wise(
+        local.cast(pa.string()), offset_text.take(pa.array(indices)), " "
+    )
+    # pyarrow and chrono-tz apply different rules out of the 32-bit range (e.g. the
+    # DST after 2037), so these rare timestamps are formatted by DataFusion as before
+    others = utc.is_valid().to_numpy(zero_copy_only=False) & (
+        (utc_values < _TZDB_MIN_MICROSECONDS) | (utc_values >= _TZDB_MAX_MICROSECONDS)
+    )
+    if not others.any():
+        return text
+    ctx = datafusion.SessionContext()
+    ctx.register_record_batches(
+        name="arrow_table",
+        partitions=[
+            [
+                pa.record_batch(
+                    [utc.filter(pa.array(others)).cast(pa.timestamp("us", tz=tz))],
+                    names=["value"],
+                )
+            ]
+        ],
+    )
+    formatted = ctx.sql(
+        "SELECT to_char(value, '%Y-%m-%d %H:%M:%S%.6f %Z') FROM arrow_table"
+    ).to_arrow_table()
+    return pc.replace_with_mask(
+        text, pa.array(others), formatted.column(0).combine_chunks()
+    )
+
+
+def _format_offset(seconds: int) -> str:
+    # Like chrono, the seconds (e.g. of the LMT offsets) are printed only if not zero
+    sign = "-" if seconds < 0 else "+"
+    hours, seconds = divmod(abs(seconds), 3600)
+    minutes, seconds = divmod(seconds, 60)
+    if seconds:
+        return f"{sign}{hours:02}:{minutes:02}:{seconds:02}"
+    return f"{sign}{hours:02}:{minutes:02}"
+
+
+def _format_decimal(array: pa.Array) -> pa.Array:
+    values = pa.array(
+        _decimal_to_double(array),
+        mask=array.is_null().to_numpy(zero_copy_only=False),
+    )
+    text = pc.cast(values, pa.string())
+    # pyarrow and ryu (used by DataFusion) both print the shortest digits, but
+    # ryu uses the exponent notation only out of [1e-5, 1e16) and always prints a
+    # fraction for the integers
+    zero = pc.equal(values, 0)
+    plain = pc.or_(
+        zero,
+        pc.match_substring_regex(
+            text, r"^-?(0\.0{0,4}[1-9][0-9]*|[1-9][0-9]{0,15}(\.[0-9]+)?)$"
+        ),
+    )
+    text = pc.if_else(
+        pc.match_substring(text, "."), text, pc.binary_join_element_wise(text, ".0", "")
+    )
+    others = pc.invert(plain.fill_null(True))
+    if pc.any(others).as_py():
+        formatted = [
+            _format_double(value) for value in values.filter(others).to_pylist()
+        ]
+        text = pc.replace_with_mask(text, others, pa.array(formatted, pa.string()))
+    return pc.if_else(zero, "0", text)
+
+
+def _decimal_to_double(array: pa.Array) -> np.ndarray:
+    # The same as the `i128 as f64 / 10_f64.powi(scale)` cast of arrow-rs. Unlike
+    # the decimal cast of pyarrow, the 128-bit integers are rounded correctly.
+    words = np.frombuffer(array.buffers()[1], dtype=np.uint64)
+    words = words[2 * array.offset : 2 * (array.offset + len(array))]
+    low, high = words[0::2], words[1::2]
+    negative = high.view(np.int64) < 0
+    # The magnitude of the two's complement integers
+    low = np.where(negative, ~low + np.uint64(1), low)
+    high = np.where(negative, ~high + (low == 0), high)
+
+    result = low.astype(np.float64)
+    wide = high > 0
+    if wide.any():
+        high, low = high[wide], low[wide]
+        # The bit length of the high words
+        shift = np.frexp(high.astype(np.float64))[1].astype(np.uint64)
+        shift -= (high >> (shift - np.uint64(1))) == 0
+        # Keep the top 64 bits and a sticky bit for the rounding
+        top = (
+            (high << (np.uint64(64) - shift))
+            | (low >> shift)
+            | ((low & ((np.uint64(1) << shift) - np.uint64(1))) != 0)
+        )
+        result[wide] = np.ldexp(top.astype(np.float64), shift.astype(np.int64))
+    result = np.where(negative, -result, result)
+    return result / _powi(10.0, array.type.scale)
+
+
+def _powi(base: float, exponent: int) -> float:
+    # The same multiplications as Rust's `f64::powi`
+    result = 1.0
+    n = abs(exponent)
+    while True:
+        if n & 1:
+            result *= base
+        n //= 2
+        if n == 0:
+            break
+        base *= base
+    return 1 / result if exponent < 0 else result
+
+
+def _format_double(value: float) -> str:
+    # Format a double like ryu
+    mantissa, _, exponent = repr(abs(value)).partition("e")
+    integer, _, fraction = mantissa.partition(".")
+    digits = (integer + fraction).lstrip("0")
+    # The position of the decimal point after the first significant digit
+    point = len(integer) + int(exponent or 0) - len(integer + fraction) + len(digits)
+    digits = digits.rstrip("0")
+    if len(digits) <= point <= 16:
+        text = digits + "0" * (point - len(digits)) + ".0"
+    elif 0 < point <= 16:
+        text = f"{digits[:point]}.{digits[point:]}"
+    elif -5 < point <= 0:
+        text = "0." + "0" * -point + digits
+    elif len(digits) == 1:
+        text = f"{digits}e{point - 1}"
+    else:
+        text = f"{digits[0]}.{digits[1:]}e{point - 1}"
+    return "-" + text if value < 0 else text
+
+
+_HEX_DIGITS = np.array([f"{i:02x}" for i in range(256)], dtype="S2")
+
+
+def _format_binary(array: pa.Array) -> pa.Array:
+    # The same as `encode(column, 'hex')`, the offsets are doubled for the hex digits
+    validity, offsets, data = array.buffers()
+    offsets = np.frombuffer(offsets, dtype=np.int32)[: array.offset + len(array) + 1]
+    data = np.frombuffer(data or b"", dtype=np.uint8)[: offsets[-1]]
+    return pa.Array.from_buffers(
+        pa.large_string(),
+        len(array),
+        [
+            validity,
+            pa.py_buffer(offsets.astype(np.int64) * 2),
+            pa.py_buffer(_HEX_DIGITS[data].tobytes()),
+        ],
+        null_count=array.null_count,
+        offset=array.offset,
+    )
+
+
 def _safe_close_connector(connector):
     """Safely close a connector with additional error handling."""
     try:
@@ -254,10 +586,18 @@ def _safe_close_connector(connector):
 app_timeout_seconds = get_config().app_timeout_seconds
 
 
-async def execute_with_timeout(operation, operation_name: str):
-    """Asynchronously execute an operation with a timeout."""
+async def execute_with_timeout(
+    operation, operation_name: str, timeout: float | None = None
+):
+    """Asynchronously execute an operation with a timeout.
+
+    The timeout defaults to the app timeout, a smaller one is the time left of an
+    operation started earlier.
+    """
     try:
-        return await asyncio.wait_for(operation, timeout=app_timeout_seconds)
+        return await asyncio.wait_for(
+            operation, timeout=app_timeout_seconds if timeout is None else timeout
+        )
     except TimeoutError:
         raise DatabaseTimeoutError(
             f"{operation_name} timeout after {app_timeout_seconds} seconds"
@@ -278,11 +618,12 @@ async def _safe_execute_task_with_timeout(
     operation_name: str,
     query_task: asyncio.Task,
     connector,
+    timeout: float | None = None,
 ):
     """Execute a database query with a timeout control and handle cancellation."""
     try:
         # Create the query task
-        return await execute_with_timeout(query_task, operation_name)
+        return await execute_with_timeout(query_task, operation_name, timeout)
     except DatabaseTimeoutError:
         # Cancel the task if it's still running
         if query_task and not query_task.done():
@@ -316,7 +657,7 @@ async def execute_query_with_timeout(
 ):
     """Execute a database query with a timeout control."""
     query_task = asyncio.create_task(
-        asyncio.to_thread(connector.query, sql, limit=limit)
+        get_bulkhead(connector.data_source).run(connector.query, sql, limit=limit)
     )
     return await _safe_execute_task_with_timeout(
         "Query",
@@ -325,6 +666,44 @@ async def execute_query_with_timeout(
     )
 
 
+async def execute_query_batches_with_timeout(
+    connector,
+    sql: str,
+    batch_size: int,
+    limit: int | None = None,
+):
+    """Execute a database query with a timeout control and read the result in record batches."""
+    query_task = asyncio.create_task(
+        get_bulkhead(connector.data_source).run(
+            connector.query_batches, sql, batch_size, limit=limit
+        )
+    )
+    return await _safe_execute_task_with_timeout(
+        "Query",
+        query_task,
+        connector,
+    )
+
+
+async def execute_fetch_with_timeout(
+    connector, chunks: Iterator[bytes], deadline: float
+) -> bytes | None:
+    """Read the next chunk of a streamed query result with a timeout control.
+
+    The chunks are read in the bulkhead of the data source, and the query times out
+    at the `deadline` of the event loop time. Returns None after the last chunk.
+    """
+    fetch_task = asyncio.create_task(
+        get_bulkhead(connector.data_source).run(next, chunks, None)
+    )
+    return await _safe_execute_task_with_timeout(
+        "Query",
+        fetch_task,
+        connector,
+        deadline - asyncio.get_running_loop().time(),
+    )
+
+
 async def execute_validate_with_timeout(
     validator,
     rule_name: str,
@@ -340,7 +719,9 @@ async def execute_validate_with_timeout(
 
 async def execute_dry_run_with_timeout(connector, sql: str):
     """Dry run a database query with a timeout control."""
-    dry_run_task = asyncio.create_task(asyncio.to_thread(connector.dry_run, sql))
+    dry_run_task = asyncio.create_task(
+        get_bulkhead(connector.data_source).run(connector.dry_run, sql)
+    )
     return await _safe_execute_task_with_timeout(
         "Dry-Run",
         dry_run_task,
@@ -350,10 +731,11 @@ async def execute_dry_run_with_timeout(connector, sql: str):
 
 async def execute_get_table_list_with_timeout(
     metadata: Metadata,
+    table_filter: TableFilter | None = None,
 ):
     """Get the list of tables with a timeout control."""
     return await execute_with_timeout(
-        asyncio.to_thread(metadata.get_table_list),
+        asyncio.to_thread(metadata.get_table_list, table_filter),
         "Get Table List",
     )
 
@@ -368,6 +750,16 @@ async def execute_get_constraints_with_timeout(
     )
 
 
+async def execute_get_schema_versions_with_timeout(
+    metadata: Metadata,
+):
+    """Get the last modified version of each schema with a timeout control."""
+    return await execute_with_timeout(
+        asyncio.to_thread(metadata.get_schema_versions),
+        "Get Schema Versions",
+    )
+
+
 async def execute_get_version_with_timeout(
     metadata: Metadata,
 ):
@@ -2,7 +2,12 @@ import base64
 
 import orjson
 
-from app.mdl.core import get_session_context
+from app.mdl.core import (
+    SessionContextCache,
+    _manifest_hashes,
+    get_manifest_hash,
+    get_session_context,
+)
 from tests.conftest import file_path
 
 
@@ -25,3 +30,56 @@ def test_cache():
     session_context_1 = get_session_context(manifest_str, function_path)
     session_context_2 = get_session_context(manifest_str, function_path)
     assert session_context_1 is session_context_2
+
+
+def test_cache_eviction():
+    function_path = file_path("../resources/function_list")
+    cache = SessionContextCache(capacity=1)
+    manifest_str_1 = _manifest_str("my_schema_1")
+    manifest_str_2 = _manifest_str("my_schema_2")
+
+    session_context_1 = cache.get(manifest_str_1, function_path)
+    assert cache.get(manifest_str_1, function_path) is session_context_1
+    cache.get(manifest_str_2, function_path)
+    assert cache.get(manifest_str_1, function_path) is not session_context_1
+    assert cache.stats() == {
+        "hits": 1,
+        "misses": 3,
+        "evictions": 2,
+        "size": 1,
+        "capacity": 1,
+    }
+
+
+def test_cache_invalidate():
+    function_path = file_path("../resources/function_list")
+    cache = SessionContextCache(capacity=2)
+    manifest_str_1 = _manifest_str("my_schema_1")
+    manifest_str_2 = _manifest_str("my_schema_2")
+    session_context_1 = cache.get(manifest_str_1, function_path)
+    cache.get(manifest_str_2, function_path)
+
+    assert cache.invalidate(get_manifest_hash(manifest_str_2)) == 1
+    assert cache.get(manifest_str_1, function_path) is session_context_1
+    assert cache.invalidate() == 1
+    assert cache.stats()["size"] == 0
+
+
+def test_manifest_hash():
+    manifest_str = _manifest_str("my_schema_hash")
+    manifest_hash = get_manifest_hash(manifest_str)
+    hits = _manifest_hashes.stats()["hits"]
+
+    # An equal string of another request isn't hashed with SHA-256 again
+    assert get_manifest_hash(manifest_str.encode().decode()) == manifest_hash
+    assert _manifest_hashes.stats()["hits"] == hits + 1
+    assert get_manifest_hash(_manifest_str("my_schema_other")) != manifest_hash
+
+
+def _manifest_str(schema: str) -> str:
+    manifest = {
+        "catalog": "my_catalog",
+        "schema": schema,
+        "models": [],
+    }
+    return base64.b64encode(orjson.dumps(manifest)).decode("utf-8")
@@ -0,0 +1,79 @@
+import base64
+
+import orjson
+import pytest
+
+from app.mdl import rewriter as rewriter_module
+from app.mdl.rewriter import Rewriter, _planned_sql_cache
+from app.model.data_source import DataSource
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture(scope="module")
+def anyio_backend():
+    return "asyncio"
+
+
+manifest = {
+    "catalog": "my_catalog",
+    "schema": "my_schema",
+    "models": [
+        {
+            "name": "Orders",
+            "tableReference": {"schema": "main", "table": "orders"},
+            "columns": [{"name": "orderkey", "type": "integer"}],
+        },
+    ],
+}
+manifest_str = base64.b64encode(orjson.dumps(manifest)).decode("utf-8")
+
+
+async def test_planned_sql_cache():
+    sql = 'SELECT orderkey FROM "Orders" WHERE orderkey = 1'
+    rewriter = Rewriter(
+        manifest_str, data_source=DataSource.local_file, experiment=True, properties={}
+    )
+    dialect_sql = await rewriter.rewrite(sql)
+    stats = _planned_sql_cache.stats()
+
+    assert await rewriter.rewrite(sql) == dialect_sql
+    new_stats = _planned_sql_cache.stats()
+    assert new_stats["hits"] == stats["hits"] + 1
+    assert new_stats["misses"] == stats["misses"]
+
+    # The session variables are a part of the key
+    await Rewriter(
+        manifest_str,
+        data_source=DataSource.local_file,
+        experiment=True,
+        properties={"x-wren-variable-region": "tw"},
+    ).rewrite(sql)
+    assert _planned_sql_cache.stats()["misses"] == stats["misses"] + 1
+
+
+async def test_planned_sql_cache_of_batch(monkeypatch):
+    sqls = [f'SELECT orderkey FROM "Orders" WHERE orderkey = {i}' for i in (2, 3)]
+    rewriter = Rewriter(
+        manifest_str, data_source=DataSource.local_file, experiment=True, properties={}
+    )
+    await rewriter.rewrite(sqls[0])
+
+    hashed = []
+    get_manifest_hash = rewriter_module.get_manifest_hash
+
+    def count_manifest_hash(manifest_str):
+        hashed.append(manifest_str)
+        return get_manifest_hash(manifest_str)
+
+    monkeypatch.setattr(rewriter_module, "get_manifest_hash", count_manifest_hash)
+    stats = _planned_sql_cache.stats()
+    # The batch plans against the whole manifest, so it doesn't share the entries
+    # planned against the extracted manifest
+    dialect_sqls = await rewriter.rewrite_batch(sqls)
+    assert _planned_sql_cache.stats()["misses"] == stats["misses"] + 2
+
+    assert await rewriter.rewrite_batch(sqls) == dialect_sqls
+    assert _planned_sql_cache.stats()["hits"] == stats["hits"] + 2
+    # The manifest is hashed once per batch
+    assert len(hashed) == 2
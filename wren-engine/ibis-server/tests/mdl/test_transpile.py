@@ -0,0 +1,33 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from app.mdl.transpile import (
+    _parse_cache,
+    _transpile_cache,
+    get_transpile_cache_stats,
+    parse_one,
+    transpile,
+)
+
+
+def test_transpile():
+    sql = "SELECT APPROX_DISTINCT(a) FROM t"
+    hits = _transpile_cache.stats()["hits"]
+    assert transpile(sql, "trino", "duckdb") == "SELECT APPROX_COUNT_DISTINCT(a) FROM t"
+    assert transpile(sql, "trino", "duckdb") == "SELECT APPROX_COUNT_DISTINCT(a) FROM t"
+    assert transpile(sql, "trino", "trino") == sql
+    assert _transpile_cache.stats()["hits"] == hits + 1
+    assert 0 < get_transpile_cache_stats()["transpile"]["hit_ratio"] <= 1
+
+    # Safe to share across the worker threads
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        results = executor.map(lambda _: transpile(sql, "trino", "duckdb"), range(16))
+    assert set(results) == {"SELECT APPROX_COUNT_DISTINCT(a) FROM t"}
+
+
+def test_parse_one_returns_copy():
+    sql = "SELECT a FROM t_parse"
+    hits = _parse_cache.stats()["hits"]
+    parse_one(sql, "postgres").set("from", None)
+    # The cached expression isn't modified by the caller
+    assert parse_one(sql, "postgres").sql() == sql
+    assert _parse_cache.stats()["hits"] == hits + 1
@@ -0,0 +1,53 @@
+import asyncio
+import threading
+
+import pytest
+
+from app.model.bulkhead import Bulkhead
+from app.model.error import DataSourceBusyError
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture(scope="module")
+def anyio_backend():
+    return "asyncio"
+
+
+async def test_run():
+    bulkhead = Bulkhead("test", max_workers=1, max_queue_size=0)
+    assert await bulkhead.run(sum, [1, 2], start=3) == 6
+    assert bulkhead.stats()["running"] == 0
+    assert bulkhead.stats()["queued"] == 0
+
+
+async def test_reject_when_queue_is_full():
+    bulkhead = Bulkhead("test", max_workers=1, max_queue_size=1)
+    release = threading.Event()
+    running = asyncio.create_task(bulkhead.run(release.wait))
+    queued = asyncio.create_task(bulkhead.run(release.wait))
+    await asyncio.sleep(0.1)
+    assert bulkhead.stats()["running"] == 1
+    assert bulkhead.stats()["queued"] == 1
+
+    with pytest.raises(DataSourceBusyError):
+        await bulkhead.run(release.wait)
+    assert bulkhead.stats()["rejected"] == 1
+
+    release.set()
+    await asyncio.gather(running, queued)
+    assert await bulkhead.run(lambda: 1) == 1
+
+
+async def test_cancel_queued_call():
+    bulkhead = Bulkhead("test", max_workers=1, max_queue_size=1)
+    release = threading.Event()
+    running = asyncio.create_task(bulkhead.run(release.wait))
+    queued = asyncio.create_task(bulkhead.run(release.wait))
+    await asyncio.sleep(0.1)
+    queued.cancel()
+    await asyncio.sleep(0.1)
+    # The cancelled call never starts and frees its slot in the queue
+    assert bulkhead.stats()["queued"] == 0
+    release.set()
+    await running
@@ -0,0 +1,155 @@
+import datetime
+from decimal import Decimal
+
+import pyarrow as pa
+import pytest
+from redshift_connector.utils.oids import RedshiftOID
+
+from app.model import LocalFileConnectionInfo
+from app.model.connector import DuckDBConnector, MSSqlConnector, RedshiftConnector
+
+
+@pytest.mark.parametrize(
+    "sql",
+    [
+        "SELECT * FROM range(10)",
+        "SELECT * FROM range(10);",
+        "SELECT * FROM range(10) ; ;\n",
+        "SELECT * FROM range(10) -- all the rows",
+    ],
+)
+def test_duckdb_query_with_limit(sql):
+    connector = DuckDBConnector(
+        LocalFileConnectionInfo(url="tests/resource/tpch/data", format="parquet")
+    )
+    try:
+        assert connector.query(sql, limit=2).num_rows == 2
+        assert connector.query_batches(sql, 1, limit=3).read_all().num_rows == 3
+    finally:
+        connector.close()
+
+
+class _FakeRedshiftCursor:
+    description = [
+        ("totalprice", RedshiftOID.NUMERIC),
+        ("t", RedshiftOID.TIME),
+        ("i", RedshiftOID.INTERVAL),
+    ]
+    # The type modifier of NUMERIC(15, 2)
+    ps = {
+        "row_desc": [
+            {"type_modifier": ((15 << 16) | 2) + 4},
+            {"type_modifier": -1},
+            {"type_modifier": -1},
+        ]
+    }
+
+    def __init__(self, batches):
+        self.batches = batches
+
+    def execute(self, sql):
+        pass
+
+    def fetchmany(self, size):
+        return self.batches.pop(0) if self.batches else []
+
+    def close(self):
+        pass
+
+
+def _redshift_connector(batches) -> RedshiftConnector:
+    connector = RedshiftConnector.__new__(RedshiftConnector)
+    cursor = _FakeRedshiftCursor(batches)
+    connector.connection = type("Connection", (), {"cursor": lambda self: cursor})()
+    return connector
+
+
+def test_redshift_query_batches_with_null_first_batch():
+    connector = _redshift_connector(
+        [
+            [(None, None, None)],
+            [(Decimal("347.61"), datetime.time(1), datetime.timedelta(days=1))],
+        ]
+    )
+    table = connector.query_batches("SELECT 1", 1).read_all()
+    assert table.schema == pa.schema(
+        [
+            ("totalprice", pa.decimal128(15, 2)),
+            ("t", pa.time64("us")),
+            # The types without an Arrow type are converted to strings
+            ("i", pa.string()),
+        ]
+    )
+    assert table.to_pylist() == [
+        {"totalprice": None, "t": None, "i": None},
+        {
+            "totalprice": Decimal("347.61"),
+            "t": datetime.time(1),
+            "i": "1 day, 0:00:00",
+        },
+    ]
+
+
+def test_mssql_round_decimal_schema():
+    schema = pa.schema(
+        [
+            ("scale_down", pa.decimal128(38, 12)),
+            ("scale_up", pa.decimal128(10, 2)),
+            ("integer_digits", pa.decimal128(38, 0)),
+            ("wide_scale", pa.decimal128(38, 30)),
+            ("not_decimal", pa.int64()),
+        ]
+    )
+    assert MSSqlConnector._round_decimal_schema(schema) == pa.schema(
+        [
+            ("scale_down", pa.decimal128(35, 9)),
+            ("scale_up", pa.decimal128(17, 9)),
+            # The integer digits are kept within the max precision of 38
+            ("integer_digits", pa.decimal128(38, 0)),
+            ("wide_scale", pa.decimal128(17, 9)),
+            ("not_decimal", pa.int64()),
+        ]
+    )
+
+
+def test_mssql_round_decimal_columns():
+    table = pa.table(
+        {
+            "scale_down": pa.array(
+                [
+                    Decimal("1.000000000500"),
+                    Decimal("1.000000001500"),
+                    Decimal("-1.000000002500"),
+                    None,
+                ],
+                pa.decimal128(38, 12),
+            ),
+            "scale_up": pa.array(
+                [Decimal("1.23"), None, Decimal("-4.56"), None], pa.decimal128(10, 2)
+            ),
+            "not_decimal": [1, 2, 3, None],
+        }
+    )
+    schema = MSSqlConnector._round_decimal_schema(table.schema)
+
+    rounded = MSSqlConnector._round_decimal_columns(table, schema)
+    assert rounded.schema == schema
+    # Rounded half to even
+    assert rounded["scale_down"].to_pylist() == [
+        Decimal("1.000000000"),
+        Decimal("1.000000002"),
+        Decimal("-1.000000002"),
+        None,
+    ]
+    assert rounded["scale_up"].to_pylist() == [
+        Decimal("1.230000000"),
+        None,
+        Decimal("-4.560000000"),
+        None,
+    ]
+    assert rounded["not_decimal"].to_pylist() == [1, 2, 3, None]
+
+    batch = table.to_batches()[0]
+    rounded_batch = MSSqlConnector._round_decimal_columns(batch, schema)
+    assert isinstance(rounded_batch, pa.RecordBatch)
+    assert pa.Table.from_batches([rounded_batch]).equals(rounded)
@@ -0,0 +1,115 @@
+import asyncio
+import threading
+
+import duckdb
+import pytest
+
+from app.model import LocalFileConnectionInfo
+from app.model.bulkhead import Bulkhead
+from app.model.connector import is_query_error
+from app.model.connector_pool import ConnectorPool
+from app.model.data_source import DataSource
+from app.model.error import (
+    DatabaseTimeoutError,
+    DataSourceBusyError,
+    ErrorCode,
+    WrenError,
+)
+
+connection_info = LocalFileConnectionInfo(
+    url="tests/resource/tpch/data", format="parquet"
+)
+
+
+def test_reuse_connector():
+    pool = ConnectorPool()
+    with pool.acquire(DataSource.local_file, connection_info) as connector:
+        assert connector.query("SELECT 1 AS a").num_rows == 1
+    with pool.acquire(DataSource.local_file, connection_info) as reused:
+        assert reused is connector
+    assert pool.stats()["hits"] == 1
+    pool.close_all()
+
+
+def test_keep_connector_after_query_error():
+    pool = ConnectorPool()
+    with (
+        pytest.raises(WrenError),
+        pool.acquire(DataSource.local_file, connection_info) as connector,
+    ):
+        connector.query("SELECT * FROM not_found")
+    with pool.acquire(DataSource.local_file, connection_info) as reused:
+        assert reused is connector
+    pool.close_all()
+
+
+def test_discard_connector_after_connection_error():
+    pool = ConnectorPool()
+    with (
+        pytest.raises(WrenError),
+        pool.acquire(DataSource.local_file, connection_info) as connector,
+    ):
+        # The connector wraps any driver error as a user error
+        raise WrenError(
+            ErrorCode.GENERIC_USER_ERROR, "connection reset"
+        ) from duckdb.ConnectionException("connection reset")
+    with pool.acquire(DataSource.local_file, connection_info) as other:
+        assert other is not connector
+    assert pool.stats()["evictions"] == 1
+    pool.close_all()
+
+
+def test_discard_connector_after_timeout():
+    pool = ConnectorPool()
+    with (
+        pytest.raises(DatabaseTimeoutError),
+        pool.acquire(DataSource.local_file, connection_info) as connector,
+    ):
+        # The timeout handler closes the connector before the error is raised
+        connector.close()
+        raise DatabaseTimeoutError("Query timeout after 0 seconds")
+    assert pool.stats() == {
+        "hits": 0,
+        "misses": 1,
+        "evictions": 1,
+        "idle": 0,
+        "in_use": 0,
+    }
+    with pool.acquire(DataSource.local_file, connection_info) as other:
+        assert other is not connector
+    pool.close_all()
+
+
+def test_is_query_error():
+    assert is_query_error(duckdb.ParserException("syntax error"))
+    assert is_query_error(duckdb.ConversionException("invalid cast"))
+    assert not is_query_error(duckdb.IOException("connection reset"))
+    assert not is_query_error(ConnectionResetError())
+    assert not is_query_error(None)
+
+
+@pytest.fixture(scope="module")
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.mark.anyio
+async def test_keep_connector_after_bulkhead_rejection():
+    pool = ConnectorPool()
+    bulkhead = Bulkhead("test", max_workers=1, max_queue_size=0)
+    release = threading.Event()
+    running = asyncio.create_task(bulkhead.run(release.wait))
+    await asyncio.sleep(0.1)
+
+    with (
+        pytest.raises(DataSourceBusyError),
+        pool.acquire(DataSource.local_file, connection_info) as connector,
+    ):
+        await bulkhead.run(connector.query, "SELECT 1 AS a")
+    release.set()
+    await running
+
+    with pool.acquire(DataSource.local_file, connection_info) as reused:
+        assert reused is connector
+    assert pool.stats()["evictions"] == 0
+    pool.close_all()
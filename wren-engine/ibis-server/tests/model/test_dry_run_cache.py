@@ -0,0 +1,69 @@
+from contextlib import suppress
+
+import duckdb
+import pytest
+
+from app.model import LocalFileConnectionInfo
+from app.model.data_source import DataSource
+from app.model.dry_run_cache import DryRunCache
+from app.model.error import ErrorCode, WrenError
+
+pytestmark = pytest.mark.anyio
+
+connection_info = LocalFileConnectionInfo(
+    url="tests/resource/tpch/data", format="parquet"
+)
+
+
+@pytest.fixture(scope="module")
+def anyio_backend():
+    return "asyncio"
+
+
+async def _dry_run(cache: DryRunCache, error: Exception | None) -> int:
+    calls = 0
+
+    async def run():
+        nonlocal calls
+        calls += 1
+        if error is not None:
+            raise error
+
+    for _ in range(2):
+        with suppress(Exception):
+            await cache.dry_run(
+                "v3",
+                "manifest",
+                DataSource.local_file,
+                connection_info,
+                "SELECT 1",
+                None,
+                run,
+            )
+    return calls
+
+
+async def test_cache_success():
+    assert await _dry_run(DryRunCache(), None) == 1
+
+
+async def test_cache_query_error():
+    error = WrenError(ErrorCode.GENERIC_USER_ERROR, "syntax error")
+    error.__cause__ = duckdb.ParserException("syntax error")
+    assert await _dry_run(DryRunCache(), error) == 1
+    assert await _dry_run(DryRunCache(), WrenError(ErrorCode.INVALID_SQL, "")) == 1
+
+
+async def test_not_cache_connection_error():
+    error = WrenError(ErrorCode.GENERIC_USER_ERROR, "connection reset")
+    error.__cause__ = duckdb.ConnectionException("connection reset")
+    assert await _dry_run(DryRunCache(), error) == 2
+    # A generic user error without the driver error
+    assert (
+        await _dry_run(DryRunCache(), WrenError(ErrorCode.GENERIC_USER_ERROR, "")) == 2
+    )
+    assert await _dry_run(DryRunCache(), ConnectionResetError()) == 2
+
+
+async def test_disabled():
+    assert await _dry_run(DryRunCache(ttl_seconds=0), None) == 2
@@ -0,0 +1,107 @@
+import os
+
+import duckdb
+import pytest
+
+from app.model import LocalFileConnectionInfo
+from app.model.connector import DuckDBConnector
+from app.model.duckdb_pool import DuckDBInstancePool, get_duckdb_instance_pool
+
+connection_info = LocalFileConnectionInfo(
+    url="tests/resource/tpch/data", format="parquet"
+)
+
+
+def test_share_instance():
+    pool = DuckDBInstancePool()
+    with pool.cursor(connection_info) as cursor:
+        cursor.execute("SET VARIABLE a = 1")
+        assert cursor.execute("SELECT getvariable('a')").fetchall() == [(1,)]
+    with pool.cursor(connection_info) as cursor:
+        assert cursor.execute("SELECT getvariable('a')").fetchall() == [(None,)]
+
+    other = LocalFileConnectionInfo(url="tests/resource/tpch/data", format="csv")
+    with pool.cursor(other) as cursor:
+        assert cursor.execute("SELECT 1").fetchall() == [(1,)]
+
+    assert pool.stats() == {
+        "hits": 1,
+        "misses": 2,
+        "evictions": 0,
+        "instances": 2,
+        "active": 0,
+    }
+    pool.close_all()
+    assert pool.stats()["instances"] == 0
+
+
+def test_isolate_requests():
+    pool = DuckDBInstancePool()
+    with pool.cursor(connection_info) as cursor:
+        # The shared catalog and the configuration are read-only
+        with pytest.raises(duckdb.InvalidInputException):
+            cursor.execute("CREATE TABLE t AS SELECT 1 AS a")
+        with pytest.raises(duckdb.InvalidInputException):
+            cursor.execute("SET threads = 1")
+        cursor.execute("CREATE TEMP TABLE t AS SELECT 1 AS a")
+        assert cursor.execute("SELECT a FROM t").fetchall() == [(1,)]
+
+    with pool.cursor(connection_info) as cursor:
+        with pytest.raises(duckdb.CatalogException):
+            cursor.execute("SELECT a FROM t")
+        assert cursor.execute(
+            "SELECT count(*) FROM 'tests/resource/tpch/data/orders.parquet'"
+        ).fetchall() == [(15000,)]
+    catalog_dir = pool.acquire(connection_info).catalog_dir.name
+    pool.close_all()
+    assert not os.path.exists(catalog_dir)
+
+
+def test_evict_idle_instance():
+    pool = DuckDBInstancePool(idle_timeout_seconds=0)
+    instance = pool.acquire(connection_info)
+    # An instance with an active cursor is never evicted
+    assert pool.acquire(connection_info) is instance
+    pool.release(instance)
+    pool.release(instance)
+
+    assert pool.acquire(connection_info) is not instance
+    assert pool.stats()["evictions"] == 1
+    pool.close_all()
+
+
+def test_connector_releases_instance():
+    pool = get_duckdb_instance_pool()
+    active = pool.stats()["active"]
+    connector = DuckDBConnector(connection_info)
+    assert connector.query("SELECT 1 AS a", limit=None).num_rows == 1
+    assert pool.stats()["active"] == active + 1
+
+    connector.close()
+    assert pool.stats()["active"] == active
+
+
+def test_connector_close_twice():
+    pool = get_duckdb_instance_pool()
+    active = pool.stats()["active"]
+    connector = DuckDBConnector(connection_info)
+    other = DuckDBConnector(connection_info)
+    assert pool.stats()["active"] == active + 2
+
+    connector.close()
+    connector.close()
+    # The instance is still in use by the other connector
+    assert pool.stats()["active"] == active + 1
+    assert other.query("SELECT 1 AS a", limit=None).num_rows == 1
+
+    other.close()
+    assert pool.stats()["active"] == active
+
+
+def test_release_without_active_cursor():
+    pool = DuckDBInstancePool()
+    instance = pool.acquire(connection_info)
+    pool.release(instance)
+    pool.release(instance)
+    assert instance.active == 0
+    pool.close_all()
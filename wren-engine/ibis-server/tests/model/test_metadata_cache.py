@@ -0,0 +1,59 @@
+import pytest
+
+from app.model import LocalFileConnectionInfo
+from app.model.data_source import DataSource
+from app.model.metadata.cache import MetadataCache
+from app.model.metadata.object_storage import LocalFileMetadata
+
+pytestmark = pytest.mark.anyio
+
+connection_info = LocalFileConnectionInfo(
+    url="tests/resource/tpch/data", format="parquet"
+)
+
+
+@pytest.fixture(scope="module")
+def anyio_backend():
+    return "asyncio"
+
+
+async def test_get_table_list():
+    cache = MetadataCache(ttl_seconds=60)
+    tables = await cache.get_table_list(DataSource.local_file, connection_info)
+    assert "orders" in [table.name for table in tables]
+
+    assert await cache.get_table_list(DataSource.local_file, connection_info) is tables
+    assert cache.stats() == {"hits": 1, "misses": 1, "revalidations": 0, "size": 1}
+
+    refreshed = await cache.get_table_list(
+        DataSource.local_file, connection_info, refresh=True
+    )
+    assert refreshed is not tables
+    assert cache.stats()["misses"] == 2
+
+
+async def test_disabled():
+    cache = MetadataCache(ttl_seconds=0)
+    await cache.get_table_list(DataSource.local_file, connection_info)
+    await cache.get_table_list(DataSource.local_file, connection_info)
+    assert cache.stats() == {"hits": 0, "misses": 0, "revalidations": 0, "size": 0}
+
+
+async def test_revalidate_unchanged_schema(monkeypatch):
+    versions = {"tpch": "1"}
+    monkeypatch.setattr(
+        LocalFileMetadata, "get_schema_versions", lambda self: dict(versions)
+    )
+    cache = MetadataCache(ttl_seconds=60)
+    tables = await cache.get_table_list(DataSource.local_file, connection_info)
+
+    # Expire the entry, it's kept if the schema versions are unchanged
+    cache.ttl_seconds = 1e-9
+    assert await cache.get_table_list(DataSource.local_file, connection_info) is tables
+    assert cache.stats()["revalidations"] == 1
+
+    versions["tpch"] = "2"
+    assert (
+        await cache.get_table_list(DataSource.local_file, connection_info) is not tables
+    )
+    assert cache.stats()["misses"] == 2
@@ -0,0 +1,190 @@
+import datetime
+import os
+import threading
+from decimal import Decimal
+
+import pyarrow as pa
+import pytest
+
+from app.model import ConnectionUrl
+from app.query_cache.manager import (
+    ARROW_IPC_MAGIC,
+    INDEX_FILE_NAME,
+    CacheFormat,
+    QueryCacheImpl,
+)
+
+info = ConnectionUrl(connectionUrl="duckdb://")
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return QueryCacheImpl(root=f"{tmp_path}/")
+
+
+def _cache_files(cache: QueryCacheImpl) -> list[str]:
+    return [name for name in os.listdir(cache.root) if name.endswith(".cache")]
+
+
+def test_set_same_query_replaces_entry(cache):
+    table = pa.table({"a": list(range(100))})
+    cache.set("duckdb", "SELECT 1", table, info)
+    size = cache.stats()["bytes_used"]
+
+    threads = [
+        threading.Thread(target=cache.set, args=("duckdb", "SELECT 1", table, info))
+        for _ in range(4)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert cache.stats()["entries"] == 1
+    assert cache.stats()["bytes_used"] == size
+    assert len(_cache_files(cache)) == 1
+    assert cache.get("duckdb", "SELECT 1", info).equals(table)
+
+
+def _expire(cache: QueryCacheImpl, sql: str) -> None:
+    cache_key = cache._generate_cache_key("duckdb", sql, info)
+    cache._connect().execute(
+        "UPDATE entries SET expire_at = 0 WHERE cache_key = ?", (cache_key,)
+    )
+
+
+def test_expire(cache):
+    table = pa.table({"a": [1]})
+    cache.set("duckdb", "SELECT 1", table, info, ttl_seconds=1)
+    cache.set("duckdb", "SELECT 2", table, info)
+    _expire(cache, "SELECT 1")
+
+    # An expired entry is evicted when it's read
+    assert cache.get("duckdb", "SELECT 1", info) is None
+    assert cache.stats()["entries"] == 1
+    assert cache.stats()["evictions"] == 1
+    assert len(_cache_files(cache)) == 1
+
+    # or when another entry is set
+    _expire(cache, "SELECT 2")
+    cache.set("duckdb", "SELECT 3", table, info)
+    assert cache.stats()["entries"] == 1
+    assert cache.stats()["evictions"] == 2
+    assert len(_cache_files(cache)) == 1
+
+
+def test_share_index_between_workers(tmp_path):
+    # The worker processes share the cache directory and its index
+    worker = QueryCacheImpl(root=f"{tmp_path}/")
+    other = QueryCacheImpl(root=f"{tmp_path}/")
+    table = pa.table({"a": [1]})
+    worker.set("duckdb", "SELECT 1", table, info)
+    assert other.get("duckdb", "SELECT 1", info).equals(table)
+    assert other.get_cache_file_timestamp(
+        "duckdb", "SELECT 1", info
+    ) == worker.get_cache_file_timestamp("duckdb", "SELECT 1", info)
+
+    # An override by one worker is seen by the others
+    overridden = pa.table({"a": [2]})
+    other.set("duckdb", "SELECT 1", overridden, info)
+    assert worker.get("duckdb", "SELECT 1", info).equals(overridden)
+    assert len(_cache_files(worker)) == 1
+
+
+def test_budget_shared_between_workers(tmp_path):
+    table = pa.table({"a": list(range(100))})
+    worker = QueryCacheImpl(root=f"{tmp_path}/")
+    worker.set("duckdb", "SELECT 0", table, info)
+    size = worker.stats()["bytes_used"]
+
+    worker = QueryCacheImpl(root=f"{tmp_path}/", max_bytes=size * 2)
+    other = QueryCacheImpl(root=f"{tmp_path}/", max_bytes=size * 2)
+    worker.set("duckdb", "SELECT 1", table, info)
+    other.set("duckdb", "SELECT 2", table, info)
+    worker.get("duckdb", "SELECT 1", info)
+    other.set("duckdb", "SELECT 3", table, info)
+
+    # The least recently used entries of both workers are evicted
+    assert worker.get("duckdb", "SELECT 0", info) is None
+    assert worker.get("duckdb", "SELECT 2", info) is None
+    assert other.get("duckdb", "SELECT 1", info).equals(table)
+    assert other.stats()["bytes_used"] == size * 2
+    files = _cache_files(worker)
+    assert len(files) == 2
+    assert sum(os.path.getsize(os.path.join(tmp_path, f)) for f in files) == size * 2
+
+
+def test_index_existing_files(tmp_path):
+    table = pa.table({"a": [1]})
+    cache = QueryCacheImpl(root=f"{tmp_path}/")
+    cache.set("duckdb", "SELECT 1", table, info)
+    # The files written before the index existed are indexed on startup
+    os.remove(os.path.join(tmp_path, INDEX_FILE_NAME))
+
+    cache = QueryCacheImpl(root=f"{tmp_path}/")
+    assert cache.stats()["entries"] == 1
+    assert cache.get("duckdb", "SELECT 1", info).equals(table)
+
+    # The entries of the removed files are dropped
+    for name in _cache_files(cache):
+        os.remove(os.path.join(tmp_path, name))
+    assert cache.get("duckdb", "SELECT 1", info) is None
+    assert cache.stats()["entries"] == 0
+
+
+def _table() -> pa.Table:
+    return pa.table(
+        {
+            "i": pa.array([1, None], pa.int64()),
+            "s": ["a", None],
+            "d": pa.array([Decimal("1.23"), None], pa.decimal128(10, 2)),
+            "ts": pa.array(
+                [datetime.datetime(2024, 1, 1, tzinfo=datetime.UTC), None],
+                pa.timestamp("us", tz="UTC"),
+            ),
+            "date": [datetime.date(2024, 1, 1), None],
+            "b": [True, None],
+        }
+    )
+
+
+def _cache_file_format(cache: QueryCacheImpl) -> CacheFormat:
+    (name,) = _cache_files(cache)
+    with open(os.path.join(cache.root, name), "rb") as f:
+        magic = f.read(len(ARROW_IPC_MAGIC))
+    if magic == ARROW_IPC_MAGIC:
+        return CacheFormat.arrow
+    assert magic.startswith(b"PAR1")
+    return CacheFormat.parquet
+
+
+@pytest.mark.parametrize("cache_format", list(CacheFormat))
+def test_round_trip(tmp_path, cache_format):
+    cache = QueryCacheImpl(root=f"{tmp_path}/", cache_format=cache_format)
+    table = _table()
+    cache.set("duckdb", "SELECT 1", table, info)
+
+    assert _cache_file_format(cache) == cache_format
+    assert cache.get("duckdb", "SELECT 1", info).equals(table)
+
+
+def test_parquet_min_bytes(tmp_path):
+    table = _table()
+    cache = QueryCacheImpl(root=f"{tmp_path}/", parquet_min_bytes=table.nbytes)
+    cache.set("duckdb", "SELECT 1", table, info)
+    # Not larger than the threshold
+    assert _cache_file_format(cache) == CacheFormat.arrow
+
+    cache.parquet_min_bytes = table.nbytes - 1
+    cache.set("duckdb", "SELECT 1", table, info)
+    assert _cache_file_format(cache) == CacheFormat.parquet
+    assert cache.get("duckdb", "SELECT 1", info).equals(table)
+
+
+def test_read_after_changing_format(tmp_path):
+    table = _table()
+    cache = QueryCacheImpl(root=f"{tmp_path}/", cache_format=CacheFormat.parquet)
+    cache.set("duckdb", "SELECT 1", table, info)
+
+    cache = QueryCacheImpl(root=f"{tmp_path}/", cache_format=CacheFormat.arrow)
+    assert cache.get("duckdb", "SELECT 1", info).equals(table)
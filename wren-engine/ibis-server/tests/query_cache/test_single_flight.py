@@ -0,0 +1,91 @@
+import asyncio
+
+import pyarrow as pa
+import pytest
+
+from app.model import ConnectionUrl
+from app.query_cache import QueryCacheManager
+from app.query_cache.manager import QueryCacheImpl
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture(scope="module")
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+def manager(tmp_path):
+    return QueryCacheManager(QueryCacheImpl(root=str(tmp_path)))
+
+
+info = ConnectionUrl(connectionUrl="duckdb://")
+
+
+async def test_coalesce_identical_queries(manager):
+    executions = 0
+
+    async def execute():
+        nonlocal executions
+        executions += 1
+        await asyncio.sleep(0.1)
+        return pa.table({"a": [1]})
+
+    results = await asyncio.gather(
+        *[
+            manager.single_flight("duckdb", "SELECT 1", info, None, execute)
+            for _ in range(5)
+        ]
+    )
+    assert executions == 1
+    assert all(result is results[0] for result in results)
+    assert manager.stats()["coalesced"] == 4
+
+    # The finished query isn't shared with the later requests
+    await manager.single_flight("duckdb", "SELECT 1", info, None, execute)
+    assert executions == 2
+
+
+async def test_not_coalesce_different_queries(manager):
+    async def execute():
+        await asyncio.sleep(0.1)
+        return pa.table({"a": [1]})
+
+    await asyncio.gather(
+        manager.single_flight("duckdb", "SELECT 1", info, None, execute),
+        manager.single_flight("duckdb", "SELECT 2", info, None, execute),
+    )
+    assert manager.stats()["coalesced"] == 0
+
+
+async def test_share_error(manager):
+    async def execute():
+        await asyncio.sleep(0.1)
+        raise ValueError("failed")
+
+    results = await asyncio.gather(
+        *[
+            manager.single_flight("duckdb", "SELECT 1", info, None, execute)
+            for _ in range(2)
+        ],
+        return_exceptions=True,
+    )
+    assert all(isinstance(result, ValueError) for result in results)
+
+
+async def test_retry_when_leader_is_cancelled(manager):
+    async def execute():
+        await asyncio.sleep(0.1)
+        return pa.table({"a": [1]})
+
+    leader = asyncio.create_task(
+        manager.single_flight("duckdb", "SELECT 1", info, None, execute)
+    )
+    await asyncio.sleep(0)
+    follower = asyncio.create_task(
+        manager.single_flight("duckdb", "SELECT 1", info, None, execute)
+    )
+    await asyncio.sleep(0)
+    leader.cancel()
+    assert (await follower).num_rows == 1
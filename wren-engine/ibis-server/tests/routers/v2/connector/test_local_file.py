@@ -1,8 +1,12 @@
 import base64
 
 import orjson
+import pyarrow as pa
+import pyarrow.parquet as pq
 import pytest
 
+from app.model.metadata.object_storage import _schema_cache
+
 pytestmark = pytest.mark.local_file
 
 
@@ -183,6 +187,21 @@ async def test_dry_run(client, manifest_str, connection_info):
     assert response.text is not None
 
 
+@pytest.mark.parametrize("path", ["query", "model-substitute"])
+async def test_manifest_id_not_accepted(client, connection_info, path):
+    # Only the v3 APIs resolve a manifest registered by its id
+    response = await client.post(
+        f"{base_url}/{path}",
+        json={
+            "manifestId": "not_found",
+            "sql": 'SELECT * FROM "Orders" LIMIT 1',
+            "connectionInfo": connection_info,
+        },
+    )
+    assert response.status_code == 422
+    assert response.json()["detail"][0]["loc"] == ["body", "manifestStr"]
+
+
 async def test_metadata_list_tables(client, connection_info):
     response = await client.post(
         url=f"{base_url}/metadata/tables",
@@ -213,6 +232,53 @@ async def test_metadata_list_tables(client, connection_info):
     }
 
 
+async def test_metadata_list_tables_with_schema_cache(client, connection_info):
+    response = await client.post(
+        url=f"{base_url}/metadata/tables",
+        json={"connectionInfo": connection_info},
+    )
+    assert response.status_code == 200
+
+    # The unchanged files are not read again
+    hits = _schema_cache.stats()["hits"]
+    cached = await client.post(
+        url=f"{base_url}/metadata/tables",
+        json={"connectionInfo": connection_info},
+    )
+    assert cached.status_code == 200
+    assert cached.json() == response.json()
+    assert _schema_cache.stats()["hits"] == hits + len(response.json())
+
+
+async def test_metadata_list_tables_with_schema_cache_invalidation(client, tmp_path):
+    async def list_columns() -> dict[str, list[str]]:
+        response = await client.post(
+            url=f"{base_url}/metadata/tables",
+            json={"connectionInfo": {"url": str(tmp_path), "format": "parquet"}},
+        )
+        assert response.status_code == 200
+        return {
+            table["name"]: [column["name"] for column in table["columns"]]
+            for table in response.json()
+        }
+
+    (tmp_path / "dir_table").mkdir()
+    pq.write_table(pa.table({"a": [1]}), tmp_path / "file_table.parquet")
+    pq.write_table(pa.table({"a": [1]}), tmp_path / "dir_table" / "part.parquet")
+    assert await list_columns() == {"file_table": ["a"], "dir_table": ["a"]}
+
+    hits = _schema_cache.stats()["hits"]
+    assert await list_columns() == {"file_table": ["a"], "dir_table": ["a"]}
+    assert _schema_cache.stats()["hits"] == hits + 2
+
+    # Rewriting a file in the directory doesn't change the directory itself
+    pq.write_table(pa.table({"a": [1], "b": [2]}), tmp_path / "file_table.parquet")
+    pq.write_table(
+        pa.table({"a": [1], "b": [2]}), tmp_path / "dir_table" / "part.parquet"
+    )
+    assert await list_columns() == {"file_table": ["a", "b"], "dir_table": ["a", "b"]}
+
+
 async def test_metadata_list_constraints(client, connection_info):
     response = await client.post(
         url=f"{base_url}/metadata/constraints",
@@ -481,3 +547,76 @@ async def test_duckdb_metadata_list_tables(client):
         "description": None,
         "properties": None,
     }
+
+
+async def test_metadata_list_tables_with_filter(client, connection_info):
+    response = await client.post(
+        url=f"{base_url}/metadata/tables",
+        json={"connectionInfo": connection_info, "tablePattern": "c%"},
+    )
+    assert response.status_code == 200
+    assert sorted(table["name"] for table in response.json()) == [
+        "cities_geometry",
+        "customer",
+    ]
+
+    response = await client.post(
+        url=f"{base_url}/metadata/tables",
+        json={
+            "connectionInfo": connection_info,
+            "tablePattern": "order_",
+            "namesOnly": True,
+        },
+    )
+    assert response.status_code == 200
+    assert response.json()[0]["name"] == "orders"
+    assert response.json()[0]["columns"] == []
+
+
+async def test_metadata_list_tables_with_pagination(client, connection_info):
+    response = await client.post(
+        url=f"{base_url}/metadata/tables",
+        json={
+            "connectionInfo": connection_info,
+            "namesOnly": True,
+            "limit": 2,
+            "offset": 1,
+        },
+    )
+    assert response.status_code == 200
+    assert response.headers["X-Total-Count"] == "3"
+    assert [table["name"] for table in response.json()] == ["customer", "orders"]
+
+
+async def test_duckdb_metadata_list_tables_with_filter(client):
+    connection_info = {"url": "tests/resource/test_file_source", "format": "duckdb"}
+    response = await client.post(
+        url=f"{base_url}/metadata/tables",
+        json={
+            "connectionInfo": connection_info,
+            "schemas": ["main"],
+            "tablePattern": "cust%",
+        },
+    )
+    assert response.status_code == 200
+    assert [table["name"] for table in response.json()] == ["main.customers"]
+    assert len(response.json()[0]["columns"]) == 7
+
+    response = await client.post(
+        url=f"{base_url}/metadata/tables",
+        json={
+            "connectionInfo": connection_info,
+            "schemas": ["main"],
+            "namesOnly": True,
+        },
+    )
+    assert response.status_code == 200
+    assert "main.customers" in [table["name"] for table in response.json()]
+    assert all(table["columns"] == [] for table in response.json())
+
+    response = await client.post(
+        url=f"{base_url}/metadata/tables",
+        json={"connectionInfo": connection_info, "schemas": ["'; DROP"]},
+    )
+    assert response.status_code == 200
+    assert response.json() == []
@@ -116,12 +116,13 @@ async def test_query(client, manifest_str):
         "orderkey": "int64",
         "custkey": "int64",
         "orderstatus": "string",
-        "totalprice": "decimal128(5, 2)",
+        "totalprice": "decimal128(15, 2)",
         "orderdate": "date32[day]",
         "order_cust_key": "string",
         "timestamp": "timestamp[ns]",
         "timestamptz": "timestamp[ns, tz=UTC]",
-        "test_null_time": "null",
+        # The NULL keeps the timestamp type of the row description
+        "test_null_time": "timestamp[ns]",
         "bytea_column": "string",
     }
 
@@ -156,12 +157,13 @@ async def test_query_with_aws_iam_credential(client, manifest_str):
         "orderkey": "int64",
         "custkey": "int64",
         "orderstatus": "string",
-        "totalprice": "decimal128(5, 2)",
+        "totalprice": "decimal128(15, 2)",
         "orderdate": "date32[day]",
         "order_cust_key": "string",
         "timestamp": "timestamp[ns]",
         "timestamptz": "timestamp[ns, tz=UTC]",
-        "test_null_time": "null",
+        # The NULL keeps the timestamp type of the row description
+        "test_null_time": "timestamp[ns]",
         "bytea_column": "string",
     }
 
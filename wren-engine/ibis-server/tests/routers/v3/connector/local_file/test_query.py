@@ -1,8 +1,20 @@
+import asyncio
 import base64
+import time
+from collections.abc import Iterator
+from contextlib import ExitStack
+from datetime import date
+from decimal import Decimal
 
 import orjson
+import pyarrow as pa
 import pytest
 
+from app.model import LocalFileConnectionInfo
+from app.model.connector_pool import ConnectorPool
+from app.model.data_source import DataSource
+from app.model.error import DatabaseTimeoutError
+from app.routers.v3.connector import _iterate_and_close
 from tests.routers.v3.connector.local_file.conftest import base_url
 
 manifest = {
@@ -180,6 +192,39 @@ async def test_dry_run(client, manifest_str):
     assert response.text is not None
 
 
+async def test_dry_run_cache(client, manifest_str):
+    async def dry_run(sql):
+        return await client.post(
+            f"{base_url}/query",
+            params={"dryRun": True},
+            json={
+                "manifestStr": manifest_str,
+                "sql": sql,
+                "connectionInfo": {
+                    "url": "tests/resource/tpch",
+                    "format": "parquet",
+                },
+            },
+        )
+
+    response = await dry_run('SELECT orderkey FROM "Orders" LIMIT 2')
+    assert response.status_code == 204
+    assert "X-Cache-Hit" not in response.headers
+
+    response = await dry_run('SELECT orderkey FROM "Orders" LIMIT 2')
+    assert response.status_code == 204
+    assert response.headers["X-Cache-Hit"] == "true"
+
+    hits = (await client.get("/dry-run-cache/stats")).json()["hits"]
+    first = await dry_run('SELECT orderkey FROM "NotCached" LIMIT 2')
+    assert first.status_code == 422
+    # The error is cached and returned again
+    second = await dry_run('SELECT orderkey FROM "NotCached" LIMIT 2')
+    assert second.status_code == 422
+    assert second.json()["message"] == first.json()["message"]
+    assert (await client.get("/dry-run-cache/stats")).json()["hits"] == hits + 1
+
+
 async def test_query_duckdb_format(client):
     manifest = {
         "catalog": "wren",
@@ -221,3 +266,440 @@ async def test_query_duckdb_format(client):
     result = response.json()
     assert len(result["columns"]) == len(manifest["models"][0]["columns"])
     assert len(result["data"]) == 1
+
+
+async def test_query_reuse_pooled_connector(client, manifest_str):
+    connection_info = {
+        "url": "tests/resource/tpch",
+        "format": "parquet",
+    }
+    response = await client.post(
+        f"{base_url}/query",
+        json={
+            "manifestStr": manifest_str,
+            "sql": 'SELECT orderkey FROM "Orders" LIMIT 1',
+            "connectionInfo": connection_info,
+        },
+    )
+    assert response.status_code == 200
+    stats = (await client.get("/connector-pool/stats")).json()
+
+    response = await client.post(
+        f"{base_url}/query",
+        json={
+            "manifestStr": manifest_str,
+            "sql": 'SELECT custkey FROM "Orders" LIMIT 1',
+            "connectionInfo": connection_info,
+        },
+    )
+    assert response.status_code == 200
+    new_stats = (await client.get("/connector-pool/stats")).json()
+    assert new_stats["hits"] == stats["hits"] + 1
+    assert new_stats["misses"] == stats["misses"]
+    assert new_stats["in_use"] == 0
+
+
+async def test_query_with_cache(client, manifest_str):
+    connection_info = {
+        "url": "tests/resource/tpch",
+        "format": "parquet",
+    }
+    # First request - should create or override the cache
+    response1 = await client.post(
+        f"{base_url}/query?cacheEnable=true&overrideCache=true",
+        json={
+            "manifestStr": manifest_str,
+            "sql": 'SELECT orderkey, orderdate FROM "Orders" ORDER BY orderkey LIMIT 3',
+            "connectionInfo": connection_info,
+        },
+    )
+    assert response1.status_code == 200
+    assert response1.headers["X-Cache-Hit"] == "false"
+
+    # Second request with same SQL - should hit cache
+    response2 = await client.post(
+        f"{base_url}/query?cacheEnable=true",
+        json={
+            "manifestStr": manifest_str,
+            "sql": 'SELECT orderkey, orderdate FROM "Orders" ORDER BY orderkey LIMIT 3',
+            "connectionInfo": connection_info,
+        },
+    )
+    assert response2.status_code == 200
+    assert response2.headers["X-Cache-Hit"] == "true"
+    assert int(response2.headers["X-Cache-Create-At"]) > 1743984000  # 2025.04.07
+    assert response2.json()["data"] == response1.json()["data"]
+
+    # Third request overrides the cache
+    response3 = await client.post(
+        f"{base_url}/query?cacheEnable=true&overrideCache=true",
+        json={
+            "manifestStr": manifest_str,
+            "sql": 'SELECT orderkey, orderdate FROM "Orders" ORDER BY orderkey LIMIT 3',
+            "connectionInfo": connection_info,
+        },
+    )
+    assert response3.status_code == 200
+    assert response3.headers["X-Cache-Override"] == "true"
+    assert (
+        response3.headers["X-Cache-Create-At"] == response2.headers["X-Cache-Create-At"]
+    )
+    assert int(response3.headers["X-Cache-Override-At"]) >= int(
+        response3.headers["X-Cache-Create-At"]
+    )
+
+
+async def test_query_with_cache_ttl(client, manifest_str):
+    connection_info = {
+        "url": "tests/resource/tpch",
+        "format": "parquet",
+    }
+    sql = 'SELECT orderkey FROM "Orders" ORDER BY orderkey LIMIT 2'
+    response = await client.post(
+        f"{base_url}/query?cacheEnable=true&overrideCache=true&cacheTtl=1",
+        json={
+            "manifestStr": manifest_str,
+            "sql": sql,
+            "connectionInfo": connection_info,
+        },
+    )
+    assert response.status_code == 200
+    stats = (await client.get("/cache/stats")).json()
+    assert stats["entries"] > 0
+    assert stats["bytes_used"] > 0
+
+    await asyncio.sleep(1.1)
+
+    # The expired entry should be evicted and treated as a cache miss
+    response = await client.post(
+        f"{base_url}/query?cacheEnable=true",
+        json={
+            "manifestStr": manifest_str,
+            "sql": sql,
+            "connectionInfo": connection_info,
+        },
+    )
+    assert response.status_code == 200
+    assert response.headers["X-Cache-Hit"] == "false"
+    new_stats = (await client.get("/cache/stats")).json()
+    assert new_stats["misses"] == stats["misses"] + 1
+    assert new_stats["evictions"] == stats["evictions"] + 1
+
+
+async def test_query_with_cache_stale_while_revalidate(client, manifest_str):
+    connection_info = {
+        "url": "tests/resource/tpch",
+        "format": "parquet",
+    }
+    json = {
+        "manifestStr": manifest_str,
+        "sql": 'SELECT orderkey FROM "Orders" ORDER BY orderkey LIMIT 2',
+        "connectionInfo": connection_info,
+    }
+    response1 = await client.post(
+        f"{base_url}/query?cacheEnable=true&overrideCache=true", json=json
+    )
+    assert response1.status_code == 200
+
+    # The cached result is returned and refreshed in the background
+    url = f"{base_url}/query?cacheEnable=true&overrideCache=true&staleWhileRevalidate=true"
+    stats = (await client.get("/cache/stats")).json()
+    response2 = await client.post(url, json=json)
+    assert response2.status_code == 200
+    assert response2.headers["X-Cache-Hit"] == "true"
+    assert int(response2.headers["X-Cache-Age"]) >= 0
+    create_at = response2.headers["X-Cache-Create-At"]
+    assert response2.json()["data"] == response1.json()["data"]
+    assert (await client.get("/cache/stats")).json()["refreshes"] == (
+        stats["refreshes"] + 1
+    )
+
+    for _ in range(50):
+        response3 = await client.post(f"{base_url}/query?cacheEnable=true", json=json)
+        if response3.headers["X-Cache-Create-At"] != create_at:
+            break
+        await asyncio.sleep(0.1)
+    assert response3.headers["X-Cache-Create-At"] != create_at
+    assert response3.json()["data"] == response1.json()["data"]
+
+
+async def test_query_arrow_stream(client, manifest_str):
+    response = await client.post(
+        f"{base_url}/query",
+        headers={"Accept": "application/vnd.apache.arrow.stream"},
+        json={
+            "manifestStr": manifest_str,
+            "sql": 'SELECT orderkey, custkey, orderstatus, totalprice, orderdate FROM "Orders" LIMIT 1',
+            "connectionInfo": {
+                "url": "tests/resource/tpch",
+                "format": "parquet",
+            },
+        },
+    )
+    assert response.status_code == 200
+    assert response.headers["Content-Type"] == "application/vnd.apache.arrow.stream"
+    table = pa.ipc.open_stream(response.content).read_all()
+    assert table.num_rows == 1
+    assert table.column_names == [
+        "orderkey",
+        "custkey",
+        "orderstatus",
+        "totalprice",
+        "orderdate",
+    ]
+    assert table.to_pylist()[0] == {
+        "orderkey": 1,
+        "custkey": 370,
+        "orderstatus": "O",
+        "totalprice": Decimal("172799.49"),
+        "orderdate": date(1996, 1, 2),
+    }
+
+
+async def test_query_stream(client, manifest_str):
+    response = await client.post(
+        f"{base_url}/query?stream=true",
+        json={
+            "manifestStr": manifest_str,
+            "sql": 'SELECT orderkey, custkey, orderstatus, totalprice, orderdate FROM "Orders" ORDER BY orderkey LIMIT 3',
+            "connectionInfo": {
+                "url": "tests/resource/tpch",
+                "format": "parquet",
+            },
+        },
+    )
+    assert response.status_code == 200
+    assert response.headers["Content-Type"] == "application/x-ndjson"
+    lines = [orjson.loads(line) for line in response.text.splitlines()]
+    assert lines[0] == {
+        "columns": ["orderkey", "custkey", "orderstatus", "totalprice", "orderdate"],
+        "dtypes": {
+            "orderkey": "int32",
+            "custkey": "int32",
+            "orderstatus": "string",
+            "totalprice": "decimal128(15, 2)",
+            "orderdate": "date32[day]",
+        },
+    }
+    assert len(lines) == 4
+    assert lines[1] == [1, 370, "O", "172799.49", "1996-01-02"]
+
+
+async def test_query_stream_arrow(client, manifest_str):
+    response = await client.post(
+        f"{base_url}/query?stream=true",
+        headers={"Accept": "application/vnd.apache.arrow.stream"},
+        json={
+            "manifestStr": manifest_str,
+            "sql": 'SELECT orderkey FROM "Orders" LIMIT 100',
+            "connectionInfo": {
+                "url": "tests/resource/tpch",
+                "format": "parquet",
+            },
+        },
+    )
+    assert response.status_code == 200
+    assert response.headers["Content-Type"] == "application/vnd.apache.arrow.stream"
+    table = pa.ipc.open_stream(response.content).read_all()
+    assert table.num_rows == 100
+    assert table.column_names == ["orderkey"]
+    # The connector is returned to the pool after the last batch is sent
+    stats = (await client.get("/connector-pool/stats")).json()
+    assert stats["in_use"] == 0
+
+
+async def test_query_stream_invalid_sql(client, manifest_str):
+    response = await client.post(
+        f"{base_url}/query?stream=true",
+        json={
+            "manifestStr": manifest_str,
+            "sql": 'SELECT not_found FROM "Orders"',
+            "connectionInfo": {
+                "url": "tests/resource/tpch",
+                "format": "parquet",
+            },
+        },
+    )
+    assert response.status_code == 422
+
+
+def _stream(pool: ConnectorPool, chunks: Iterator[bytes], timeout: float):
+    stack = ExitStack()
+    connector = stack.enter_context(
+        pool.acquire(
+            DataSource.local_file,
+            LocalFileConnectionInfo(url="tests/resource/tpch", format="parquet"),
+        )
+    )
+    deadline = asyncio.get_running_loop().time() + timeout
+    return _iterate_and_close(connector, chunks, stack, deadline)
+
+
+async def test_query_stream_timeout():
+    def chunks():
+        yield b"first"
+        time.sleep(0.5)
+        yield b"second"
+
+    pool = ConnectorPool()
+    stream = _stream(pool, chunks(), timeout=0.2)
+    assert await anext(stream) == b"first"
+    with pytest.raises(DatabaseTimeoutError):
+        await anext(stream)
+    # The connector may still be read by the timed out thread
+    assert pool.stats()["idle"] == 0
+    assert pool.stats()["evictions"] == 1
+    pool.close_all()
+
+
+async def test_query_stream_closed_early():
+    pool = ConnectorPool()
+    stream = _stream(pool, iter([b"first", b"second"]), timeout=10)
+    assert await anext(stream) == b"first"
+    # The client disconnected in the middle of the result
+    await stream.aclose()
+    assert pool.stats() == {
+        "hits": 0,
+        "misses": 1,
+        "evictions": 1,
+        "idle": 0,
+        "in_use": 0,
+    }
+
+    stream = _stream(pool, iter([b"first", b"second"]), timeout=10)
+    assert [chunk async for chunk in stream] == [b"first", b"second"]
+    assert pool.stats()["idle"] == 1
+    pool.close_all()
+
+
+async def test_query_with_manifest_id(client, manifest_str):
+    response = await client.post("/v3/manifests", json={"manifestStr": manifest_str})
+    assert response.status_code == 200
+    manifest_id = response.json()["manifestId"]
+
+    response = await client.post(
+        f"{base_url}/query",
+        json={
+            "manifestId": manifest_id,
+            "sql": 'SELECT orderkey FROM "Orders" LIMIT 1',
+            "connectionInfo": {
+                "url": "tests/resource/tpch",
+                "format": "parquet",
+            },
+        },
+    )
+    assert response.status_code == 200
+    assert response.json()["data"] == [[1]]
+
+    response = await client.post(
+        f"{base_url}/dry-plan",
+        json={"manifestId": manifest_id, "sql": 'SELECT orderkey FROM "Orders"'},
+    )
+    assert response.status_code == 200
+
+    response = await client.post(
+        f"{base_url}/validate/column_is_valid",
+        json={
+            "manifestId": manifest_id,
+            "parameters": {"modelName": "Orders", "columnName": "orderkey"},
+            "connectionInfo": {
+                "url": "tests/resource/tpch",
+                "format": "parquet",
+            },
+        },
+    )
+    assert response.status_code == 204
+
+
+async def test_query_with_unknown_manifest_id(client):
+    response = await client.post(
+        f"{base_url}/query",
+        json={
+            "manifestId": "not_found",
+            "sql": 'SELECT orderkey FROM "Orders" LIMIT 1',
+            "connectionInfo": {
+                "url": "tests/resource/tpch",
+                "format": "parquet",
+            },
+        },
+    )
+    assert response.status_code == 404
+    assert response.json()["errorCode"] == "MDL_NOT_FOUND"
+
+    response = await client.post(
+        f"{base_url}/query",
+        json={
+            "sql": 'SELECT orderkey FROM "Orders" LIMIT 1',
+            "connectionInfo": {
+                "url": "tests/resource/tpch",
+                "format": "parquet",
+            },
+        },
+    )
+    assert response.status_code == 422
+
+
+async def test_register_invalid_manifest(client):
+    response = await client.post("/v3/manifests", json={"manifestStr": "not base64"})
+    assert response.status_code == 422
+    assert response.json()["errorCode"] == "INVALID_MDL"
+
+
+async def test_query_batch(client, manifest_str):
+    stats = (await client.get("/session-context/stats")).json()
+    response = await client.post(
+        f"{base_url}/query:batch",
+        params={"limit": 2},
+        json={
+            "manifestStr": manifest_str,
+            "sqls": [
+                'SELECT orderkey FROM "Orders" ORDER BY orderkey',
+                'SELECT not_found FROM "Orders"',
+                'SELECT count(*) AS cnt FROM "Orders"',
+            ],
+            "connectionInfo": {
+                "url": "tests/resource/tpch",
+                "format": "parquet",
+            },
+        },
+    )
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert len(results) == 3
+    assert results[0]["columns"] == ["orderkey"]
+    assert results[0]["data"] == [[1], [2]]
+    assert results[1]["error"]["errorCode"] == "INVALID_SQL"
+    assert results[2]["data"] == [[15000]]
+    # The statements are planned against a single session context
+    new_stats = (await client.get("/session-context/stats")).json()
+    lookups = new_stats["hits"] + new_stats["misses"] - stats["hits"] - stats["misses"]
+    assert lookups <= 1
+
+
+async def test_dry_plan_batch(client, manifest_str):
+    response = await client.post(
+        f"{base_url}/dry-plan:batch",
+        json={
+            "manifestStr": manifest_str,
+            "sqls": [
+                'SELECT orderkey FROM "Orders" LIMIT 1',
+                'SELECT not_found FROM "Orders"',
+                'SELECT orderkey FROM "Orders" LIMIT 1',
+            ],
+        },
+    )
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert len(results) == 3
+    assert "sql" in results[0]
+    assert results[1]["error"]["errorCode"] == "INVALID_SQL"
+    assert results[2] == results[0]
+
+    response = await client.post(
+        f"{base_url}/dry-plan",
+        json={
+            "manifestStr": manifest_str,
+            "sql": 'SELECT orderkey FROM "Orders" LIMIT 1',
+        },
+    )
+    assert response.json() == results[0]["sql"]
@@ -82,12 +82,13 @@ async def test_query(client, manifest_str, connection_info):
         "orderkey": "int64",
         "custkey": "int64",
         "orderstatus": "string",
-        "totalprice": "decimal128(5, 2)",
+        "totalprice": "decimal128(15, 2)",
         "orderdate": "date32[day]",
         "order_cust_key": "string",
         "timestamp": "timestamp[ns]",
         "timestamptz": "timestamp[ns]",
-        "test_null_time": "null",
+        # The NULL keeps the timestamp type of the row description
+        "test_null_time": "timestamp[ns]",
     }
 
 
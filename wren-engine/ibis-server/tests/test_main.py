@@ -29,6 +29,29 @@ async def test_config(client):
         "remote_white_function_list_path": None,
         "diagnose": False,
         "app_timeout_seconds": 240,
+        "connector_pool_max_size": 8,
+        "connector_pool_idle_timeout_seconds": 300,
+        "query_cache_max_bytes": 0,
+        "query_cache_ttl_seconds": 0,
+        "query_cache_format": "arrow",
+        "query_cache_parquet_min_bytes": 0,
+        "query_cache_refresh_max_concurrency": 2,
+        "query_stream_batch_size": 10000,
+        "query_batch_max_parallelism": 4,
+        "session_context_cache_size": 32,
+        "planned_sql_cache_size": 1024,
+        "pushdown_limit_cache_size": 1024,
+        "transpile_cache_size": 1024,
+        "manifest_store_size": 32,
+        "bulkhead_max_workers": 8,
+        "bulkhead_max_queue_size": 64,
+        "duckdb_instance_idle_timeout_seconds": 300,
+        "object_storage_discovery_max_workers": 8,
+        "object_storage_schema_cache_size": 4096,
+        "metadata_cache_ttl_seconds": 0,
+        "metadata_cache_size": 256,
+        "dry_run_cache_ttl_seconds": 30,
+        "dry_run_cache_size": 1024,
     }
 
 
@@ -45,3 +68,31 @@ async def test_update_diagnose(client):
     response = await client.get("/config")
     assert response.status_code == 200
     assert response.json()["diagnose"] is False
+
+
+async def test_invalidate_session_context(client):
+    response = await client.delete("/session-context")
+    assert response.status_code == 200
+    response = await client.get("/session-context/stats")
+    assert response.status_code == 200
+    assert response.json()["size"] == 0
+    assert response.json()["capacity"] == 32
+
+
+async def test_stats(client):
+    response = await client.get("/stats")
+    assert response.status_code == 200
+    stats = response.json()
+    assert set(stats) == {
+        "connector_pool",
+        "duckdb_instances",
+        "metadata_cache",
+        "dry_run_cache",
+        "bulkhead",
+        "query_cache",
+        "session_context",
+        "transpile_cache",
+        "manifest_store",
+    }
+    response = await client.get("/session-context/stats")
+    assert response.json() == stats["session_context"]
@@ -0,0 +1,98 @@
+from datetime import date, datetime
+from decimal import Decimal
+
+import orjson
+import pyarrow as pa
+import pytest
+
+from app.util import (
+    _pushdown_limit_cache,
+    _to_json_with_datafusion,
+    _with_session_timezone,
+    pushdown_limit,
+    to_json,
+)
+
+
+def _table() -> pa.Table:
+    return pa.table(
+        {
+            "decimal": pa.array(
+                [Decimal(x) for x in ["0", "172799.49", "0.0000123", "-2"]]
+                + [Decimal("0.00000123"), Decimal("12345678901234567.8"), None],
+                pa.decimal128(38, 10),
+            ),
+            "date": pa.array(
+                [date(1996, 1, 2), date(1, 1, 1), None, None, None, None, None]
+            ),
+            "timestamp": pa.array(
+                [0, -1, 1_456_789_999, None, None, None, None], pa.timestamp("ns")
+            ),
+            "timestamp_tz": pa.array(
+                [datetime(2020, 7, 1, 1, 2, 3), datetime(1850, 1, 1)]
+                + [datetime(2050, 7, 1), datetime(2176, 5, 11), None, None, None],
+                pa.timestamp("us", tz="America/New_York"),
+            ),
+            "binary": pa.array(
+                [b"\x00\xffab", b"", None, None, None, None, None], pa.binary()
+            ),
+            "integer": pa.array([1, None, 2**60 + 1, None, None, None, None]),
+            "float": pa.array([0.1, float("nan"), None, 1e-7, 1e20, 0.0, -1.5]),
+            "boolean": pa.array([True, None, False, None, None, None, None]),
+            "string": pa.array(["a", None, "", None, None, None, None]),
+        }
+    )
+
+
+@pytest.mark.parametrize(
+    "headers",
+    [
+        {},
+        {"x-wren-timezone": "Asia/Taipei"},
+        {"x-wren-timezone": "Europe/London"},
+    ],
+)
+def test_to_json_same_as_datafusion(headers):
+    table = _table()
+    df = _with_session_timezone(table, headers, None)
+    dtypes = {field.name: str(field.type) for field in df.schema}
+    assert orjson.dumps(to_json(table, headers)) == orjson.dumps(
+        _to_json_with_datafusion(df, headers, dtypes)
+    )
+
+
+def test_to_json():
+    result = to_json(_table(), {})
+    assert result["columns"] == list(_table().column_names)
+    assert result["data"][0] == [
+        "0",
+        "1996-01-02",
+        "1970-01-01 00:00:00.000000",
+        "2020-06-30 21:02:03.000000 -04:00",
+        "00ff6162",
+        1.0,
+        0.1,
+        True,
+        "a",
+    ]
+    assert [row[0] for row in result["data"]] == [
+        "0",
+        "172799.49",
+        "0.0000123",
+        "-2.0",
+        "1.23e-6",
+        "1.2345678901234568e16",
+        None,
+    ]
+    assert result["data"][1][3] == "1849-12-31 19:03:58.000000 -04:56:02"
+    assert result["dtypes"]["timestamp_tz"] == "timestamp[us, tz=America/New_York]"
+
+
+def test_pushdown_limit():
+    sql = "SELECT a FROM t ORDER BY a LIMIT 500"
+    assert pushdown_limit(sql, 10) == "SELECT a FROM t ORDER BY a LIMIT 10"
+    assert pushdown_limit(sql, 1000) == sql
+
+    hits = _pushdown_limit_cache.stats()["hits"]
+    assert pushdown_limit(sql, 10) == "SELECT a FROM t ORDER BY a LIMIT 10"
+    assert _pushdown_limit_cache.stats()["hits"] == hits + 1
@@ -0,0 +1,41 @@
+#
+# This script measures the per-call cost of pushing a limit down into a SQL. It
+# compares creating a session context per call, which `pushdown_limit` did before,
+# with the shared context and the memoized `pushdown_limit` of `app.util`.
+#
+# Argements:
+# - --number: The number of the calls per measurement
+#
+
+import argparse
+import timeit
+
+from wren_core import SessionContext
+
+from app.util import pushdown_limit
+
+parser = argparse.ArgumentParser(description="Benchmark the limit pushdown")
+parser.add_argument("--number", type=int, default=200, help="calls per measurement")
+args = parser.parse_args()
+
+sql = """
+SELECT o_orderkey, o_custkey, sum(o_totalprice) AS totalprice
+FROM orders
+WHERE o_orderstatus = 'F' AND o_orderdate > DATE '1995-01-01'
+GROUP BY 1, 2
+ORDER BY 3 DESC
+LIMIT 500
+"""
+shared_context = SessionContext()
+sqls = [f"{sql} -- {i}" for i in range(args.number)]
+distinct = iter(sqls)
+
+cases = {
+    "fresh context per call": lambda: SessionContext().pushdown_limit(sql, 10),
+    "shared context": lambda: shared_context.pushdown_limit(sql, 10),
+    "pushdown_limit (cache miss)": lambda: pushdown_limit(next(distinct), 10),
+    "pushdown_limit (cache hit)": lambda: pushdown_limit(sql, 10),
+}
+for name, func in cases.items():
+    seconds = timeit.timeit(func, number=args.number)
+    print(f"{name:<30} {seconds / args.number * 1e6:>10.1f} us/call")